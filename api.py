@@ -1,4 +1,4 @@
-from flask import Flask, request, jsonify
+from flask import Blueprint, Flask, current_app, request, jsonify, Response, make_response
 from nav_processor import NAVProcessor
 import os
 from dotenv import load_dotenv
@@ -8,17 +8,31 @@ from models import Series, SeriesStatus, FeeStructure, Trade
 from series_change_detector import SeriesChangeDetector
 import pandas as pd
 import math
+import shutil
+import tempfile
 import traceback
-from sqlalchemy import func, create_engine
-from sqlalchemy.orm import sessionmaker
+import dataclasses
+from sqlalchemy.orm import selectinload, sessionmaker
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import List, Tuple, Set, Optional
-from config import AppConfig, DEFAULT_FTP_CONFIGS
-
-app = Flask(__name__)
-
-# Configure timeouts
-app.config['TIMEOUT'] = 300  # 5 minutes timeout
+from typing import Dict, List, Tuple, Set, Optional
+from config import (AppConfig, DEFAULT_FTP_CONFIGS, DEFAULT_DB_CONNECTION_STRING,
+                    DEFAULT_DATA_VERSION_MAX_AGE, DEFAULT_JOB_WORKERS,
+                    DEFAULT_JOB_HEARTBEAT_INTERVAL, DEFAULT_JOB_STALE_AFTER,
+                    DEFAULT_COMPRESS_MIN_BYTES)
+from db_engine import get_engine
+from pagination import PaginationError, paginate_keyset, paginate_offset, parse_count_mode
+from table_stats import estimate_trades, get_nav_entry_summary, get_trade_summary, NAV_ENTRIES, SERIES, TRADES
+from response_cache import CachedResponse, DataVersionMonitor, ResponseCache, make_etag
+from jobs import JobRunner
+from nav_export import EXPORT_FORMATS, EXPORT_WRITERS, requires_pyarrow, pyarrow_available
+from serialization import FastJSONProvider, choose_encoding, compress_response, encoded_etag
+from werkzeug.local import LocalProxy
+
+# Routes are registered on the app built by create_app()
+bp = Blueprint('api', __name__)
+
+# Upper bound on identifiers per /nav-data/as-of request
+MAX_AS_OF_IDENTIFIERS = 5000
 
 # Load environment variables
 load_dotenv()
@@ -48,7 +62,8 @@ def get_reliable_session():
 
     # Final fallback - create a new SQLAlchemy session from scratch
     try:
-        engine = create_engine('sqlite:///nav_data.db')
+        engine = get_engine(app_config.db_connection_string,
+                            app_config.db_config)
         Session = sessionmaker(bind=engine)
         session = Session()
         print(
@@ -60,6 +75,25 @@ def get_reliable_session():
             f"Could not create database session. Errors: {', '.join(errors)}")
 
 
+def build_pagination(page: int, per_page: int, cursor: Optional[str],
+                     next_cursor: Optional[str], total: Optional[int], count: str) -> dict:
+    """
+    Build the pagination block of a list response.
+
+    Page requests keep the page counters (null totals with count=none) and
+    also return next_cursor so clients can switch over. Cursor requests only
+    report totals when a count was asked for.
+    """
+    pagination = {'per_page': per_page, 'next_cursor': next_cursor, 'count': count}
+    if cursor is None:
+        pagination['current_page'] = page
+    if cursor is None or total is not None:
+        pagination['total_pages'] = math.ceil(
+            total / per_page) if total is not None else None
+        pagination['total_entries'] = total
+    return pagination
+
+
 def get_previous_business_day():
     """Get the previous business day date string in MMDDYYYY format"""
     today = pd.Timestamp.now()
@@ -150,36 +184,253 @@ def require_api_key(f):
     return decorated_function
 
 
-@app.route('/health', methods=['GET'])
+# Child collections rendered by the series detail endpoints; selectinload
+# fetches each for all series of a query in one extra query
+SERIES_DETAIL_LOADERS = (selectinload(Series.custodians),
+                         selectinload(Series.fee_structures))
+
+# Upper bound on identifiers per /series/details:batch request
+MAX_SERIES_BATCH = 500
+
+
+def resolve_series(session, identifiers: List[str], *options) -> Dict[str, Series]:
+    """
+    Resolve ISINs and series numbers to Series in one query.
+
+    ISIN matches take precedence; a series number shared by several series
+    resolves to the one with the lowest ISIN. Loader options (e.g.
+    SERIES_DETAIL_LOADERS) are applied to the query.
+
+    Returns:
+        Dict of each identifier found to its Series
+    """
+    identifiers = list(dict.fromkeys(identifiers))
+    matches = (
+        session.query(Series)
+        .options(*options)
+        .filter(Series.isin.in_(identifiers) | Series.series_number.in_(identifiers))
+        .order_by(Series.isin)
+        .all()
+    )
+    by_isin = {series.isin: series for series in matches}
+    by_series_number = {}
+    for series in matches:
+        by_series_number.setdefault(series.series_number, series)
+
+    resolved = {}
+    for identifier in identifiers:
+        series = by_isin.get(identifier) or by_series_number.get(identifier)
+        if series is not None:
+            resolved[identifier] = series
+    return resolved
+
+
+def format_date(date):
+    """Format a date as YYYY-MM-DD"""
+    if date is None or pd.isna(date):
+        return None
+    return date.strftime('%Y-%m-%d')
+
+
+def format_series_details(series: Series) -> dict:
+    """Detail payload for a series with its custodians and fee structures"""
+    return {
+        'isin': series.isin,
+        'series_number': series.series_number,
+        'series_name': series.series_name,
+        'status': series.status.value,
+        'issuance_type': series.issuance_type,
+        'product_type': series.product_type,
+        'dates': {
+            'issuance': format_date(series.issuance_date),
+            'maturity': format_date(series.maturity_date),
+            'close': format_date(series.close_date)
+        },
+        'details': {
+            'issuer': series.issuer,
+            'relationship_manager': series.relationship_manager,
+            'region': series.series_region,
+            'portfolio_manager': {
+                'name': series.portfolio_manager,
+                'jurisdiction': series.portfolio_manager_jurisdiction
+            },
+            'borrower': series.borrower,
+            'asset_manager': series.asset_manager
+        },
+        'financial': {
+            'currency': series.currency,
+            'nav_frequency': series.nav_frequency.value,
+            'issuance_principal_amount': series.issuance_principal_amount,
+            'fees_frequency': series.fees_frequency,
+            'payment_method': series.payment_method
+        },
+        'custodians': [
+            {
+                'name': c.custodian_name,
+                'account_number': c.account_number
+            }
+            for c in series.custodians
+        ],
+        'fee_structures': [
+            {
+                'type': f.fee_type,
+                'category': f.fee_type_category.value,
+                'percentage': f.fee_percentage,
+                'fixed_amount': f.fixed_amount,
+                'currency': f.currency,
+                'aum_threshold': f.aum_threshold
+            }
+            for f in series.fee_structures
+        ]
+    }
+
+
+@bp.route('/health', methods=['GET'])
 def health_check():
     return jsonify({'status': 'healthy'}), 200
 
 
-# Create a config dictionary
-config_dict = {
-    'mode': 'remote',
-    'ftp_configs': ftp_configs,
-    'smtp_config': smtp_config,
-    'drive_config': drive_config,
-    'db_connection_string': 'sqlite:///nav_data.db'
-}
+def default_app_config() -> AppConfig:
+    """AppConfig built from the environment-derived settings above"""
+    return AppConfig.from_dict({
+        'mode': 'remote',
+        'ftp_configs': ftp_configs,
+        'smtp_config': smtp_config,
+        'drive_config': drive_config,
+        'db_connection_string': DEFAULT_DB_CONNECTION_STRING
+    })
+
+
+class APIState:
+    """
+    Objects behind the API that hold connections, caches or threads.
+
+    One is created per app by create_app(), so each server worker process
+    gets its own engine pool, response cache and job pool instead of
+    sharing ones created at import time.
+    """
+
+    def __init__(self, app_config: AppConfig):
+        self.app_config = app_config
+        self.processor = NAVProcessor(config=app_config)
+        session_maker = self.processor.db_manager.db_service.SessionMaker
+
+        # Serialized read responses, keyed by the data versions they were built from
+        self.data_version_monitor = DataVersionMonitor(
+            session_maker, DEFAULT_DATA_VERSION_MAX_AGE)
+        self.response_cache = ResponseCache()
+
+        # NAV pipelines requested through the API run here, off the request thread
+        self.job_runner = JobRunner(session_maker, DEFAULT_JOB_WORKERS,
+                                    DEFAULT_JOB_HEARTBEAT_INTERVAL, DEFAULT_JOB_STALE_AFTER)
+
+
+def get_state() -> APIState:
+    """State of the app handling the current request"""
+    return current_app.extensions['nav_api']
 
-# Create AppConfig using from_dict method
-app_config = AppConfig.from_dict(config_dict)
 
-processor = NAVProcessor(
-    config=app_config
-)
+# The current app's state under the names the views use
+app_config = LocalProxy(lambda: get_state().app_config)
+processor = LocalProxy(lambda: get_state().processor)
+data_version_monitor = LocalProxy(lambda: get_state().data_version_monitor)
+response_cache = LocalProxy(lambda: get_state().response_cache)
+job_runner = LocalProxy(lambda: get_state().job_runner)
 
 
-@app.route('/nav-data', methods=['GET'])
+def run_nav_pipeline_job(state: APIState, job_id: str, report_stage,
+                         **process_navs_kwargs) -> dict:
+    """
+    Run processor.process_navs for a background job.
+
+    Each job gets its own input, output and temp directories so jobs for
+    different dates can run side by side without cleaning up each other's
+    files; the database manager is shared. Jobs run outside any request, so
+    the app state is passed in rather than read from the current app.
+    """
+    job_dirs = [os.path.join(state.app_config.input_dir, 'jobs', job_id),
+                os.path.join(state.app_config.output_dir, 'jobs', job_id),
+                os.path.join(tempfile.gettempdir(), 'nav_processor', 'jobs', job_id)]
+    for job_dir in job_dirs:
+        os.makedirs(job_dir, exist_ok=True)
+    job_config = dataclasses.replace(
+        state.app_config, input_dir=job_dirs[0], output_dir=job_dirs[1], temp_dir=job_dirs[2])
+    try:
+        job_processor = NAVProcessor(
+            config=job_config, db_manager=state.processor.db_manager)
+        return job_processor.process_navs(progress=report_stage, **process_navs_kwargs)
+    finally:
+        for job_dir in job_dirs:
+            shutil.rmtree(job_dir, ignore_errors=True)
+
+
+def job_accepted_response(job_id: str, message: str, **details):
+    """202 response pointing at the status endpoint of a queued job"""
+    return jsonify({
+        'status': 'accepted',
+        'message': message,
+        'job_id': job_id,
+        'job_url': f'/jobs/{job_id}',
+        **details
+    }), 202
+
+
+def cached_by_data_version(*version_names):
+    """
+    Serve a GET view from the response cache, keyed by path, query string and
+    the current versions of the data it reads. Responses carry a strong ETag
+    derived from that key, with the content coding appended once
+    compress_response has compressed them. A request whose If-None-Match
+    holds the tag of either form it could be sent gets a 304 without running
+    the view. Only 200 responses are cached.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            versions = data_version_monitor.current(version_names)
+            key = (request.path, tuple(sorted(request.args.items(multi=True))),
+                   version_names, versions)
+            etag = make_etag(key)
+            # Small bodies are sent uncompressed whatever the client accepts
+            encoding = choose_encoding(request)
+            current_etags = [etag, encoded_etag(etag, encoding)] if encoding else [etag]
+            matched = [tag for tag in current_etags if request.if_none_match.contains_weak(tag)]
+
+            if matched:
+                response = Response(status=304)
+                etag = matched[0]
+            else:
+                cached = response_cache.get(key)
+                if cached is None:
+                    response = make_response(f(*args, **kwargs))
+                    if response.status_code != 200:
+                        return response
+                    cached = CachedResponse(
+                        response.get_data(), response.status_code, response.mimetype, etag)
+                    response_cache.put(key, cached)
+                response = Response(cached.body, status=cached.status,
+                                    mimetype=cached.mimetype)
+
+            response.set_etag(etag)
+            # Let clients keep the body but revalidate on every use
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return decorated_function
+    return decorator
+
+
+@bp.route('/nav-data', methods=['GET'])
 @require_api_key
+@cached_by_data_version(NAV_ENTRIES, SERIES)
 def get_nav_data():
     """Get paginated NAV data with filtering options"""
     try:
         # Get query parameters
         page = int(request.args.get('page', 1))
         per_page = int(request.args.get('per_page', 50))
+        # Present (even empty) switches to keyset pagination
+        cursor = request.args.get('cursor')
+        count = parse_count_mode(request.args.get('count'), cursor)
         isin = request.args.get('isin')
         series_number = request.args.get('series_number')
         start_date = request.args.get('start_date')
@@ -198,7 +449,9 @@ def get_nav_data():
             start_date=start_date,
             end_date=end_date,
             page=page,
-            per_page=per_page
+            per_page=per_page,
+            cursor=cursor,
+            count=count
         )
 
         response = {
@@ -207,22 +460,81 @@ def get_nav_data():
                 {
                     'isin': entry.isin,
                     'series_number': entry.series_number,
-                    'nav_date': entry.nav_date.strftime('%Y-%m-%d'),
+                    'nav_date': entry.nav_date.isoformat(),
                     'nav_value': float(entry.nav_value),
                     'emitter': entry.emitter
                 }
                 for entry in nav_entries['entries']
             ],
-            'pagination': {
-                'current_page': page,
-                'per_page': per_page,
-                'total_pages': nav_entries['total_pages'],
-                'total_entries': nav_entries['total_entries']
-            }
+            'pagination': build_pagination(
+                page, per_page, cursor, nav_entries['next_cursor'],
+                nav_entries['total_entries'], count)
         }
 
         return jsonify(response), 200
 
+    except PaginationError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+
+@bp.route('/nav-data/export', methods=['GET'])
+@require_api_key
+def export_nav_data():
+    """Stream NAV data with the /nav-data filters as CSV, Parquet or Arrow IPC"""
+    try:
+        export_format = request.args.get('format', 'csv').lower()
+        isin = request.args.get('isin')
+        series_number = request.args.get('series_number')
+        emitter = request.args.get('emitter')
+        start_date = request.args.get('start_date')
+        end_date = request.args.get('end_date')
+
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({
+                'status': 'error',
+                'message': f"Invalid format '{export_format}', expected one of: {', '.join(EXPORT_FORMATS)}"
+            }), 400
+        if requires_pyarrow(export_format) and not pyarrow_available():
+            return jsonify({
+                'status': 'error',
+                'message': f"The {export_format} format requires pyarrow, which is not installed"
+            }), 400
+
+        # Convert dates if provided
+        if start_date:
+            start_date = datetime.strptime(start_date, '%Y-%m-%d')
+        if end_date:
+            end_date = datetime.strptime(end_date, '%Y-%m-%d')
+
+        chunks = processor.db_manager.iter_nav_export(
+            isin=isin,
+            series_number=series_number,
+            emitter=emitter,
+            start_date=start_date,
+            end_date=end_date
+        )
+        mimetype, extension = EXPORT_FORMATS[export_format]
+        filename = f"nav_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+
+        return Response(
+            EXPORT_WRITERS[export_format](chunks),
+            mimetype=mimetype,
+            headers={'Content-Disposition': f'attachment; filename={filename}'}
+        )
+
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'status': 'error',
@@ -230,7 +542,82 @@ def get_nav_data():
         }), 500
 
 
-@app.route('/fetch-remote-navs', methods=['POST'])
+@bp.route('/nav-data/as-of', methods=['POST'])
+@require_api_key
+def get_nav_data_as_of():
+    """Get the NAV of many ISINs and series on or before a date in one request"""
+    try:
+        data = request.get_json() or {}
+        as_of_date = data.get('as_of_date')
+        isins = data.get('isins', [])
+        series_numbers = data.get('series_numbers', [])
+        exact = bool(data.get('exact', False))
+
+        if not as_of_date:
+            return jsonify({
+                'status': 'error',
+                'message': 'as_of_date is required'
+            }), 400
+        if not isinstance(isins, list) or not isinstance(series_numbers, list):
+            return jsonify({
+                'status': 'error',
+                'message': 'isins and series_numbers must be lists'
+            }), 400
+        if not isins and not series_numbers:
+            return jsonify({
+                'status': 'error',
+                'message': 'At least one ISIN or series number is required'
+            }), 400
+        if len(isins) + len(series_numbers) > MAX_AS_OF_IDENTIFIERS:
+            return jsonify({
+                'status': 'error',
+                'message': f'At most {MAX_AS_OF_IDENTIFIERS} ISINs and series numbers per request'
+            }), 400
+
+        as_of_date = datetime.strptime(as_of_date, '%Y-%m-%d').date()
+        result = processor.db_manager.db_service.get_navs_as_of(
+            as_of_date,
+            isins=[str(isin) for isin in isins],
+            series_numbers=[str(series_number) for series_number in series_numbers],
+            exact=exact
+        )
+        navs = result['navs']
+
+        not_found = [isin for isin in isins if str(isin) not in navs]
+        not_found += [series_number for series_number, series_isins
+                      in result['series_isins'].items()
+                      if not any(isin in navs for isin in series_isins)]
+
+        return jsonify({
+            'status': 'success',
+            'as_of_date': as_of_date.strftime('%Y-%m-%d'),
+            'exact': exact,
+            'data': {
+                isin: {
+                    'series_number': nav.series_number,
+                    'nav_date': nav.nav_date.strftime('%Y-%m-%d'),
+                    'nav_value': float(nav.nav_value),
+                    'emitter': nav.emitter
+                }
+                for isin, nav in navs.items()
+            },
+            'series': result['series_isins'],
+            'not_found': not_found
+        }), 200
+
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+
+@bp.route('/fetch-remote-navs', methods=['POST'])
 @require_api_key
 def fetch_remote_navs():
     """Fetch remote NAV data and save to database"""
@@ -292,54 +679,31 @@ def fetch_remote_navs():
                     target_isins.update(filter_isins)
             target_isins = list(target_isins)
 
-        # Process NAVs without sending email or generating templates
-        try:
-            # Use process_navs with empty template_types to avoid template generation
-            # and send_email=False to avoid sending emails
-            processor.process_navs(
+        filters_applied = {
+            'filter_types': isin_filters,
+            'specific_isins': specific_isins,
+            'series_number': series_number,
+            'series_type': series_type
+        }
+
+        # Fetch and save NAVs in the background, without emails or templates
+        state = get_state()
+        job_id = state.job_runner.submit(
+            'fetch_remote_navs',
+            {'date_str': date_str, 'filters_applied': filters_applied},
+            lambda job_id, report_stage: run_nav_pipeline_job(
+                state, job_id, report_stage,
                 date_str=date_str,
                 send_email=False,
                 isin_filter=isin_filters,  # Pass the full list including series_type
                 template_types=[]  # Empty list to avoid template generation
             )
+        )
 
-            return jsonify({
-                'status': 'success',
-                'message': f'Successfully processed NAV files',
-                'date_processed': date_str,
-                'stats': {
-                    'added': 0,  # We don't have actual stats anymore, but frontend expects these fields
-                    'duplicates': 0,
-                    'invalids': 0
-                },
-                'filters_applied': {
-                    'filter_types': isin_filters,
-                    'specific_isins': specific_isins,
-                    'series_number': series_number,
-                    'series_type': series_type
-                }
-            }), 200
-
-        except Exception as e:
-            # Log the error but don't treat it as a failure
-            print(
-                f"Note: Some NAV entries were duplicates or invalid: {str(e)}")
-            return jsonify({
-                'status': 'success',
-                'message': 'Processed NAV files with some duplicates/invalid entries',
-                'date_processed': date_str,
-                'stats': {
-                    'added': 0,
-                    'duplicates': 0,
-                    'invalids': 0
-                },
-                'filters_applied': {
-                    'filter_types': isin_filters,
-                    'specific_isins': specific_isins,
-                    'series_number': series_number,
-                    'series_type': series_type
-                }
-            }), 200
+        return job_accepted_response(
+            job_id, 'NAV fetch queued',
+            date_processed=date_str,
+            filters_applied=filters_applied)
 
     except Exception as e:
         error_traceback = traceback.format_exc()
@@ -352,7 +716,7 @@ def fetch_remote_navs():
         }), 500
 
 
-@app.route('/generate-templates', methods=['POST'])
+@bp.route('/generate-templates', methods=['POST'])
 @require_api_key
 def generate_templates():
     """Generate templates, upload to drive and send emails"""
@@ -420,28 +784,35 @@ def generate_templates():
             # Pass the isin_filters directly (including series_type)
             isin_filter_value = isin_filters
 
-        # Process NAVs with template generation and email sending
-        processor.process_navs(
-            date_str=date_str,
-            send_email=bool(emails),
-            to_emails=emails,
-            isin_filter=isin_filter_value,
-            template_types=template_types
+        filters_applied = {
+            'filter_types': isin_filters,
+            'specific_isins': specific_isins,
+            'series_number': series_number,
+            'series_type': series_type
+        }
+
+        # Generate templates and send emails in the background
+        state = get_state()
+        job_id = state.job_runner.submit(
+            'generate_templates',
+            {'date_str': date_str, 'emails': emails,
+             'template_types': template_types, 'filters_applied': filters_applied},
+            lambda job_id, report_stage: run_nav_pipeline_job(
+                state, job_id, report_stage,
+                date_str=date_str,
+                send_email=bool(emails),
+                to_emails=emails,
+                isin_filter=isin_filter_value,
+                template_types=template_types
+            )
         )
 
-        return jsonify({
-            'status': 'success',
-            'message': 'Successfully generated templates and sent emails',
-            'date_processed': date_str,
-            'emails_sent_to': emails if emails else [],
-            'template_types': template_types,
-            'filters_applied': {
-                'filter_types': isin_filters,
-                'specific_isins': specific_isins,
-                'series_number': series_number,
-                'series_type': series_type
-            }
-        }), 200
+        return job_accepted_response(
+            job_id, 'Template generation queued',
+            date_processed=date_str,
+            emails_sent_to=emails if emails else [],
+            template_types=template_types,
+            filters_applied=filters_applied)
 
     except Exception as e:
         error_traceback = traceback.format_exc()
@@ -454,14 +825,41 @@ def generate_templates():
         }), 500
 
 
-@app.route('/series', methods=['GET'])
+@bp.route('/jobs/<job_id>', methods=['GET'])
 @require_api_key
+def get_job(job_id):
+    """Get the state, current stage and result of a background job"""
+    try:
+        job = job_runner.get(job_id)
+        if job is None:
+            return jsonify({
+                'status': 'error',
+                'message': f'Job {job_id} not found'
+            }), 404
+
+        return jsonify({
+            'status': 'success',
+            'data': job
+        }), 200
+
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+
+@bp.route('/series', methods=['GET'])
+@require_api_key
+@cached_by_data_version(SERIES)
 def get_series():
     """Get series information with optional filters"""
     try:
         # Get query parameters
         page = int(request.args.get('page', 1))
         per_page = int(request.args.get('per_page', 50))
+        cursor = request.args.get('cursor')
+        count = parse_count_mode(request.args.get('count'), cursor)
         status = request.args.get('status')  # A, D, or Matured
         region = request.args.get('region')
         isin = request.args.get('isin')
@@ -483,11 +881,18 @@ def get_series():
             if series_number:
                 query = query.filter(Series.series_number == series_number)
 
-            # Get total count
-            total = query.count()
-
             # Apply pagination
-            series = query.offset((page - 1) * per_page).limit(per_page).all()
+            if cursor is not None:
+                series, next_cursor = paginate_keyset(
+                    query, [Series.isin], lambda s: (s.isin,), per_page, cursor)
+            else:
+                series, next_cursor = paginate_offset(
+                    query, [Series.isin], lambda s: (s.isin,), page, per_page)
+
+            # Get total count
+            total = processor.db_manager.db_service.count_rows(
+                session, query, count,
+                ('series', status, region, isin, series_number), (SERIES,))
 
             response = {
                 'status': 'success',
@@ -505,17 +910,17 @@ def get_series():
                     }
                     for s in series
                 ],
-                'pagination': {
-                    'current_page': page,
-                    'per_page': per_page,
-                    'total_pages': math.ceil(total / per_page),
-                    'total_entries': total
-                }
+                'pagination': build_pagination(page, per_page, cursor, next_cursor, total, count)
             }
             return jsonify(response), 200
         finally:
             session.close()
 
+    except PaginationError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
     except Exception as e:
         error_traceback = traceback.format_exc()
         print(f"Error in get_series: {str(e)}")
@@ -527,7 +932,7 @@ def get_series():
         }), 500
 
 
-@app.route('/series/<identifier>/nav-history', methods=['GET'])
+@bp.route('/series/<identifier>/nav-history', methods=['GET'])
 @require_api_key
 def get_series_nav_history(identifier):
     """Get NAV history for a specific series by ISIN or series number"""
@@ -539,6 +944,7 @@ def get_series_nav_history(identifier):
         emitter = request.args.get('emitter')
         page = int(request.args.get('page', 1))
         per_page = int(request.args.get('per_page', 50))
+        count = parse_count_mode(request.args.get('count'))
 
         # Convert dates if provided
         if start_date:
@@ -546,14 +952,23 @@ def get_series_nav_history(identifier):
         if end_date:
             end_date = datetime.strptime(end_date, '%Y-%m-%d')
 
+        # The identifier is an ISIN when a series has it, else a series number
+        session = get_reliable_session()
+        try:
+            is_isin = session.query(Series.isin).filter(
+                Series.isin == identifier).first() is not None
+        finally:
+            session.close()
+
         # Get NAV history
         nav_entries = processor.db_manager.get_nav_history(
-            isin=identifier,
-            series_number=identifier,
+            isin=identifier if is_isin else None,
+            series_number=None if is_isin else identifier,
             start_date=start_date,
             end_date=end_date,
             page=page,
-            per_page=per_page
+            per_page=per_page,
+            count=count
         )
 
         # Format response
@@ -561,7 +976,7 @@ def get_series_nav_history(identifier):
             'status': 'success',
             'data': [
                 {
-                    'nav_date': entry.nav_date.strftime('%Y-%m-%d'),
+                    'nav_date': entry.nav_date.isoformat(),
                     'nav_value': float(entry.nav_value),
                     'distribution_type': entry.distribution_type,
                     'emitter': entry.emitter,
@@ -570,16 +985,18 @@ def get_series_nav_history(identifier):
                 }
                 for entry in nav_entries['entries']
             ],
-            'pagination': {
-                'current_page': page,
-                'per_page': per_page,
-                'total_pages': nav_entries['total_pages'],
-                'total_entries': nav_entries['total_entries']
-            }
+            'pagination': build_pagination(
+                page, per_page, None, nav_entries['next_cursor'],
+                nav_entries['total_entries'], count)
         }
 
         return jsonify(response), 200
 
+    except PaginationError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'status': 'error',
@@ -587,17 +1004,16 @@ def get_series_nav_history(identifier):
         }), 500
 
 
-@app.route('/series/<identifier>/details', methods=['GET'])
+@bp.route('/series/<identifier>/details', methods=['GET'])
 @require_api_key
+@cached_by_data_version(SERIES)
 def get_series_details(identifier):
     """Get detailed information about a specific series by ISIN or series number"""
     try:
         session = get_reliable_session()
         try:
-            series = session.query(Series).filter(
-                (Series.isin == identifier) | (
-                    Series.series_number == identifier)
-            ).first()
+            series = resolve_series(
+                session, [identifier], *SERIES_DETAIL_LOADERS).get(identifier)
 
             if not series:
                 return jsonify({
@@ -605,63 +1021,60 @@ def get_series_details(identifier):
                     'message': f'Series with identifier {identifier} not found'
                 }), 404
 
-            def format_date(date):
-                """Helper function to format dates"""
-                if date is None or pd.isna(date):
-                    return None
-                return date.strftime('%Y-%m-%d')
+            response = {
+                'status': 'success',
+                'data': format_series_details(series)
+            }
+
+            return jsonify(response), 200
+        finally:
+            session.close()
+
+    except Exception as e:
+        error_traceback = traceback.format_exc()
+        print(f"Error in get_series_details: {str(e)}")
+        print(f"Traceback: {error_traceback}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e),
+            'traceback': error_traceback
+        }), 500
+
+
+@bp.route('/series/details:batch', methods=['POST'])
+@require_api_key
+def get_series_details_batch():
+    """Get detailed information about many series by ISIN or series number"""
+    try:
+        data = request.get_json() or {}
+        identifiers = data.get('identifiers', [])
+
+        if not isinstance(identifiers, list) or not identifiers:
+            return jsonify({
+                'status': 'error',
+                'message': 'identifiers must be a non-empty list'
+            }), 400
+        if len(identifiers) > MAX_SERIES_BATCH:
+            return jsonify({
+                'status': 'error',
+                'message': f'At most {MAX_SERIES_BATCH} identifiers per request'
+            }), 400
+
+        identifiers = [str(identifier) for identifier in identifiers]
+        session = get_reliable_session()
+        try:
+            # One series query plus one per eager-loaded relationship
+            series_by_identifier = resolve_series(
+                session, identifiers, *SERIES_DETAIL_LOADERS)
 
             response = {
                 'status': 'success',
                 'data': {
-                    'isin': series.isin,
-                    'series_number': series.series_number,
-                    'series_name': series.series_name,
-                    'status': series.status.value,
-                    'issuance_type': series.issuance_type,
-                    'product_type': series.product_type,
-                    'dates': {
-                        'issuance': format_date(series.issuance_date),
-                        'maturity': format_date(series.maturity_date),
-                        'close': format_date(series.close_date)
-                    },
-                    'details': {
-                        'issuer': series.issuer,
-                        'relationship_manager': series.relationship_manager,
-                        'region': series.series_region,
-                        'portfolio_manager': {
-                            'name': series.portfolio_manager,
-                            'jurisdiction': series.portfolio_manager_jurisdiction
-                        },
-                        'borrower': series.borrower,
-                        'asset_manager': series.asset_manager
-                    },
-                    'financial': {
-                        'currency': series.currency,
-                        'nav_frequency': series.nav_frequency.value,
-                        'issuance_principal_amount': series.issuance_principal_amount,
-                        'fees_frequency': series.fees_frequency,
-                        'payment_method': series.payment_method
-                    },
-                    'custodians': [
-                        {
-                            'name': c.custodian_name,
-                            'account_number': c.account_number
-                        }
-                        for c in series.custodians
-                    ],
-                    'fee_structures': [
-                        {
-                            'type': f.fee_type,
-                            'category': f.fee_type_category.value,
-                            'percentage': f.fee_percentage,
-                            'fixed_amount': f.fixed_amount,
-                            'currency': f.currency,
-                            'aum_threshold': f.aum_threshold
-                        }
-                        for f in series.fee_structures
-                    ]
-                }
+                    identifier: format_series_details(series)
+                    for identifier, series in series_by_identifier.items()
+                },
+                'not_found': [identifier for identifier in dict.fromkeys(identifiers)
+                              if identifier not in series_by_identifier]
             }
 
             return jsonify(response), 200
@@ -670,7 +1083,7 @@ def get_series_details(identifier):
 
     except Exception as e:
         error_traceback = traceback.format_exc()
-        print(f"Error in get_series_details: {str(e)}")
+        print(f"Error in get_series_details_batch: {str(e)}")
         print(f"Traceback: {error_traceback}")
         return jsonify({
             'status': 'error',
@@ -679,18 +1092,16 @@ def get_series_details(identifier):
         }), 500
 
 
-@app.route('/series/<identifier>/stakeholders', methods=['GET'])
+@bp.route('/series/<identifier>/stakeholders', methods=['GET'])
 @require_api_key
 def get_series_stakeholders(identifier):
     """Get all stakeholders associated with a specific series by ISIN or series number"""
     try:
         session = get_reliable_session()
         try:
-            # Try to find series by ISIN or series number
-            series = session.query(Series).filter(
-                (Series.isin == identifier) | (
-                    Series.series_number == identifier)
-            ).first()
+            # Find the series by ISIN or series number with its custodians
+            series = resolve_series(
+                session, [identifier], selectinload(Series.custodians)).get(identifier)
 
             if not series:
                 return jsonify({
@@ -698,12 +1109,6 @@ def get_series_stakeholders(identifier):
                     'message': f'Series with identifier {identifier} not found'
                 }), 404
 
-            def format_date(date):
-                """Helper function to format dates"""
-                if date is None or pd.isna(date):
-                    return None
-                return date.strftime('%Y-%m-%d')
-
             stakeholders = {
                 'status': 'success',
                 'data': {
@@ -776,17 +1181,15 @@ def get_series_stakeholders(identifier):
         }), 500
 
 
-@app.route('/series/<identifier>/fee-structures', methods=['GET'])
+@bp.route('/series/<identifier>/fee-structures', methods=['GET'])
 @require_api_key
 def get_series_fee_structures(identifier):
     """Get all fee structures associated with a specific series by ISIN or series number"""
     try:
         session = get_reliable_session()
         try:
-            series = session.query(Series).filter(
-                (Series.isin == identifier) | (
-                    Series.series_number == identifier)
-            ).first()
+            series = resolve_series(
+                session, [identifier], selectinload(Series.fee_structures)).get(identifier)
 
             if not series:
                 return jsonify({
@@ -832,13 +1235,16 @@ def get_series_fee_structures(identifier):
         }), 500
 
 
-@app.route('/fee-structures/summary', methods=['GET'])
+@bp.route('/fee-structures/summary', methods=['GET'])
 @require_api_key
+@cached_by_data_version(SERIES)
 def get_fee_structures_summary():
     """Get a summary of all fee structures across series"""
     try:
         page = int(request.args.get('page', 1))
         per_page = int(request.args.get('per_page', 50))
+        cursor = request.args.get('cursor')
+        count = parse_count_mode(request.args.get('count'), cursor)
         fee_type = request.args.get('fee_type')
         category = request.args.get('category')
         isin = request.args.get('isin')
@@ -860,11 +1266,21 @@ def get_fee_structures_summary():
                 query = query.filter(
                     FeeStructure.fee_type_category == category)
 
-            # Get total count
-            total = query.count()
-
             # Apply pagination
-            results = query.offset((page - 1) * per_page).limit(per_page).all()
+            if cursor is not None:
+                results, next_cursor = paginate_keyset(
+                    query, [FeeStructure.id], lambda row: (row[1].id,),
+                    per_page, cursor)
+            else:
+                results, next_cursor = paginate_offset(
+                    query, [FeeStructure.id], lambda row: (row[1].id,),
+                    page, per_page)
+
+            # Get total count
+            total = processor.db_manager.db_service.count_rows(
+                session, query, count,
+                ('fee_structures_summary', isin, series_number, fee_type, category),
+                (SERIES,))
 
             response = {
                 'status': 'success',
@@ -886,18 +1302,18 @@ def get_fee_structures_summary():
                     }
                     for series, fee in results
                 ],
-                'pagination': {
-                    'current_page': page,
-                    'per_page': per_page,
-                    'total_pages': math.ceil(total / per_page),
-                    'total_entries': total
-                }
+                'pagination': build_pagination(page, per_page, cursor, next_cursor, total, count)
             }
 
             return jsonify(response), 200
         finally:
             session.close()
 
+    except PaginationError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
     except Exception as e:
         error_traceback = traceback.format_exc()
         print(f"Error in get_fee_structures_summary: {str(e)}")
@@ -909,7 +1325,7 @@ def get_fee_structures_summary():
         }), 500
 
 
-@app.route('/statistics', methods=['GET'])
+@bp.route('/statistics', methods=['GET'])
 @require_api_key
 def get_statistics():
     """Get overall statistics about the NAV data"""
@@ -921,8 +1337,8 @@ def get_statistics():
             active_series = session.query(Series).filter(
                 Series.status == SeriesStatus.ACTIVE).count()
 
-            # Get NAV statistics
-            nav_stats = processor.db_manager.verify_nav_entries()
+            # Get NAV statistics from the maintained summary
+            nav_stats = get_nav_entry_summary(session)
 
             response = {
                 'status': 'success',
@@ -958,7 +1374,7 @@ def get_statistics():
         }), 500
 
 
-@app.route('/series-qualitative/changes', methods=['POST'])
+@bp.route('/series-qualitative/changes', methods=['POST'])
 @require_api_key
 def detect_series_changes():
     """Compare a new series qualitative data file with the master file and detect changes"""
@@ -1031,7 +1447,7 @@ def detect_series_changes():
         }), 500
 
 
-@app.route('/series-qualitative/update', methods=['POST'])
+@bp.route('/series-qualitative/update', methods=['POST'])
 @require_api_key
 def update_series_master():
     """Update the master series qualitative data file with a new version"""
@@ -1087,7 +1503,7 @@ def update_series_master():
         }), 500
 
 
-@app.route('/')
+@bp.route('/')
 def index():
     return """
     <!DOCTYPE html>
@@ -2995,7 +3411,13 @@ def index():
     """
 
 
-@app.errorhandler(Exception)
+@bp.after_app_request
+def compress(response):
+    """Compress large responses for clients that accept gzip or brotli"""
+    return compress_response(response, request, DEFAULT_COMPRESS_MIN_BYTES)
+
+
+@bp.app_errorhandler(Exception)
 def handle_error(error):
     """Global error handler"""
     response = {
@@ -3004,13 +3426,43 @@ def handle_error(error):
         'type': error.__class__.__name__
     }
 
-    if app.debug:
+    if current_app.debug:
         response['traceback'] = traceback.format_exc()
 
     return jsonify(response), 500
 
 
-@app.route('/trades', methods=['GET'])
+# Columns read for /trades; rows are formatted straight from these tuples
+TRADE_COLUMNS = (Trade.id, Trade.series_number, Trade.trade_date, Trade.trade_type,
+                 Trade.security_type, Trade.security_name, Trade.security_id,
+                 Trade.quantity, Trade.price, Trade.currency, Trade.trade_value,
+                 Trade.broker, Trade.account, Trade.source_folder,
+                 Trade.settlement_date, Trade.source_file)
+
+
+def format_trade(trade) -> dict:
+    """API representation of a TRADE_COLUMNS row"""
+    return {
+        'id': trade.id,
+        'series_number': trade.series_number,
+        'trade_date': trade.trade_date.isoformat() if trade.trade_date else None,
+        'trade_type': trade.trade_type,
+        'security_type': trade.security_type,
+        'security_name': trade.security_name,
+        'security_id': trade.security_id,
+        'quantity': trade.quantity,
+        'price': trade.price,
+        'currency': trade.currency,
+        'trade_value': trade.trade_value,
+        'broker': trade.broker,
+        'account': trade.account,
+        'source_folder': trade.source_folder,
+        'settlement_date': trade.settlement_date.isoformat() if trade.settlement_date else None,
+        'source_file': trade.source_file
+    }
+
+
+@bp.route('/trades', methods=['GET'])
 @require_api_key
 def get_trades():
     """Get paginated trade data with filtering options"""
@@ -3018,6 +3470,8 @@ def get_trades():
         # Get query parameters
         page = int(request.args.get('page', 1))
         per_page = int(request.args.get('per_page', 50))
+        cursor = request.args.get('cursor')
+        count = parse_count_mode(request.args.get('count'), cursor)
         series_number = request.args.get('series_number')
         start_date = request.args.get('start_date')
         end_date = request.args.get('end_date')
@@ -3033,7 +3487,7 @@ def get_trades():
         # Use our reliable session helper
         session = get_reliable_session()
         try:
-            query = session.query(Trade)
+            query = session.query(*TRADE_COLUMNS)
 
             # Apply filters
             if series_number:
@@ -3047,67 +3501,43 @@ def get_trades():
             if trade_type:
                 query = query.filter(Trade.trade_type == trade_type)
 
-            # Get total count
-            total = query.count()
-
             # Apply pagination
-            trades = query.order_by(Trade.trade_date.desc())\
-                .offset((page - 1) * per_page)\
-                .limit(per_page)\
-                .all()
-
-            # Convert trades to safe dictionaries
-            trade_data = []
-            for trade in trades:
-                # Safely get attributes
-                trade_dict = {
-                    'id': getattr(trade, 'id', None),
-                    'series_number': getattr(trade, 'series_number', None),
-                    'trade_date': getattr(trade, 'trade_date', None).strftime('%Y-%m-%d') if getattr(trade, 'trade_date', None) else None,
-                    'trade_type': getattr(trade, 'trade_type', None),
-                    'security_type': getattr(trade, 'security_type', None),
-                    'security_name': getattr(trade, 'security_name', None),
-                    'security_id': getattr(trade, 'security_id', None),
-                    'quantity': getattr(trade, 'quantity', None),
-                    'price': getattr(trade, 'price', None),
-                    'currency': getattr(trade, 'currency', None),
-                    'trade_value': getattr(trade, 'trade_value', None),
-                    'broker': getattr(trade, 'broker', None),
-                    'account': getattr(trade, 'account', None),
-                    'source_folder': getattr(trade, 'source_folder', None)
-                }
-
-                # Handle nullable date fields
-                settlement_date = getattr(trade, 'settlement_date', None)
-                if settlement_date:
-                    trade_dict['settlement_date'] = settlement_date.strftime(
-                        '%Y-%m-%d')
-                else:
-                    trade_dict['settlement_date'] = None
+            keyset = [Trade.trade_date, Trade.id]
+            if cursor is not None:
+                trades, next_cursor = paginate_keyset(
+                    query, keyset, lambda trade: (trade.trade_date, trade.id),
+                    per_page, cursor, descending=True)
+            else:
+                trades, next_cursor = paginate_offset(
+                    query, keyset, lambda trade: (trade.trade_date, trade.id),
+                    page, per_page, descending=True)
 
-                # Special handling for source_file attribute which might be missing in some DB versions
-                try:
-                    trade_dict['source_file'] = trade.source_file
-                except (AttributeError, KeyError):
-                    trade_dict['source_file'] = None
+            # Get total count; trade types have no maintained counts to estimate from
+            estimate = None if trade_type else \
+                lambda: estimate_trades(session, series_number, start_date, end_date,
+                                        security_type or None)
+            total = processor.db_manager.db_service.count_rows(
+                session, query, count,
+                ('trades', series_number, start_date, end_date, security_type, trade_type),
+                (TRADES,), estimate)
 
-                trade_data.append(trade_dict)
+            trade_data = [format_trade(trade) for trade in trades]
 
             response = {
                 'status': 'success',
                 'data': trade_data,
-                'pagination': {
-                    'current_page': page,
-                    'per_page': per_page,
-                    'total_pages': math.ceil(total / per_page),
-                    'total_entries': total
-                }
+                'pagination': build_pagination(page, per_page, cursor, next_cursor, total, count)
             }
 
             return jsonify(response), 200
         finally:
             session.close()
 
+    except PaginationError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
     except Exception as e:
         error_traceback = traceback.format_exc()
         print(f"Error in get_trades: {str(e)}")
@@ -3119,7 +3549,7 @@ def get_trades():
         }), 500
 
 
-@app.route('/trades/summary', methods=['GET'])
+@bp.route('/trades/summary', methods=['GET'])
 @require_api_key
 def get_trades_summary():
     """Get summary statistics about trades"""
@@ -3127,59 +3557,24 @@ def get_trades_summary():
         # Use our reliable session helper
         session = get_reliable_session()
         try:
-            # Get total trades
-            total_trades = session.query(Trade).count()
-
-            # Get trades by source folder
-            try:
-                trades_by_folder = session.query(
-                    Trade.source_folder,
-                    func.count(Trade.id)
-                ).group_by(Trade.source_folder).all()
-
-                folder_data = [
-                    {'folder': folder or 'Unknown', 'count': count}
-                    for folder, count in trades_by_folder
-                ]
-            except Exception as folder_error:
-                print(f"Error getting trades by folder: {str(folder_error)}")
-                folder_data = [
-                    {'folder': 'All Folders', 'count': total_trades}]
-
-            # Get trades by security type
-            try:
-                trades_by_security_type = session.query(
-                    Trade.security_type,
-                    func.count(Trade.id)
-                ).group_by(Trade.security_type).all()
-
-                security_type_data = [
-                    {'type': type_ or 'Unknown', 'count': count}
-                    for type_, count in trades_by_security_type
-                ]
-            except Exception as type_error:
-                print(
-                    f"Error getting trades by security type: {str(type_error)}")
-                security_type_data = [
-                    {'type': 'All Types', 'count': total_trades}]
-
-            # Get date range
-            try:
-                date_range = session.query(
-                    func.min(Trade.trade_date),
-                    func.max(Trade.trade_date)
-                ).first()
-
-                date_range_data = {
-                    'earliest': date_range[0].strftime('%Y-%m-%d') if date_range[0] else None,
-                    'latest': date_range[1].strftime('%Y-%m-%d') if date_range[1] else None
-                }
-            except Exception as date_error:
-                print(f"Error getting trade date range: {str(date_error)}")
-                date_range_data = {
-                    'earliest': None,
-                    'latest': None
-                }
+            # Read the maintained summary rather than scanning trades
+            summary = get_trade_summary(session)
+            total_trades = summary['total_trades']
+
+            folder_data = [
+                {'folder': folder or 'Unknown', 'count': count}
+                for folder, count in summary['by_folder'].items()
+            ]
+            security_type_data = [
+                {'type': type_ or 'Unknown', 'count': count}
+                for type_, count in summary['by_security_type'].items()
+            ]
+
+            earliest, latest = summary['date_range']['earliest'], summary['date_range']['latest']
+            date_range_data = {
+                'earliest': earliest.strftime('%Y-%m-%d') if earliest else None,
+                'latest': latest.strftime('%Y-%m-%d') if latest else None
+            }
 
             response = {
                 'status': 'success',
@@ -3206,7 +3601,7 @@ def get_trades_summary():
         }), 500
 
 
-@app.route('/series-qualitative/import-from-drive', methods=['POST'])
+@bp.route('/series-qualitative/import-from-drive', methods=['POST'])
 @require_api_key
 def import_series_qualitative_from_drive():
     """Import the most recent Series Qualitative Data file from Google Drive"""
@@ -3274,7 +3669,7 @@ def import_series_qualitative_from_drive():
         }), 500
 
 
-@app.route('/series-qualitative/confirm-update', methods=['POST'])
+@bp.route('/series-qualitative/confirm-update', methods=['POST'])
 @require_api_key
 def confirm_series_qualitative_update():
     """Confirm the update after reviewing changes from a Google Drive import"""
@@ -3329,5 +3724,28 @@ def confirm_series_qualitative_update():
         }), 500
 
 
+def create_app(config: Optional[AppConfig] = None) -> Flask:
+    """
+    Create the API app with its own state
+
+    Args:
+        config: Application settings; defaults to default_app_config()
+
+    Returns:
+        Flask app. Production servers create one per worker process through
+        wsgi.py; see gunicorn.conf.py.
+    """
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+
+    # Configure timeouts
+    app.config['TIMEOUT'] = 300  # 5 minutes timeout
+
+    app.extensions['nav_api'] = APIState(config or default_app_config())
+    app.register_blueprint(bp)
+    return app
+
+
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=int(os.getenv('PORT', 8080)))
+    # Single-process development server; see wsgi.py for production
+    create_app().run(host='0.0.0.0', port=int(os.getenv('PORT', 8080)))
@@ -0,0 +1,84 @@
+"""
+Benchmark JSON encoding and compression on the large list endpoints.
+
+Requests /nav-data and /trades through the Flask test client at several
+page sizes, once with Flask's standard-library JSON provider and once with
+FastJSONProvider, each uncompressed, gzipped and (with Brotli installed)
+brotli-compressed. Every request carries a unique query parameter so the
+response cache never answers it. Reports the mean time per request, which
+includes the queries, and the size on the wire.
+
+Usage:
+    python benchmark_serialization.py [--page-sizes 50,500,5000] [--repeat 20]
+"""
+import argparse
+import itertools
+import os
+import statistics
+import time
+
+from flask.json.provider import DefaultJSONProvider
+
+from api import create_app
+from serialization import FastJSONProvider, brotli_available, orjson_available
+
+ENDPOINTS = ['/nav-data', '/trades']
+
+
+def time_requests(client, path: str, headers: dict, repeat: int, counter) -> tuple:
+    """Mean milliseconds per request and the body size of the last one"""
+    timings = []
+    size = 0
+    for _ in range(repeat):
+        url = f"{path}&_bench={next(counter)}"
+        started = time.perf_counter()
+        response = client.get(url, headers=headers)
+        timings.append((time.perf_counter() - started) * 1000)
+        if response.status_code != 200:
+            raise RuntimeError(f"{url} returned {response.status_code}")
+        size = len(response.data)
+    return statistics.mean(timings), size
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark JSON encoding and compression of list endpoints')
+    parser.add_argument('--page-sizes', default='50,500,5000',
+                        help='Comma-separated per_page values (default: 50,500,5000)')
+    parser.add_argument('--repeat', type=int, default=20,
+                        help='Requests per measurement (default: 20)')
+    parser.add_argument('--api-key', default=os.getenv('API_KEY'),
+                        help='API key to send (defaults to API_KEY)')
+    args = parser.parse_args()
+
+    app = create_app()
+    client = app.test_client()
+    headers = {'X-API-Key': args.api_key} if args.api_key else {}
+    counter = itertools.count()
+
+    providers = [('stdlib', DefaultJSONProvider(app))]
+    if orjson_available():
+        providers.append(('orjson', FastJSONProvider(app)))
+    else:
+        print("orjson is not installed; only the stdlib encoder is measured")
+    encodings = ['identity', 'gzip'] + (['br'] if brotli_available() else [])
+
+    print(f"{'endpoint':<12} {'per_page':>8} {'encoder':<8} {'encoding':<9} "
+          f"{'ms/req':>8} {'bytes':>10}")
+    for path in ENDPOINTS:
+        for per_page in [int(size) for size in args.page_sizes.split(',')]:
+            url = f"{path}?per_page={per_page}"
+            # Warm the connection pool and caches outside the measurement
+            client.get(f"{url}&_bench=warmup", headers=headers)
+            for provider_name, provider in providers:
+                app.json = provider
+                for encoding in encodings:
+                    request_headers = dict(headers, **{'Accept-Encoding': encoding})
+                    mean_ms, size = time_requests(
+                        client, url, request_headers, args.repeat, counter)
+                    print(f"{path:<12} {per_page:>8} {provider_name:<8} {encoding:<9} "
+                          f"{mean_ms:>8.1f} {size:>10}")
+
+
+if __name__ == '__main__':
+    main()
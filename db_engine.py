@@ -0,0 +1,101 @@
+import logging
+import threading
+from typing import Dict, Optional
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import QueuePool
+from config import DatabaseConfig, DEFAULT_DB_CONNECTION_STRING
+
+logger = logging.getLogger(__name__)
+
+# Engines shared by every module in the process, keyed by connection string
+_engines: Dict[str, Engine] = {}
+_engines_lock = threading.Lock()
+
+
+def _is_memory_sqlite(connection_string: str) -> bool:
+    """Check whether a connection string points at an in-memory SQLite database"""
+    url = make_url(connection_string)
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+
+def _configure_sqlite(engine: Engine, db_config: DatabaseConfig):
+    """
+    Apply the SQLite performance profile to every new connection.
+
+    WAL lets dashboard reads proceed while an ingest job is writing, and
+    busy_timeout makes writers wait for the lock instead of failing with
+    "database is locked".
+
+    pysqlite only emits BEGIN lazily before DML, so a SAVEPOINT issued first
+    starts (and its RELEASE commits) a transaction of its own. Emitting BEGIN
+    ourselves keeps nested savepoints inside the outer transaction.
+    """
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute(
+                f"PRAGMA journal_mode={db_config.sqlite_journal_mode}")
+            cursor.execute(
+                f"PRAGMA synchronous={db_config.sqlite_synchronous}")
+            cursor.execute(
+                f"PRAGMA busy_timeout={int(db_config.sqlite_busy_timeout_ms)}")
+            cursor.execute(f"PRAGMA mmap_size={int(db_config.sqlite_mmap_size)}")
+            cursor.execute(
+                f"PRAGMA cache_size={int(db_config.sqlite_cache_size)}")
+        finally:
+            cursor.close()
+
+    @event.listens_for(engine, "begin")
+    def _on_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+
+def get_engine(connection_string: str = DEFAULT_DB_CONNECTION_STRING,
+               db_config: Optional[DatabaseConfig] = None) -> Engine:
+    """
+    Get the shared engine for a connection string, creating it on first use
+
+    Args:
+        connection_string: SQLAlchemy database URL
+        db_config: Pool and SQLite settings. Only used when the engine is
+            created; later calls for the same URL return the existing engine.
+
+    Returns:
+        SQLAlchemy Engine
+    """
+    with _engines_lock:
+        engine = _engines.get(connection_string)
+        if engine is not None:
+            return engine
+
+        db_config = db_config or DatabaseConfig()
+        engine_kwargs = {'pool_pre_ping': db_config.pool_pre_ping}
+        if not _is_memory_sqlite(connection_string):
+            # Explicit, since SQLAlchemy 1.4 gives file-backed SQLite a
+            # NullPool, which rejects the sizing arguments
+            engine_kwargs.update(
+                poolclass=QueuePool,
+                pool_size=db_config.pool_size,
+                max_overflow=db_config.max_overflow,
+                pool_timeout=db_config.pool_timeout,
+                pool_recycle=db_config.pool_recycle
+            )
+
+        engine = create_engine(connection_string, **engine_kwargs)
+        if engine.dialect.name == 'sqlite':
+            _configure_sqlite(engine, db_config)
+
+        logger.debug(f"Created database engine for {engine.url!r}")
+        _engines[connection_string] = engine
+        return engine
+
+
+def dispose_engines():
+    """Dispose every shared engine, e.g. after forking a worker process"""
+    with _engines_lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
@@ -1,10 +1,10 @@
 import logging
-from typing import Dict, List, Tuple, Optional, Set, Any
+from typing import Dict, List, Tuple, Optional, Set, Any, Iterator
 import pandas as pd
 from datetime import datetime
-from sqlalchemy import func
+from sqlalchemy import func, cast, String
 from models import Series, SeriesStatus, NAVEntry
-from db_service import DatabaseService
+from db_service import DatabaseService, normalize_nav_frame
 from config import AppConfig
 
 logger = logging.getLogger(__name__)
@@ -21,7 +21,8 @@ class DBManager:
             config: Application configuration
         """
         self.config = config
-        self.db_service = DatabaseService(config.db_connection_string)
+        self.db_service = DatabaseService(
+            config.db_connection_string, config.db_config, config.nav_store_dir)
 
     def get_series_by_isins(self, isins: Set[str]) -> Dict[str, Series]:
         """
@@ -52,7 +53,7 @@ class DBManager:
         frequency = frequency.upper()
         with self.db_service.SessionMaker() as session:
             return [r[0] for r in session.query(Series.isin)
-                    .filter(func.upper(Series.nav_frequency) == frequency)
+                    .filter(func.upper(cast(Series.nav_frequency, String)) == frequency)
                     .filter(Series.status == SeriesStatus.ACTIVE)
                     .all()]
 
@@ -73,6 +74,32 @@ class DBManager:
                     .filter(Series.status == SeriesStatus.ACTIVE)
                     .all()]
 
+    def get_emitters_by_isin(self, isins: Set[str]) -> Dict[str, Set[str]]:
+        """
+        Emitters that have published NAVs for each of the given ISINs
+
+        Read from nav_entries itself through the (isin, nav_date) index, so
+        the cost follows the history of the given ISINs. The maintained group
+        counts are not used: if they were stale, an emitter that does publish
+        an ISIN could be skipped and its rows dropped. Entries with no
+        emitter are left out.
+
+        Args:
+            isins: Set of ISINs to look up
+
+        Returns:
+            Dictionary of emitter sets keyed by ISIN; ISINs never seen are absent
+        """
+        emitters_by_isin: Dict[str, Set[str]] = {}
+        with self.db_service.SessionMaker() as session:
+            rows = session.query(NAVEntry.isin, NAVEntry.emitter)\
+                .filter(NAVEntry.isin.in_(isins))\
+                .filter(NAVEntry.emitter != '')\
+                .distinct()
+            for isin, emitter in rows:
+                emitters_by_isin.setdefault(isin, set()).add(emitter)
+        return emitters_by_isin
+
     def get_target_isins(self, isin_filter) -> Optional[Set[str]]:
         """
         Process ISIN filters and return target ISINs
@@ -133,21 +160,42 @@ class DBManager:
             distribution_type: Type of distribution
 
         Returns:
-            Tuple of (added_count, duplicates_count, invalids_count)
+            Tuple of (added_count, duplicates_count, invalids_count); invalids
+            include rows the database failed to write
         """
         total_added = 0
         total_duplicates = 0
         total_invalids = 0
 
+        # Normalize every frame once before touching the database
+        normalized_dfs = []
         for emitter, df in nav_dfs:
+            normalized, rejected = normalize_nav_frame(df)
+            if not rejected.empty:
+                logger.warning(
+                    f"{emitter}: Rejected {len(rejected)} rows with unparseable ISIN, NAV or date")
+                logger.debug(f"{emitter} rejected rows:\n{rejected}")
+            normalized_dfs.append((emitter, normalized))
+
+        # Load existing keys once for the ISINs and dates in this batch
+        snapshot = self.db_service.load_nav_key_snapshot(
+            [df for _, df in normalized_dfs])
+        logger.info(
+            f"Duplicate check examined {snapshot.keys_examined} existing NAV keys")
+
+        for emitter, df in normalized_dfs:
             if not df.empty:
                 logger.info(f"Processing {emitter} data: {len(df)} entries")
 
-                added, duplicates, invalids = self.db_service.save_nav_entries(
-                    df, distribution_type, emitter)
+                result = self.db_service.save_nav_entries(
+                    df, distribution_type, emitter, snapshot)
+                added = result.added_count
                 total_added += added
-                total_duplicates += duplicates
-                total_invalids += invalids
+                total_duplicates += result.duplicates_count
+                total_invalids += result.invalid_series_count + result.failed_count
+
+                if result.failed_count:
+                    logger.error(f"{emitter}: Failed to write {result.failed_count} entries")
 
                 if added > 0:
                     logger.info(f"{emitter}: Added {added} entries")
@@ -161,7 +209,8 @@ class DBManager:
 
     def get_nav_history(self, isin: Optional[str] = None, start_date: Optional[datetime] = None,
                         end_date: Optional[datetime] = None, page: int = 1, per_page: int = 50,
-                        series_number: Optional[str] = None) -> Dict[str, Any]:
+                        series_number: Optional[str] = None, cursor: Optional[str] = None,
+                        count: Optional[str] = None) -> Dict[str, Any]:
         """
         Get NAV history for a specific ISIN or series number within a date range with pagination
 
@@ -172,9 +221,11 @@ class DBManager:
             page: Page number (1-based)
             per_page: Number of entries per page
             series_number: Optional series number to filter by
+            cursor: Optional keyset cursor; see DatabaseService.get_nav_history
+            count: Optional count mode (exact, estimate or none)
 
         Returns:
-            Dict containing entries, total_pages, and total_entries
+            Dict containing entries, total_pages, total_entries and next_cursor
         """
         try:
             nav_entries = self.db_service.get_nav_history(
@@ -183,7 +234,9 @@ class DBManager:
                 end_date=end_date,
                 page=page,
                 per_page=per_page,
-                series_number=series_number
+                series_number=series_number,
+                cursor=cursor,
+                count=count
             )
             logger.info(
                 f"Retrieved NAV entries for query: ISIN={isin}, series_number={series_number}, results: {len(nav_entries['entries'])}")
@@ -192,6 +245,32 @@ class DBManager:
             logger.error(f"Error retrieving NAV history: {str(e)}")
             raise
 
+    def iter_nav_export(self, isin: Optional[str] = None, start_date: Optional[datetime] = None,
+                        end_date: Optional[datetime] = None, series_number: Optional[str] = None,
+                        emitter: Optional[str] = None) -> Iterator[List[Tuple]]:
+        """
+        Stream NAV entries for a bulk export; see DatabaseService.iter_nav_export
+
+        Args:
+            isin: Optional ISIN to filter by
+            start_date: Optional start date for filtering
+            end_date: Optional end date for filtering
+            series_number: Optional series number to filter by
+            emitter: Optional emitter to filter by
+
+        Returns:
+            Iterator over chunks of NAV row tuples
+        """
+        logger.info(
+            f"Exporting NAV entries: ISIN={isin}, series_number={series_number}, emitter={emitter}")
+        return self.db_service.iter_nav_export(
+            isin=isin,
+            start_date=start_date,
+            end_date=end_date,
+            series_number=series_number,
+            emitter=emitter
+        )
+
     def import_historic_data(self, excel_path: str) -> Tuple[int, int]:
         """
         Import historic NAV data from Excel file
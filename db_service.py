@@ -1,34 +1,268 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, update
+from sqlalchemy import and_, update, text, event, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import SQLAlchemyError
+import numpy as np
 import pandas as pd
-from datetime import datetime
-from typing import List, Optional, Dict, Any, Tuple, NamedTuple
-from models import NAVEntry, init_db, Series
+from dataclasses import dataclass, field
+from datetime import datetime, date
+from typing import List, Optional, Dict, Any, Tuple, NamedTuple, Iterator, Callable, Sequence, Set
+from openpyxl import load_workbook
+from openpyxl.utils import column_index_from_string
+from models import NAVEntry, NAVEntryCount, init_db, Series, ImportCheckpoint
+from config import DatabaseConfig, DEFAULT_DB_CONNECTION_STRING, DEFAULT_NAV_STORE_DIR
+from pg_copy import copy_records
+from pagination import (paginate_keyset, paginate_offset, parse_count_mode, CountCache,
+                        decode_cursor, encode_cursor, COUNT_ESTIMATE, COUNT_NONE)
+from nav_timeseries_store import NAVPoint, NAVTimeSeriesStore, to_datetime64
+from table_stats import (apply_nav_entry_changes, bump_data_version, ensure_row_counts,
+                         estimate_nav_entries, get_data_versions,
+                         NAV_ENTRIES, SERIES)
+import hashlib
 import math
+from itertools import groupby
+from operator import itemgetter
 from sqlalchemy.sql import func
 
+# Date format of string 'Valuation Period-End Date' values. Frames from the
+# FTP collector and the historic workbooks already carry parsed datetimes;
+# strings come from CSVs written back out by pandas.
+NAV_DATE_FORMAT = 'ISO8601'
+
+# Typed columns handed to the NAV writer
+NAV_COLUMNS = ['isin', 'nav_date', 'nav_value']
+
+# nav_entries columns loaded through COPY on PostgreSQL
+NAV_COPY_COLUMNS = ['isin', 'series_number', 'nav_date',
+                    'nav_value', 'distribution_type', 'emitter']
+
+# Session.info key for NAV rows waiting to be merged into the store on commit
+NAV_STORE_PENDING = 'nav_store_pending'
+
+# Sheets of the "NAVs Historical Prices" workbooks and the columns they use
+HISTORIC_SHEET_CONFIGS = {
+    'Weekly': {'type': 'weekly', 'usecols': 'E:BY'},
+    'Monthly': {'type': 'monthly', 'usecols': 'E:EU'},
+    'Daily': {'type': 'daily', 'usecols': 'E:F'}
+}
+
+# Row holding the ISIN header; data starts on the next row
+HISTORIC_ISIN_ROW = 6
+
+
+def normalize_nav_frame(nav_df: pd.DataFrame,
+                        date_format: str = NAV_DATE_FORMAT) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Turn a raw NAV frame into typed columns for the database writer.
+
+    Args:
+        nav_df: DataFrame with ISIN, NAV and 'Valuation Period-End Date' columns
+        date_format: Format used to parse dates that are not already datetimes
+
+    Returns:
+        Tuple of (normalized, rejected) where normalized has string 'isin',
+        date 'nav_date' and float 'nav_value' columns, and rejected holds the
+        original rows whose ISIN, NAV or date could not be parsed
+    """
+    nav_dates = nav_df['Valuation Period-End Date']
+    if not pd.api.types.is_datetime64_any_dtype(nav_dates):
+        nav_dates = pd.to_datetime(
+            nav_dates, format=date_format, errors='coerce')
+
+    nav_values = nav_df['NAV']
+    if not pd.api.types.is_numeric_dtype(nav_values):
+        # Handle thousands separators in text values
+        nav_values = pd.to_numeric(
+            nav_values.astype(str).str.replace(',', '', regex=False),
+            errors='coerce')
+
+    isins = nav_df['ISIN'].astype('string').str.strip()
+
+    parsed = nav_dates.notna() & nav_values.notna() & isins.notna() & (isins != '')
+    normalized = pd.DataFrame({
+        'isin': isins[parsed].astype(str),
+        'nav_date': nav_dates[parsed].dt.date,
+        'nav_value': nav_values[parsed].astype(float)
+    }).reset_index(drop=True)
+
+    return normalized, nav_df[~parsed]
+
+
+def _file_sha256(path: str) -> str:
+    """Return the SHA-256 hex digest of a file, read in blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
 
 class ImportResult(NamedTuple):
     added_count: int
     duplicates_count: int
     invalid_series_count: int
+    # Rows of chunks the database rejected, e.g. on a lock timeout
+    failed_count: int = 0
 
     def __str__(self):
         return (f"Import Results:\n"
                 f"  Added entries: {self.added_count}\n"
                 f"  Duplicate entries skipped: {self.duplicates_count}\n"
-                f"  Invalid series skipped: {self.invalid_series_count}")
+                f"  Invalid series skipped: {self.invalid_series_count}\n"
+                f"  Failed entries: {self.failed_count}")
+
+
+@dataclass
+class NAVKeySnapshot:
+    """
+    Existing NAV keys for the ISINs and date range of an import batch.
+
+    Built once per import and shared across emitters; rows written during the
+    import are recorded so later emitters see them without re-querying.
+    """
+    # isin -> series_number for every ISIN in the batch that has a Series
+    series_numbers: Dict[str, Optional[str]] = field(default_factory=dict)
+    # (isin, nav_date) -> emitter currently stored for that key
+    existing_entries: Dict[Tuple[str, date], Optional[str]] = field(
+        default_factory=dict)
+    # Number of existing (isin, nav_date) keys read from nav_entries
+    keys_examined: int = 0
+
+    def record(self, entries: List[Dict[str, Any]]):
+        """Record rows that now exist in nav_entries"""
+        for entry in entries:
+            self.existing_entries[(entry['isin'], entry['nav_date'])] = entry['emitter']
 
 
 class DatabaseService:
-    def __init__(self, connection_string='sqlite:///nav_data.db'):
-        """Initialize database service with connection string"""
-        self.SessionMaker = init_db(connection_string)
+    # Rows per INSERT ... ON CONFLICT statement
+    BULK_CHUNK_SIZE = 500
+    # Minimum batch size for COPY-based loading on PostgreSQL
+    COPY_THRESHOLD = 1000
+
+    def __init__(self, connection_string=DEFAULT_DB_CONNECTION_STRING, db_config: Optional[DatabaseConfig] = None,
+                 nav_store_dir: Optional[str] = DEFAULT_NAV_STORE_DIR):
+        """
+        Initialize database service with connection string, optional pool/SQLite
+        settings and the NAV time series store directory (None disables it)
+        """
+        self.SessionMaker = init_db(connection_string, db_config)
+        # Exact list totals, keyed by filter signature and data version
+        self.count_cache = CountCache()
+
+        with self.SessionMaker() as session:
+            if ensure_row_counts(session):
+                session.commit()
+
+        # Memory-mapped per-ISIN history, merged with NAV rows as they commit
+        self.nav_store = NAVTimeSeriesStore(nav_store_dir) if nav_store_dir else None
+        if self.nav_store is not None:
+            event.listen(self.SessionMaker, 'after_commit', self._sync_nav_store)
+            event.listen(self.SessionMaker, 'after_rollback',
+                         self._discard_nav_store_changes)
+
+    def _track_nav_store_changes(self, session: Session, entries: List[Dict[str, Any]],
+                                 changed_isins: Set[str]):
+        """
+        Remember the dates written in this transaction for the ISINs whose
+        change version it incremented, and how many times it did so
+        """
+        if self.nav_store is None:
+            return
+        pending = session.info.setdefault(NAV_STORE_PENDING, {})
+        for isin in changed_isins:
+            low, high, bumps = pending.get(isin, (date.max, date.min, 0))
+            pending[isin] = (low, high, bumps + 1)
+        for entry in entries:
+            if entry['isin'] in changed_isins:
+                low, high, bumps = pending[entry['isin']]
+                pending[entry['isin']] = (
+                    min(low, entry['nav_date']), max(high, entry['nav_date']), bumps)
+
+    def _discard_nav_store_changes(self, session: Session):
+        session.info.pop(NAV_STORE_PENDING, None)
+
+    def _sync_nav_store(self, session: Session):
+        """
+        after_commit hook: merge the NAV rows a transaction wrote into the
+        time series store.
+
+        The rows are read back rather than taken from the batch, so the store
+        holds exactly what the upsert kept. A file is only merged into when it
+        is at the change version this transaction started from; otherwise
+        another writer changed the ISIN and the file is left to be rebuilt.
+        """
+        pending = session.info.pop(NAV_STORE_PENDING, None)
+        if not pending:
+            return
+
+        start_date = min(low for low, _, _ in pending.values())
+        end_date = max(high for _, high, _ in pending.values())
+        try:
+            with self.SessionMaker() as read_session:
+                versions = dict(
+                    read_session.query(NAVEntryCount.isin, NAVEntryCount.change_version)
+                    .filter(NAVEntryCount.isin.in_(list(pending)))
+                )
+                rows = (
+                    read_session.query(
+                        NAVEntry.isin, NAVEntry.id, NAVEntry.nav_date, NAVEntry.nav_value,
+                        NAVEntry.emitter, NAVEntry.distribution_type)
+                    .filter(NAVEntry.isin.in_(list(pending)),
+                            NAVEntry.nav_date >= start_date,
+                            NAVEntry.nav_date <= end_date)
+                    .order_by(NAVEntry.isin, NAVEntry.nav_date)
+                    .all()
+                )
+            for isin, isin_rows in groupby(rows, key=itemgetter(0)):
+                version = versions.get(isin, 0)
+                self.nav_store.merge(isin, [row[1:] for row in isin_rows],
+                                     version - pending[isin][2], version)
+        except Exception as e:
+            # Reads rebuild an ISIN's file from the database when it is stale
+            print(f"Failed to update NAV time series store: {str(e)}")
+
+    def _rebuild_nav_store_isin(self, session: Session, isin: str, version: int):
+        """Rewrite an ISIN's store file from all its database rows, read at version"""
+        rows = (
+            session.query(NAVEntry.id, NAVEntry.nav_date, NAVEntry.nav_value,
+                          NAVEntry.emitter, NAVEntry.distribution_type)
+            .filter(NAVEntry.isin == isin)
+            .all()
+        )
+        self.nav_store.replace(isin, rows, version)
+
+    def count_rows(self, session: Session, query, count_mode: str, signature: Tuple,
+                   version_names: Sequence[str], estimate: Optional[Callable[[], int]] = None) -> Optional[int]:
+        """
+        Total for a paginated listing according to its `count` mode.
+
+        Args:
+            session: Session the query is bound to
+            query: Filtered query to count exactly
+            count_mode: 'exact', 'estimate' or 'none'
+            signature: Hashable description of the listing and its filters
+            version_names: Data versions whose bump invalidates the count
+            estimate: Cheap estimator; exact counts are used when missing
+
+        Returns:
+            The total, or None for 'none'
+        """
+        if count_mode == COUNT_NONE:
+            return None
+        if count_mode == COUNT_ESTIMATE and estimate is not None:
+            return estimate()
+        versions = get_data_versions(session, version_names)
+        return self.count_cache.get_or_compute((signature, versions), query.count)
 
     def fix_missing_series_numbers(self) -> Dict[str, Any]:
         """
         Fix NAV entries with missing series numbers by updating them from their corresponding Series.
 
+        save_nav_entries writes series_number with each row, so this is only
+        needed for rows stored before that, or before their Series existed.
+
         Returns:
             Dict containing statistics about the fix operation
         """
@@ -223,121 +457,271 @@ class DatabaseService:
                 'missing_series_details': missing_series_info
             }
 
-    def save_nav_entries(self, nav_df: pd.DataFrame, distribution_type: str, emitter: str) -> ImportResult:
+    def load_nav_key_snapshot(self, nav_dfs: List[pd.DataFrame]) -> NAVKeySnapshot:
         """
-        Save NAV entries from DataFrame to database
+        Load the existing NAV keys relevant to a batch of incoming frames.
+
+        Only the ISINs and the date range present in the frames are queried,
+        so the cost follows the size of the batch rather than the history.
+
+        Args:
+            nav_dfs: Frames produced by normalize_nav_frame
 
         Returns:
-            ImportResult containing counts of added, duplicate, and invalid entries
+            NAVKeySnapshot for the batch
         """
+        snapshot = NAVKeySnapshot()
+        frames = [df for df in nav_dfs if not df.empty]
+        if not frames:
+            return snapshot
+
+        combined = pd.concat([df[NAV_COLUMNS] for df in frames])
+        isins = set(combined['isin'].unique())
+        start_date, end_date = combined['nav_date'].min(), combined['nav_date'].max()
+
         with self.SessionMaker() as session:
-            # Get all valid ISINs from the series table
-            valid_isins = set(isin[0]
-                              for isin in session.query(Series.isin).all())
+            snapshot.series_numbers = dict(
+                session.query(Series.isin, Series.series_number)
+                .filter(Series.isin.in_(isins)).all())
 
-            # First, get existing entries to avoid duplicates (check ISIN, date, AND emitter)
-            existing_entries = set()
-            for entry in session.query(NAVEntry.isin, NAVEntry.nav_date, NAVEntry.emitter).all():
-                existing_entries.add(
-                    (entry.isin, entry.nav_date, entry.emitter))
+            for isin, nav_date, emitter in session.query(
+                    NAVEntry.isin, NAVEntry.nav_date, NAVEntry.emitter)\
+                    .filter(NAVEntry.isin.in_(isins))\
+                    .filter(NAVEntry.nav_date.between(start_date, end_date)):
+                snapshot.existing_entries[(isin, nav_date)] = emitter
+                snapshot.keys_examined += 1
 
-            entries_to_add = []
-            duplicates_count = 0
-            invalid_series_count = 0
+        return snapshot
 
-            for _, row in nav_df.iterrows():
-                try:
-                    nav_date = pd.to_datetime(
-                        row['Valuation Period-End Date']).date()
-                    isin = row['ISIN']
-                    entry_key = (isin, nav_date, emitter)
-
-                    # Skip if entry already exists
-                    if entry_key in existing_entries:
-                        duplicates_count += 1
-                        continue
+    def _nav_upsert_statement(self, session: Session, rows: List[Dict[str, Any]]):
+        """
+        Build a multi-row INSERT ... ON CONFLICT against uix_nav_entry_isin_date.
 
-                    # Skip if series doesn't exist
-                    if isin not in valid_isins:
-                        invalid_series_count += 1
-                        continue
+        A conflicting row is overwritten only when it came from a different
+        emitter; rows already stored for the same emitter are left untouched,
+        so they do not count towards the statement's rowcount.
+        """
+        dialect = session.get_bind().dialect.name
+        if dialect == 'postgresql':
+            stmt = pg_insert(NAVEntry).values(rows)
+        elif dialect == 'sqlite':
+            stmt = sqlite_insert(NAVEntry).values(rows)
+        else:
+            raise NotImplementedError(
+                f"Bulk NAV upsert is not supported for dialect '{dialect}'")
+
+        return stmt.on_conflict_do_update(
+            index_elements=[NAVEntry.isin, NAVEntry.nav_date],
+            set_={
+                'nav_value': stmt.excluded.nav_value,
+                'distribution_type': stmt.excluded.distribution_type,
+                'emitter': stmt.excluded.emitter,
+                'series_number': stmt.excluded.series_number,
+            },
+            where=NAVEntry.emitter.is_distinct_from(stmt.excluded.emitter)
+        )
+
+    def _copy_upsert_nav_entries(self, session: Session, chunk: List[Dict[str, Any]]) -> int:
+        """
+        Upsert a chunk on PostgreSQL by COPYing it into a staging table.
 
-                    # Convert NAV value to float, handling any commas in the number
-                    nav_value = float(str(row['NAV']).replace(',', ''))
+        Applies the same overwrite rule as _nav_upsert_statement.
 
-                    entry = NAVEntry(
-                        isin=isin,
-                        nav_date=nav_date,
-                        nav_value=nav_value,
-                        distribution_type=distribution_type,
-                        emitter=emitter,
-                        series_number=None  # We'll update this in a second pass
-                    )
-                    entries_to_add.append(entry)
-                except Exception as e:
-                    print(
-                        f"Error processing row {isin} ({nav_date}): {str(e)}")
-                    continue
-
-            # Print concise summary
-            print(
-                f"Processing {emitter} data: {len(nav_df)} rows, {len(entries_to_add)} to add, {duplicates_count} duplicates, {invalid_series_count} invalid")
-
-            if entries_to_add:
-                # Skip bulk operations and go straight to individual processing
-                added_count = 0
-                for entry in entries_to_add:
-                    try:
-                        # Check if an entry with this ISIN and date already exists
-                        existing = session.query(NAVEntry).filter(
-                            NAVEntry.isin == entry.isin,
-                            NAVEntry.nav_date == entry.nav_date
-                        ).first()
-
-                        if existing:
-                            # If it exists but with a different emitter, update
-                            if existing.emitter != entry.emitter:
-                                existing.nav_value = entry.nav_value
-                                existing.distribution_type = entry.distribution_type
-                                existing.emitter = entry.emitter
-                                session.commit()
-                                added_count += 1
-                            else:
-                                # If it exists with the same emitter, skip
-                                duplicates_count += 1
-                        else:
-                            # If it doesn't exist, insert
-                            session.add(entry)
-                            session.commit()
-                            added_count += 1
-                    except Exception as e:
-                        session.rollback()
-                        print(
-                            f"Failed to process entry for ISIN {entry.isin}: {str(e)}")
-                        continue
+        Returns:
+            Number of rows inserted or overwritten
+        """
+        connection = session.connection()
+        connection.execute(text(
+            "CREATE TEMP TABLE IF NOT EXISTS nav_entries_staging ("
+            "isin VARCHAR(12), series_number VARCHAR(50), nav_date DATE, "
+            "nav_value DOUBLE PRECISION, distribution_type VARCHAR(20), "
+            "emitter VARCHAR(10)) ON COMMIT DELETE ROWS"))
+        connection.execute(text("TRUNCATE nav_entries_staging"))
+        copy_records(connection, 'nav_entries_staging', NAV_COPY_COLUMNS, chunk)
+
+        columns = ', '.join(NAV_COPY_COLUMNS)
+        result = connection.execute(text(
+            f"INSERT INTO nav_entries ({columns}, created_at) "
+            f"SELECT {columns}, timezone('utc', now()) FROM nav_entries_staging "
+            "ON CONFLICT (isin, nav_date) DO UPDATE SET "
+            "nav_value = excluded.nav_value, "
+            "distribution_type = excluded.distribution_type, "
+            "emitter = excluded.emitter, "
+            "series_number = excluded.series_number "
+            "WHERE nav_entries.emitter IS DISTINCT FROM excluded.emitter"))
+        return result.rowcount
+
+    def _upsert_nav_entries(self, session: Session, entries: List[Dict[str, Any]],
+                            snapshot: Optional[NAVKeySnapshot] = None,
+                            raise_errors: bool = False) -> Tuple[int, int, int]:
+        """
+        Write NAV rows in chunks inside the caller's transaction.
 
-                # Update series_number for the newly added entries
-                if added_count > 0:
-                    # Get the most recent entries
-                    new_entries = session.query(NAVEntry)\
-                        .filter(NAVEntry.emitter == emitter)\
-                        .order_by(NAVEntry.id.desc())\
-                        .limit(added_count)\
-                        .all()
-
-                    # Update series numbers
-                    series_info = {isin: number for isin, number in session.query(
-                        Series.isin, Series.series_number).all()}
-                    for entry in new_entries:
-                        entry.series_number = series_info.get(entry.isin)
+        Each chunk runs in its own SAVEPOINT, so a failing chunk is rolled back
+        and counted as failed without losing the chunks written before it.
+        With raise_errors the error is raised instead, for callers that must
+        not commit a partial write. The rows a chunk inserts or overwrites are
+        applied to the count tables in the same SAVEPOINT. Chunks that succeed
+        are recorded in the snapshot when one is given. On PostgreSQL, batches
+        of at least COPY_THRESHOLD rows are loaded with COPY.
 
-                    session.commit()
+        Returns:
+            Tuple of (written_count, skipped_count, failed_count)
+        """
+        written_count = 0
+        skipped_count = 0
+        failed_count = 0
 
-            result = ImportResult(
-                added_count=len(entries_to_add),
-                duplicates_count=duplicates_count,
-                invalid_series_count=invalid_series_count
-            )
+        # Large PostgreSQL loads (historic imports) go through COPY
+        use_copy = (session.get_bind().dialect.name == 'postgresql'
+                    and len(entries) >= self.COPY_THRESHOLD)
+
+        for start in range(0, len(entries), self.BULK_CHUNK_SIZE):
+            chunk = entries[start:start + self.BULK_CHUNK_SIZE]
+            try:
+                with session.begin_nested():
+                    # Rows stored under the chunk's keys before it is written,
+                    # locked so the deltas below match what the upsert changed
+                    stored = {
+                        (isin, nav_date): (emitter, stored_type)
+                        for isin, nav_date, emitter, stored_type in session.query(
+                            NAVEntry.isin, NAVEntry.nav_date,
+                            NAVEntry.emitter, NAVEntry.distribution_type)
+                        .filter(tuple_(NAVEntry.isin, NAVEntry.nav_date).in_(
+                            [(entry['isin'], entry['nav_date']) for entry in chunk]))
+                        .with_for_update()
+                    }
+                    if use_copy:
+                        written = self._copy_upsert_nav_entries(session, chunk)
+                    else:
+                        written = session.execute(
+                            self._nav_upsert_statement(session, chunk)).rowcount
+
+                    inserted, replaced = [], []
+                    for entry in chunk:
+                        key = (entry['isin'], entry['nav_date'])
+                        if key not in stored:
+                            inserted.append((entry['isin'], entry['distribution_type'],
+                                             entry['emitter'], entry['nav_date']))
+                        elif stored[key][0] != entry['emitter']:
+                            old_emitter, old_type = stored[key]
+                            replaced.append((entry['isin'], entry['nav_date'], old_type, old_emitter,
+                                             entry['distribution_type'], entry['emitter']))
+                    changed_isins = apply_nav_entry_changes(session, inserted, replaced)
+                written_count += written
+                self._track_nav_store_changes(session, chunk, changed_isins)
+                skipped_count += len(chunk) - written
+                if snapshot is not None:
+                    snapshot.record(chunk)
+            except SQLAlchemyError as e:
+                if raise_errors:
+                    raise
+                failed_count += len(chunk)
+                print(
+                    f"Failed to write NAV chunk of {len(chunk)} rows starting at {chunk[0]['isin']} ({chunk[0]['nav_date']}): {str(e)}")
+
+        return written_count, skipped_count, failed_count
+
+    def _write_nav_entries(self, session: Session, nav_df: pd.DataFrame, distribution_type: str,
+                           emitter: str, snapshot: Optional[NAVKeySnapshot] = None,
+                           raise_errors: bool = False) -> ImportResult:
+        """
+        Upsert NAV entries inside the caller's transaction without committing.
+
+        See save_nav_entries for the arguments and overwrite rules. With
+        raise_errors a failed chunk raises rather than being counted, so the
+        caller can roll back the whole write.
+        """
+        if not set(NAV_COLUMNS).issubset(nav_df.columns):
+            nav_df, rejected = normalize_nav_frame(nav_df)
+            if not rejected.empty:
+                print(
+                    f"Rejected {len(rejected)} {emitter} rows with unparseable ISIN, NAV or date")
+
+        if snapshot is None:
+            snapshot = self.load_nav_key_snapshot([nav_df])
+        series_numbers = snapshot.series_numbers
+        existing_entries = snapshot.existing_entries
+
+        # Repeated (isin, nav_date) rows collapse to the first one, which
+        # is the row a row-by-row insert would have kept, so a single
+        # upsert statement never touches the same key twice
+        deduplicated = nav_df.drop_duplicates(
+            subset=['isin', 'nav_date'], keep='first')
+        duplicates_count = len(nav_df) - len(deduplicated)
+
+        isins = deduplicated['isin'].tolist()
+        nav_dates = deduplicated['nav_date'].tolist()
+        nav_values = deduplicated['nav_value'].tolist()
+
+        # Skip entries already stored for this emitter, then entries
+        # whose series doesn't exist
+        is_duplicate = [(isin, nav_date) in existing_entries
+                        and existing_entries[(isin, nav_date)] == emitter
+                        for isin, nav_date in zip(isins, nav_dates)]
+        is_valid = [isin in series_numbers for isin in isins]
+        duplicates_count += sum(is_duplicate)
+        invalid_series_count = sum(
+            not duplicate and not valid for duplicate, valid in zip(is_duplicate, is_valid))
+
+        entries_to_add = [
+            {
+                'isin': isin,
+                'nav_date': nav_date,
+                'nav_value': nav_value,
+                'distribution_type': distribution_type,
+                'emitter': emitter,
+                'series_number': series_numbers[isin]
+            }
+            for isin, nav_date, nav_value, duplicate, valid
+            in zip(isins, nav_dates, nav_values, is_duplicate, is_valid)
+            if valid and not duplicate
+        ]
+
+        # Print concise summary
+        print(
+            f"Processing {emitter} data: {len(nav_df)} rows, {len(entries_to_add)} to add, {duplicates_count} duplicates, {invalid_series_count} invalid")
+
+        added_count = failed_count = 0
+        if entries_to_add:
+            # Bumped first so the transaction starts with a write
+            bump_data_version(session, NAV_ENTRIES)
+            added_count, skipped, failed_count = self._upsert_nav_entries(
+                session, entries_to_add, snapshot, raise_errors)
+            duplicates_count += skipped
+
+        return ImportResult(
+            added_count=added_count,
+            duplicates_count=duplicates_count,
+            invalid_series_count=invalid_series_count,
+            failed_count=failed_count
+        )
+
+    def save_nav_entries(self, nav_df: pd.DataFrame, distribution_type: str, emitter: str,
+                         snapshot: Optional[NAVKeySnapshot] = None) -> ImportResult:
+        """
+        Save NAV entries from DataFrame to database
+
+        All rows are written in a single transaction using a set-based upsert.
+        An existing entry for the same ISIN and date is overwritten when it
+        came from a different emitter and skipped when it came from the same one.
+
+        Args:
+            nav_df: Frame produced by normalize_nav_frame, or a raw frame with
+                ISIN, NAV and 'Valuation Period-End Date' columns which is
+                normalized here
+            distribution_type: Type of distribution
+            emitter: Emitter the rows came from
+            snapshot: Optional NAVKeySnapshot shared across several calls.
+                Loaded for this frame alone when not provided.
+
+        Returns:
+            ImportResult containing counts of added, duplicate, and invalid entries
+        """
+        with self.SessionMaker() as session:
+            result = self._write_nav_entries(
+                session, nav_df, distribution_type, emitter, snapshot)
+            session.commit()
             return result
 
     def get_nav_history(self, isin: Optional[str] = None,
@@ -345,31 +729,61 @@ class DatabaseService:
                         end_date: Optional[datetime] = None,
                         page: int = 1,
                         per_page: int = 50,
-                        series_number: Optional[str] = None) -> Dict[str, Any]:
+                        series_number: Optional[str] = None,
+                        cursor: Optional[str] = None,
+                        count: Optional[str] = None) -> Dict[str, Any]:
         """
         Get NAV history with pagination
 
+        Entries are ordered by nav_date then id, newest first. Passing a
+        cursor (an empty string for the first page) switches from page/offset
+        to keyset pagination, which reads each page straight from the index.
+
         Args:
             isin: Optional ISIN to filter by
             start_date: Optional start date for filtering
             end_date: Optional end date for filtering
-            page: Page number (1-based)
+            page: Page number (1-based), ignored when a cursor is given
             per_page: Number of entries per page
             series_number: Optional series number to filter by
+            cursor: Optional next_cursor from a previous page
+            count: 'exact' (cached per filters and data version), 'estimate'
+                (from the maintained per-ISIN counts) or 'none'. Defaults to
+                'exact' for pages and 'none' with a cursor.
 
         Returns:
             Dict containing:
-                - entries: List of NAVEntry objects for current page
-                - total_pages: Total number of pages
+                - entries: List of NAVPoints for the current page
+                - total_pages: Total number of pages (None without a count)
                 - total_entries: Total number of entries matching filters
+                  (None without a count)
+                - next_cursor: Cursor for the following page, None on the last
         """
+        count_mode = parse_count_mode(count, cursor)
+        # nav_date is a DATE; datetime bounds compare as text on SQLite and
+        # would drop entries on the start date
+        if isinstance(start_date, datetime):
+            start_date = start_date.date()
+        if isinstance(end_date, datetime):
+            end_date = end_date.date()
+
         with self.SessionMaker() as session:
-            # Build base query
-            query = session.query(NAVEntry)
+            if self.nav_store is not None and isin and not series_number:
+                result = self._nav_history_from_store(
+                    session, isin, start_date, end_date, page, per_page, cursor, count_mode)
+                if result is not None:
+                    return result
+
+            # Build base query; plain column tuples skip ORM object construction
+            query = session.query(NAVEntry.id, NAVEntry.isin, NAVEntry.nav_date,
+                                  NAVEntry.nav_value, NAVEntry.distribution_type,
+                                  NAVEntry.emitter)
+            estimate_isins = None
 
             # Apply filters
             if isin:
                 query = query.filter(NAVEntry.isin == isin)
+                estimate_isins = [isin]
             if series_number:
                 # First find all ISINs with this series number
                 series_isins = session.query(Series.isin).filter(
@@ -377,29 +791,42 @@ class DatabaseService:
                 if series_isins:
                     query = query.filter(NAVEntry.isin.in_(
                         [s[0] for s in series_isins]))
+                    estimate_isins = [s[0] for s in series_isins
+                                      if estimate_isins is None or s[0] in estimate_isins]
                 else:
                     # If no series found with this number, return empty result
                     return {
                         'entries': [],
                         'total_pages': 0,
-                        'total_entries': 0
+                        'total_entries': 0,
+                        'next_cursor': None
                     }
             if start_date:
                 query = query.filter(NAVEntry.nav_date >= start_date)
             if end_date:
                 query = query.filter(NAVEntry.nav_date <= end_date)
 
-            # Get total count for pagination
-            total_entries = query.count()
-            total_pages = math.ceil(total_entries / per_page)
+            keyset = [NAVEntry.nav_date, NAVEntry.id]
+            if cursor is not None:
+                entries, next_cursor = paginate_keyset(
+                    query, keyset, lambda entry: (entry.nav_date, entry.id),
+                    per_page, cursor, descending=True)
+            else:
+                entries, next_cursor = paginate_offset(
+                    query, keyset, lambda entry: (entry.nav_date, entry.id),
+                    page, per_page, descending=True)
 
-            # Get paginated results
-            entries = query.order_by(NAVEntry.nav_date.desc()) \
-                .offset((page - 1) * per_page) \
-                .limit(per_page) \
-                .all()
-
-            # Update series numbers from Series table
+            # Get total count for pagination
+            total_entries = self.count_rows(
+                session, query, count_mode,
+                ('nav_history', isin, series_number, start_date, end_date),
+                (NAV_ENTRIES, SERIES),
+                lambda: estimate_nav_entries(session, estimate_isins, start_date, end_date))
+            total_pages = math.ceil(total_entries / per_page) \
+                if total_entries is not None else None
+
+            # Take series numbers from the Series table
+            series_info = {}
             if entries:
                 # Get all unique ISINs from the entries
                 isins = {entry.isin for entry in entries}
@@ -409,17 +836,271 @@ class DatabaseService:
                     .filter(Series.isin.in_(isins))
                     .all()
                 )
-                # Update series numbers
-                for entry in entries:
-                    entry.series_number = series_info.get(entry.isin)
+            entries = [
+                NAVPoint(entry.id, entry.isin, series_info.get(entry.isin), entry.nav_date,
+                         entry.nav_value, entry.distribution_type, entry.emitter)
+                for entry in entries
+            ]
 
             return {
                 'entries': entries,
                 'total_pages': total_pages,
-                'total_entries': total_entries
+                'total_entries': total_entries,
+                'next_cursor': next_cursor
             }
 
-    def import_historic_data(self, excel_path: str) -> Dict[str, ImportResult]:
+    def _nav_history_from_store(self, session: Session, isin: str, start_date, end_date,
+                                page: int, per_page: int, cursor: Optional[str],
+                                count_mode: str) -> Optional[Dict[str, Any]]:
+        """
+        Serve a single-ISIN get_nav_history call from the time series store.
+
+        The date range is a binary search on the mapped nav_date column and
+        only the rows of the requested page become Python objects. The exact
+        total comes for free. The ISIN's file is rebuilt first if it does not
+        match the maintained count and change version, e.g. after writes by a
+        process without the store.
+
+        Returns:
+            The get_nav_history result, or None to fall back to the database
+        """
+        counts = session.get(NAVEntryCount, isin)
+        if counts is None:
+            return None
+        if not self.nav_store.is_current(isin, counts.entry_count, counts.first_nav_date,
+                                         counts.last_nav_date, counts.change_version):
+            self._rebuild_nav_store_isin(session, isin, counts.change_version)
+        series = self.nav_store.load(isin)
+        if series is None:
+            return None
+
+        start, stop = self.nav_store.date_range_bounds(
+            series, start_date, end_date)
+        total_entries = stop - start
+
+        # Newest first: pages are counted back from the end of the range
+        offset = 0
+        if cursor:
+            cursor_date, cursor_id = decode_cursor(
+                cursor, [NAVEntry.nav_date, NAVEntry.id])
+            cursor_date = to_datetime64(cursor_date)
+            position = int(np.searchsorted(
+                series.nav_dates, cursor_date, side='left'))
+            if position < series.length and series.nav_dates[position] == cursor_date \
+                    and series.ids[position] < cursor_id:
+                position += 1
+            stop = max(start, min(stop, position))
+        elif cursor is None:
+            offset = (page - 1) * per_page
+        page_stop = max(start, stop - offset)
+        page_start = max(start, page_stop - per_page)
+
+        series_number = session.query(Series.series_number) \
+            .filter(Series.isin == isin).scalar()
+        entries = series.slice(page_start, page_stop).points(
+            isin, series_number, newest_first=True)
+        next_cursor = encode_cursor((entries[-1].nav_date, entries[-1].id)) \
+            if entries and page_start > start else None
+
+        if count_mode == COUNT_NONE:
+            total_entries = None
+        return {
+            'entries': entries,
+            'total_pages': math.ceil(total_entries / per_page)
+            if total_entries is not None else None,
+            'total_entries': total_entries,
+            'next_cursor': next_cursor
+        }
+
+    def get_navs_as_of(self, as_of_date: date, isins: Optional[Sequence[str]] = None,
+                       series_numbers: Optional[Sequence[str]] = None,
+                       exact: bool = False) -> Dict[str, Any]:
+        """
+        Get the NAV of many ISINs as of a date in a single query.
+
+        ROW_NUMBER() over each ISIN's entries up to the date, newest first,
+        picks one row per ISIN; every partition is a backward range read of
+        the (isin, nav_date) unique index.
+
+        Args:
+            as_of_date: Date to look up
+            isins: ISINs to look up
+            series_numbers: Series numbers whose ISINs are looked up too
+            exact: Only return NAVs dated exactly as_of_date instead of the
+                latest on or before it
+
+        Returns:
+            Dict containing:
+                - navs: Dict of ISIN to its NAVPoint, for ISINs with a NAV
+                - series_isins: Dict of each requested series number to its ISINs
+        """
+        if isinstance(as_of_date, datetime):
+            as_of_date = as_of_date.date()
+        isins = set(isins or [])
+
+        with self.SessionMaker() as session:
+            series_isins = {series_number: [] for series_number in series_numbers or []}
+            if series_isins:
+                for isin, series_number in session.query(Series.isin, Series.series_number) \
+                        .filter(Series.series_number.in_(list(series_isins))):
+                    series_isins[series_number].append(isin)
+                    isins.add(isin)
+            if not isins:
+                return {'navs': {}, 'series_isins': series_isins}
+
+            date_filter = NAVEntry.nav_date == as_of_date if exact \
+                else NAVEntry.nav_date <= as_of_date
+            ranked = (
+                select(
+                    NAVEntry.id, NAVEntry.isin, NAVEntry.nav_date, NAVEntry.nav_value,
+                    NAVEntry.distribution_type, NAVEntry.emitter,
+                    func.row_number().over(
+                        partition_by=NAVEntry.isin,
+                        order_by=NAVEntry.nav_date.desc()
+                    ).label('row_number'))
+                .where(NAVEntry.isin.in_(list(isins)), date_filter)
+                .subquery()
+            )
+            statement = (
+                select(ranked.c.id, ranked.c.isin, Series.series_number,
+                       ranked.c.nav_date, ranked.c.nav_value,
+                       ranked.c.distribution_type, ranked.c.emitter)
+                .outerjoin(Series, Series.isin == ranked.c.isin)
+                .where(ranked.c.row_number == 1)
+            )
+            navs = {row.isin: NAVPoint(*row) for row in session.execute(statement)}
+
+        return {'navs': navs, 'series_isins': series_isins}
+
+    def iter_nav_export(self, isin: Optional[str] = None,
+                        start_date: Optional[datetime] = None,
+                        end_date: Optional[datetime] = None,
+                        series_number: Optional[str] = None,
+                        emitter: Optional[str] = None,
+                        chunk_size: int = 10000) -> Iterator[List[Tuple]]:
+        """
+        Stream NAV entries matching the get_nav_history filters in chunks.
+
+        Rows come from a server-side cursor (PostgreSQL) or a lazily stepped
+        statement (SQLite), so only one chunk is held in memory at a time.
+        The session stays open until the generator is exhausted or closed.
+
+        Yields:
+            Lists of (isin, series_number, nav_date, nav_value,
+            distribution_type, emitter) tuples ordered by ISIN then nav_date
+        """
+        if isinstance(start_date, datetime):
+            start_date = start_date.date()
+        if isinstance(end_date, datetime):
+            end_date = end_date.date()
+
+        statement = (
+            select(NAVEntry.isin, Series.series_number, NAVEntry.nav_date,
+                   NAVEntry.nav_value, NAVEntry.distribution_type, NAVEntry.emitter)
+            .outerjoin(Series, Series.isin == NAVEntry.isin)
+            .order_by(NAVEntry.isin, NAVEntry.nav_date)
+        )
+        if isin:
+            statement = statement.where(NAVEntry.isin == isin)
+        if series_number:
+            statement = statement.where(Series.series_number == series_number)
+        if emitter:
+            statement = statement.where(NAVEntry.emitter == emitter)
+        if start_date:
+            statement = statement.where(NAVEntry.nav_date >= start_date)
+        if end_date:
+            statement = statement.where(NAVEntry.nav_date <= end_date)
+
+        with self.SessionMaker() as session:
+            result = session.execute(
+                statement, execution_options={'yield_per': chunk_size})
+            for partition in result.partitions():
+                yield [tuple(row) for row in partition]
+
+    def _iter_historic_chunks(self, worksheet, usecols: str, chunk_rows: int,
+                              start_row: int = HISTORIC_ISIN_ROW + 1) -> Iterator[Tuple[int, pd.DataFrame]]:
+        """
+        Stream a wide historic sheet as long-format NAV chunks.
+
+        Row 6 holds the ISIN header and data starts on row 7, with dates in
+        the first column of usecols and one NAV column per ISIN after it.
+
+        Args:
+            worksheet: openpyxl worksheet opened in read-only mode
+            usecols: Excel column range to read, e.g. 'E:BY'
+            chunk_rows: Number of sheet rows per yielded chunk
+            start_row: First sheet row to read, used to resume an import
+
+        Yields:
+            Tuples of (last sheet row in the chunk, DataFrame with ISIN, NAV
+            and 'Valuation Period-End Date' columns). The frame may be empty
+            when a chunk holds no NAV values.
+        """
+        first_col, last_col = usecols.split(':')
+        min_col = column_index_from_string(first_col)
+        max_col = column_index_from_string(last_col)
+
+        header = next(worksheet.iter_rows(
+            min_row=HISTORIC_ISIN_ROW, max_row=HISTORIC_ISIN_ROW,
+            min_col=min_col, max_col=max_col, values_only=True), None)
+        if header is None:
+            return
+
+        # Positions of the ISIN columns (skip the first column which is 'Dates')
+        isin_columns = [
+            (position, str(isin).strip())
+            for position, isin in enumerate(header)
+            if position > 0 and isin is not None and str(isin).strip()
+        ]
+
+        rows = worksheet.iter_rows(
+            min_row=max(start_row, HISTORIC_ISIN_ROW + 1),
+            min_col=min_col, max_col=max_col, values_only=True)
+
+        nav_dates, isins, nav_values = [], [], []
+        row_number = None
+        for row_number, row in enumerate(rows, start=max(start_row, HISTORIC_ISIN_ROW + 1)):
+            nav_date = row[0]
+            if nav_date is not None:
+                for position, isin in isin_columns:
+                    nav_value = row[position] if position < len(row) else None
+                    if nav_value is None:
+                        continue
+                    nav_dates.append(nav_date)
+                    isins.append(isin)
+                    nav_values.append(nav_value)
+
+            if (row_number - start_row + 1) % chunk_rows == 0:
+                yield row_number, pd.DataFrame({
+                    'Valuation Period-End Date': nav_dates,
+                    'ISIN': isins,
+                    'NAV': nav_values
+                })
+                nav_dates, isins, nav_values = [], [], []
+
+        if row_number is not None and (row_number - start_row + 1) % chunk_rows != 0:
+            yield row_number, pd.DataFrame({
+                'Valuation Period-End Date': nav_dates,
+                'ISIN': isins,
+                'NAV': nav_values
+            })
+
+    def _get_import_checkpoint(self, session: Session, workbook_hash: str,
+                               sheet_name: str) -> ImportCheckpoint:
+        """Return the checkpoint for a workbook sheet, creating it if needed"""
+        checkpoint = session.query(ImportCheckpoint).filter(
+            ImportCheckpoint.workbook_hash == workbook_hash,
+            ImportCheckpoint.sheet_name == sheet_name
+        ).first()
+        if checkpoint is None:
+            checkpoint = ImportCheckpoint(
+                workbook_hash=workbook_hash, sheet_name=sheet_name,
+                last_row=0, completed=False)
+            session.add(checkpoint)
+        return checkpoint
+
+    def import_historic_data(self, excel_path: str, chunk_rows: int = 500,
+                             resume: bool = True) -> Dict[str, ImportResult]:
         """
         Import historic NAV data from Excel file with multiple sheets (Weekly, Monthly, Daily)
         Sheet structure:
@@ -428,83 +1109,91 @@ class DatabaseService:
         - First relevant data column is E (dates)
         - NAV values start from column F onwards
 
+        The workbook is opened once in read-only mode and each sheet is streamed
+        in chunks of chunk_rows sheet rows. Each chunk is committed together with
+        a checkpoint (workbook hash, sheet, last row) in import_checkpoints, so a
+        rerun of the same file skips finished chunks and continues where the
+        previous run stopped.
+
         Args:
             excel_path: Path to the Excel file
+            chunk_rows: Number of sheet rows per committed chunk
+            resume: Continue from existing checkpoints. When False the
+                checkpoints for this workbook are reset and every row is read.
 
         Returns:
             Dict mapping sheet names to their ImportResult containing counts of added, duplicate, and invalid entries
+            for the rows processed in this run
         """
         results = {}
-        sheet_configs = {
-            'Weekly': {'type': 'weekly', 'usecols': 'E:BY'},
-            'Monthly': {'type': 'monthly', 'usecols': 'E:EU'},
-            'Daily': {'type': 'daily', 'usecols': 'E:F'}
-        }
 
         try:
-            for sheet_name, config in sheet_configs.items():
+            workbook_hash = _file_sha256(excel_path)
+            workbook = load_workbook(excel_path, read_only=True, data_only=True)
+        except Exception as e:
+            raise Exception(f"Error importing historic data: {str(e)}")
+
+        try:
+            for sheet_name, config in HISTORIC_SHEET_CONFIGS.items():
+                added_count = duplicates_count = invalid_series_count = 0
                 try:
                     print(f"Processing {sheet_name} sheet...")
-                    distribution_type = config['type']
-                    usecols = config['usecols']
-
-                    # First, read the ISINs from row 6
-                    isins_df = pd.read_excel(
-                        excel_path,
-                        sheet_name=sheet_name,
-                        header=None,
-                        nrows=1,
-                        skiprows=5,  # Skip to row 6 (0-based index 5)
-                        usecols=usecols
-                    )
-
-                    # Get ISINs (skip the first column which is 'Dates')
-                    isins = isins_df.iloc[0, 1:].values
+                    if sheet_name not in workbook.sheetnames:
+                        raise ValueError(f"Worksheet named '{sheet_name}' not found")
+
+                    with self.SessionMaker() as session:
+                        checkpoint = self._get_import_checkpoint(
+                            session, workbook_hash, sheet_name)
+                        if not resume:
+                            checkpoint.last_row = 0
+                            checkpoint.completed = False
+                        session.commit()
+                        completed, last_row = checkpoint.completed, checkpoint.last_row
 
-                    # Now read the actual data starting from row 7
-                    df = pd.read_excel(
-                        excel_path,
-                        sheet_name=sheet_name,
-                        header=None,
-                        skiprows=6,  # Skip to row 7
-                        usecols=usecols
-                    )
+                    if completed:
+                        print(f"Skipping {sheet_name} sheet, already imported")
+                    else:
+                        if last_row:
+                            print(f"Resuming {sheet_name} sheet after row {last_row}")
+
+                        row_count = 0
+                        for chunk_last_row, chunk in self._iter_historic_chunks(
+                                workbook[sheet_name], config['usecols'], chunk_rows,
+                                start_row=last_row + 1 if last_row else HISTORIC_ISIN_ROW + 1):
+                            row_count += len(chunk)
+                            # A failed write raises before the checkpoint moves,
+                            # so the chunk is rolled back and read again on rerun
+                            with self.SessionMaker() as session:
+                                if not chunk.empty:
+                                    result = self._write_nav_entries(
+                                        session, chunk, config['type'], 'HISTORIC',
+                                        raise_errors=True)
+                                    added_count += result.added_count
+                                    duplicates_count += result.duplicates_count
+                                    invalid_series_count += result.invalid_series_count
+
+                                checkpoint = self._get_import_checkpoint(
+                                    session, workbook_hash, sheet_name)
+                                checkpoint.last_row = chunk_last_row
+                                session.commit()
 
-                    # Rename columns
-                    df.columns = ['Valuation Period-End Date'] + list(isins)
+                        with self.SessionMaker() as session:
+                            self._get_import_checkpoint(
+                                session, workbook_hash, sheet_name).completed = True
+                            session.commit()
 
-                    if sheet_name == 'Daily':
-                        # For Daily, we only have one ISIN column
-                        isin = isins[0]
-                        df = df.rename(columns={isin: 'NAV'})
-                        df['ISIN'] = isin
-                    else:
-                        # For Weekly and Monthly, melt the multiple ISIN columns
-                        df = df.melt(
-                            id_vars=['Valuation Period-End Date'],
-                            var_name='ISIN',
-                            value_name='NAV'
-                        )
-
-                    # Clean up the data
-                    df = df.dropna(subset=['NAV'])
-                    df['Valuation Period-End Date'] = pd.to_datetime(
-                        df['Valuation Period-End Date'])
-
-                    # Print concise summary instead of full DataFrame
-                    print(
-                        f"Processed data: {len(df)} rows ({df['Valuation Period-End Date'].min().date()} to {df['Valuation Period-End Date'].max().date()})")
-
-                    # Use save_nav_entries to handle the import with the specific distribution type
-                    results[sheet_name] = self.save_nav_entries(
-                        df, distribution_type, 'HISTORIC')
+                        # Print concise summary instead of full DataFrame
+                        print(f"Processed data: {row_count} rows")
 
                 except Exception as e:
                     print(f"Error processing sheet {sheet_name}: {str(e)}")
-                    results[sheet_name] = ImportResult(
-                        added_count=0, duplicates_count=0, invalid_series_count=0)
+
+                results[sheet_name] = ImportResult(
+                    added_count=added_count,
+                    duplicates_count=duplicates_count,
+                    invalid_series_count=invalid_series_count)
 
             return results
 
-        except Exception as e:
-            raise Exception(f"Error importing historic data: {str(e)}")
+        finally:
+            workbook.close()
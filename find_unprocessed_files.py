@@ -16,9 +16,11 @@ import pandas as pd
 import argparse
 import numpy as np
 from datetime import datetime
-from sqlalchemy import create_engine, distinct, func
+from sqlalchemy import distinct, func
 from sqlalchemy.orm import sessionmaker
 from models import Trade, Base
+from db_engine import get_engine
+from config import DEFAULT_DB_CONNECTION_STRING
 from process_bny_trades import BNYTradeProcessor
 
 
@@ -182,7 +184,7 @@ def analyze_excel_structure(file_path):
         }
 
 
-def process_file_adaptive(file_path, db_path='sqlite:///nav_data.db'):
+def process_file_adaptive(file_path, db_path=DEFAULT_DB_CONNECTION_STRING):
     """
     Process a file adaptively, handling different table formats automatically
 
@@ -644,7 +646,7 @@ def process_file_adaptive(file_path, db_path='sqlite:///nav_data.db'):
         return False, 0, str(e)
 
 
-def find_unprocessed_files(base_folder='BNY_Trades', db_path='sqlite:///nav_data.db', process_files=False, series_filter=None, dry_run=False, analyze_structures=False):
+def find_unprocessed_files(base_folder='BNY_Trades', db_path=DEFAULT_DB_CONNECTION_STRING, process_files=False, series_filter=None, dry_run=False, analyze_structures=False):
     """
     Find Excel files in the BNY_Trades folder that haven't been processed yet,
     and optionally process them with our adaptive approach.
@@ -661,7 +663,7 @@ def find_unprocessed_files(base_folder='BNY_Trades', db_path='sqlite:///nav_data
         List of unprocessed file information
     """
     # Connect to the database
-    engine = create_engine(db_path)
+    engine = get_engine(db_path)
     Session = sessionmaker(bind=engine)
     session = Session()
 
@@ -932,7 +934,7 @@ def find_unprocessed_files(base_folder='BNY_Trades', db_path='sqlite:///nav_data
     return unprocessed_files
 
 
-def process_file_with_custom_approach(file_path, db_path='sqlite:///nav_data.db'):
+def process_file_with_custom_approach(file_path, db_path=DEFAULT_DB_CONNECTION_STRING):
     """
     Process a file that has an unusual structure, handling different table formats
 
@@ -1112,7 +1114,7 @@ def main():
     parser.add_argument('--folder', default='BNY_Trades',
                         help='Base folder to search for files')
     parser.add_argument(
-        '--db', default='sqlite:///nav_data.db', help='Database path')
+        '--db', default=DEFAULT_DB_CONNECTION_STRING, help='Database path')
     parser.add_argument(
         '--series', help='Filter to a specific series (e.g., S461)')
     parser.add_argument('--dry-run', action='store_true',
@@ -1,82 +1,383 @@
+import io
 import logging
-from ftplib import FTP_TLS
+import ftplib
+import posixpath
+from datetime import datetime
+from ftplib import FTP, FTP_TLS
 import ssl
+import threading
+import time
 from pathlib import Path
 import pandas as pd
-from typing import Optional, Dict
+from typing import Callable, Optional, Dict, NamedTuple, Tuple, TypeVar
+
+T = TypeVar('T')
 
 logger = logging.getLogger(__name__)
 
+# Seconds a socket operation may block before the connection is deemed dead
+FTP_TIMEOUT = 60
+
+# A connection idle for longer than this is checked with NOOP before reuse
+NOOP_AFTER_IDLE_SECONDS = 15
+
+# Errors after which a control connection is no longer usable: socket and
+# TLS failures, the server closing the connection, and 4xx replies such as
+# 421 (service closing) or 425/426 (data connection failed)
+CONNECTION_ERRORS = (OSError, EOFError, ftplib.error_temp, ftplib.error_reply)
+
+# Seconds to wait for a connection slot before giving up on an emitter
+CONNECTION_SLOT_TIMEOUT = 600
+
+
+class ConnectionLimitTimeout(Exception):
+    """No connection slot became free within CONNECTION_SLOT_TIMEOUT"""
+
+
+class RemoteFile(NamedTuple):
+    """A file in an emitter's FTP directory; size and modified are None
+    when the server only supports NLST"""
+    name: str
+    size: Optional[int]
+    modified: Optional[datetime]
+
+
+def _parse_mlsd_time(value: Optional[str]) -> Optional[datetime]:
+    """Parse an MLSD modify fact (YYYYMMDDHHMMSS[.sss], UTC)"""
+    try:
+        return datetime.strptime(value[:14], '%Y%m%d%H%M%S') if value else None
+    except ValueError:
+        return None
+
+
+def detect_encoding(data: bytes) -> str:
+    """UTF-8 if the data decodes as such, else latin-1, which accepts any bytes"""
+    try:
+        data.decode('utf-8')
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return 'latin-1'
+
+
+def read_csv_bytes(data: bytes) -> pd.DataFrame:
+    """Parse downloaded CSV contents without writing them to disk"""
+    return pd.read_csv(io.BytesIO(data), encoding=detect_encoding(data))
+
+
+class ReusedSessionFTP_TLS(FTP_TLS):
+    """
+    FTP_TLS whose data connections resume the control connection's TLS session.
+
+    Resuming skips a full handshake per transfer, and servers configured to
+    require it (e.g. vsftpd's require_ssl_reuse) reject data connections
+    that do not.
+    """
+
+    def ntransfercmd(self, cmd, rest=None):
+        conn, size = FTP.ntransfercmd(self, cmd, rest)
+        if self._prot_p:
+            conn = self.context.wrap_socket(
+                conn, server_hostname=self.host, session=self.sock.session)
+        return conn, size
+
+
+class ConnectionLimiter:
+    """
+    Caps the FTP connections open at once, in total and per host
+
+    A slot is taken when a connection opens and given back when it closes,
+    so idle sessions count against the limits as well as active transfers.
+    A limit of None or 0 means no limit.
+    """
+
+    def __init__(self, max_connections: Optional[int] = None,
+                 max_per_host: Optional[int] = None,
+                 timeout: float = CONNECTION_SLOT_TIMEOUT):
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self._total = threading.BoundedSemaphore(max_connections) if max_connections else None
+        self._hosts: Dict[str, threading.BoundedSemaphore] = {}
+        self._hosts_lock = threading.Lock()
+
+    def _host_slots(self, host: str) -> Optional[threading.BoundedSemaphore]:
+        if not self.max_per_host:
+            return None
+        with self._hosts_lock:
+            slots = self._hosts.get(host)
+            if slots is None:
+                slots = self._hosts[host] = threading.BoundedSemaphore(self.max_per_host)
+            return slots
+
+    def _take(self, slots: threading.BoundedSemaphore, timeout: float, what: str):
+        if slots.acquire(blocking=False):
+            return
+        logger.info(f"Waiting for a free {what} connection slot")
+        if not slots.acquire(timeout=max(0.0, timeout)):
+            raise ConnectionLimitTimeout(
+                f"No {what} connection slot became free within {self.timeout:.0f}s")
+
+    def acquire(self, host: str):
+        """Take a slot for a new connection to host, waiting if none is free"""
+        deadline = time.monotonic() + self.timeout
+        # Wait for the host first, so a busy host does not hold a global
+        # slot that a connection to another host could use
+        host_slots = self._host_slots(host)
+        if host_slots is not None:
+            self._take(host_slots, self.timeout, host)
+        if self._total is not None:
+            try:
+                self._take(self._total, deadline - time.monotonic(), 'FTP')
+            except ConnectionLimitTimeout:
+                if host_slots is not None:
+                    host_slots.release()
+                raise
+
+    def release(self, host: str):
+        """Give back the slot of a connection to host that has closed"""
+        if self._total is not None:
+            self._total.release()
+        host_slots = self._host_slots(host)
+        if host_slots is not None:
+            host_slots.release()
+
+
+# Process-wide limiters by (max_connections, max_per_host), so concurrent
+# pipeline runs, each with its own FTPService, share one connection budget
+_shared_limiters: Dict[Tuple[Optional[int], Optional[int]], ConnectionLimiter] = {}
+_shared_limiters_lock = threading.Lock()
+
+
+def shared_connection_limiter(max_connections: Optional[int] = None,
+                              max_per_host: Optional[int] = None) -> ConnectionLimiter:
+    """The ConnectionLimiter every FTPService in this process uses for these limits"""
+    key = (max_connections or None, max_per_host or None)
+    with _shared_limiters_lock:
+        limiter = _shared_limiters.get(key)
+        if limiter is None:
+            limiter = _shared_limiters[key] = ConnectionLimiter(*key)
+        return limiter
+
+
+class _EmitterSession:
+    """An emitter's control connection; the lock serializes its commands"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.ftp: Optional[FTP_TLS] = None
+        self.last_used = 0.0
+
 
 class FTPService:
-    def __init__(self, config: Dict[str, Dict]):
+    def __init__(self, config: Dict[str, Dict], limiter: Optional[ConnectionLimiter] = None):
         """
         Initialize FTP service with configurations for multiple emitters
 
+        Each emitter gets one authenticated connection, opened on its first
+        download and reused until close_session() or close(), so a run pays
+        for one TLS handshake and login per emitter rather than one per file.
+
         Args:
             config: Dictionary of FTP configurations for each emitter
+            limiter: Caps the connections open at once, in total and per host;
+                opening another waits until a session closes. Pass a
+                shared_connection_limiter() so the caps hold across every
+                FTPService in the process. No limits when None.
         """
         self.config = config
+        self.limiter = limiter or ConnectionLimiter()
+        self._sessions: Dict[str, _EmitterSession] = {}
+        self._sessions_lock = threading.Lock()
 
     def _create_ftp_context(self) -> ssl.SSLContext:
         """Create SSL context for FTP connection"""
         context = ssl.create_default_context()
         context.check_hostname = False
         context.verify_mode = ssl.CERT_NONE
-        context.options |= ssl.OP_NO_TICKET
         return context
 
-    def download_file(self, emitter: str, filename: str, temp_file: Path) -> Optional[pd.DataFrame]:
-        """
-        Download and read a CSV file from FTP server
+    def _get_session(self, emitter: str) -> _EmitterSession:
+        with self._sessions_lock:
+            session = self._sessions.get(emitter)
+            if session is None:
+                session = self._sessions[emitter] = _EmitterSession()
+            return session
 
-        Args:
-            emitter: The emitter identifier
-            filename: Name of the file to download
-            temp_file: Path to temporary file for download
-
-        Returns:
-            Optional[pd.DataFrame]: DataFrame containing file contents or None if file not found
-        """
+    def _connect(self, emitter: str) -> FTP_TLS:
+        """Open and authenticate a connection to an emitter's server"""
         ftp_config = self.config.get(emitter)
         if not ftp_config:
             raise ValueError(
                 f"No FTP configuration found for emitter {emitter}")
 
-        context = self._create_ftp_context()
+        self.limiter.acquire(ftp_config.host)
+        ftp = ReusedSessionFTP_TLS(
+            context=self._create_ftp_context(), timeout=FTP_TIMEOUT)
+        ftp.encoding = 'utf-8'
+        try:
+            # Connect and authenticate
+            ftp.connect(host=ftp_config.host, port=21)
+            ftp.auth()
+            ftp.login(ftp_config.user, ftp_config.password)
+
+            # Enable TLS for data channel
+            ftp.prot_p()
+            ftp.set_pasv(True)
+
+            # Change to directory if specified
+            if hasattr(ftp_config, 'directory') and ftp_config.directory:
+                ftp.cwd(ftp_config.directory)
+        except Exception:
+            ftp.close()
+            self.limiter.release(ftp_config.host)
+            raise
+
+        logger.info(f"Opened FTP session for {emitter}")
+        return ftp
+
+    def _discard(self, emitter: str, session: _EmitterSession):
+        """Drop a session's connection without talking to the server"""
+        if session.ftp is not None:
+            try:
+                session.ftp.close()
+            except Exception:
+                pass
+            session.ftp = None
+            self.limiter.release(self.config[emitter].host)
+
+    def _connection(self, emitter: str, session: _EmitterSession) -> FTP_TLS:
+        """
+        The session's live connection, opening one if needed
 
-        with FTP_TLS(context=context) as ftp:
-            ftp.encoding = 'utf-8'
+        A connection that has sat idle is checked with NOOP first, since
+        servers drop idle control connections and a dead socket would
+        otherwise only show when a transfer fails.
+        """
+        if session.ftp is not None \
+                and time.monotonic() - session.last_used > NOOP_AFTER_IDLE_SECONDS:
             try:
-                # Connect and authenticate
-                ftp.connect(host=ftp_config.host, port=21)
-                ftp.auth()
-                ftp.login(ftp_config.user, ftp_config.password)
+                session.ftp.voidcmd('NOOP')
+            except CONNECTION_ERRORS as e:
+                logger.info(f"FTP session for {emitter} is dead ({str(e)}), reconnecting")
+                self._discard(emitter, session)
 
-                # Enable TLS for data channel
-                ftp.prot_p()
-                ftp.set_pasv(True)
+        if session.ftp is None:
+            session.ftp = self._connect(emitter)
+        return session.ftp
 
-                # Change to directory if specified
-                if hasattr(ftp_config, 'directory') and ftp_config.directory:
-                    ftp.cwd(ftp_config.directory)
+    def _with_session(self, emitter: str, operation: Callable[[FTP_TLS], T]) -> T:
+        """
+        Run an operation on the emitter's connection while holding its lock
 
-                # Download the file
-                with open(temp_file, 'wb') as f:
-                    ftp.retrbinary(f'RETR {filename}', f.write)
+        If the connection turns out to be dead the operation is retried once
+        on a new one.
+        """
+        session = self._get_session(emitter)
 
-                # Read the CSV file
+        with session.lock:
+            for attempt in range(2):
                 try:
-                    return pd.read_csv(temp_file)
-                except UnicodeDecodeError:
-                    return pd.read_csv(temp_file, encoding='latin-1')
-
-            except Exception as e:
-                if "550" in str(e):  # File not found
-                    return None
-                logger.error(
-                    f"Error downloading {filename} from {emitter}: {str(e)}")
+                    result = operation(self._connection(emitter, session))
+                    session.last_used = time.monotonic()
+                    return result
+                except ftplib.error_perm:
+                    # The connection is still fine after a permanent error
+                    session.last_used = time.monotonic()
+                    raise
+                except CONNECTION_ERRORS as e:
+                    self._discard(emitter, session)
+                    if attempt > 0:
+                        raise
+                    logger.warning(
+                        f"FTP connection to {emitter} failed ({str(e)}), retrying")
+
+    def list_files(self, emitter: str) -> Dict[str, RemoteFile]:
+        """
+        List the files in an emitter's directory with a single command
+
+        Uses MLSD, which also returns sizes and modification times, and
+        falls back to NLST on servers without it.
+
+        Args:
+            emitter: The emitter identifier
+
+        Returns:
+            Dict of file name to RemoteFile
+        """
+        def listing(ftp: FTP_TLS) -> Dict[str, RemoteFile]:
+            try:
+                return {
+                    name: RemoteFile(name, int(facts['size']) if 'size' in facts else None,
+                                     _parse_mlsd_time(facts.get('modify')))
+                    for name, facts in ftp.mlsd()
+                    if facts.get('type', 'file') == 'file'
+                }
+            except ftplib.error_perm as e:
+                # 500/501/502: MLSD is not supported
+                if not str(e).startswith('50'):
+                    raise
+
+            try:
+                names = ftp.nlst()
+            except ftplib.error_perm as e:
+                if "550" in str(e):  # Some servers answer 550 for an empty directory
+                    return {}
                 raise
+            return {posixpath.basename(name): RemoteFile(posixpath.basename(name), None, None)
+                    for name in names}
+
+        return self._with_session(emitter, listing)
+
+    def download_bytes(self, emitter: str, filename: str) -> Optional[bytes]:
+        """
+        Download a file from the emitter's FTP directory into memory
+
+        Uses the emitter's persistent session. If the connection turns out
+        to be dead the download is retried once on a new one.
+
+        Args:
+            emitter: The emitter identifier
+            filename: Name of the file to download
+
+        Returns:
+            Optional[bytes]: The file's contents or None if file not found
+        """
+        def retrieve(ftp: FTP_TLS) -> bytes:
+            # Collected afresh on each attempt so a retry starts clean
+            chunks = []
+            ftp.retrbinary(f'RETR {filename}', chunks.append)
+            return b''.join(chunks)
+
+        try:
+            return self._with_session(emitter, retrieve)
+        except Exception as e:
+            if "550" in str(e):  # File not found
+                return None
+            logger.error(
+                f"Error downloading {filename} from {emitter}: {str(e)}")
+            raise
+
+    def close_session(self, emitter: str):
+        """Log out of an emitter's session, freeing its connection slot"""
+        with self._sessions_lock:
+            session = self._sessions.get(emitter)
+        if session is None:
+            return
+        with session.lock:
+            if session.ftp is None:
+                return
+            try:
+                session.ftp.quit()
+            except Exception:
+                pass
+            self._discard(emitter, session)
+            logger.info(f"Closed FTP session for {emitter}")
+
+    def close(self):
+        """Log out of and close every open session"""
+        with self._sessions_lock:
+            emitters = list(self._sessions)
+        for emitter in emitters:
+            self.close_session(emitter)
 
     def cleanup_emitter_directory(self, emitter: str, directory: Path):
         """
@@ -1,6 +1,6 @@
 from google.oauth2 import service_account
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload, MediaIoBaseDownload
+from googleapiclient.http import MediaFileUpload, MediaIoBaseDownload, MediaIoBaseUpload
 import logging
 from pathlib import Path
 import os
@@ -115,36 +115,47 @@ class GoogleDriveService:
     def upload_file(self, file_path: Path, folder_id: str) -> str:
         """Upload a file to specified Google Drive folder or update if it exists"""
         try:
-            filename = file_path.name
-            existing_file_id = self._find_file_by_name_in_folder(
-                filename, folder_id)
-
             media = MediaFileUpload(str(file_path), resumable=True)
-
-            if existing_file_id:
-                # Update existing file
-                file = self.service.files().update(
-                    fileId=existing_file_id,
-                    media_body=media,
-                    fields='id'
-                ).execute()
-                # No need to log every successful file update
-            else:
-                # Create new file
-                file_metadata = {
-                    'name': filename,
-                    'parents': [folder_id]
-                }
-                file = self.service.files().create(
-                    body=file_metadata,
-                    media_body=media,
-                    fields='id'
-                ).execute()
-                # Only log new file uploads
-                self.logger.info(f"New file uploaded: {filename}")
-
-            return file.get('id')
-
+            return self._upload_media(file_path.name, media, folder_id)
         except Exception as e:
             self.logger.error(f"Upload failed: {file_path.name}")
             raise
+
+    def upload_bytes(self, data: bytes, filename: str, folder_id: str,
+                     mimetype: str = 'text/csv') -> str:
+        """Upload in-memory file contents to a Google Drive folder, updating a file of the same name"""
+        try:
+            media = MediaIoBaseUpload(io.BytesIO(data), mimetype=mimetype, resumable=True)
+            return self._upload_media(filename, media, folder_id)
+        except Exception:
+            self.logger.error(f"Upload failed: {filename}")
+            raise
+
+    def _upload_media(self, filename: str, media, folder_id: str) -> str:
+        """Create or update the file named filename in a folder with media's contents"""
+        existing_file_id = self._find_file_by_name_in_folder(
+            filename, folder_id)
+
+        if existing_file_id:
+            # Update existing file
+            file = self.service.files().update(
+                fileId=existing_file_id,
+                media_body=media,
+                fields='id'
+            ).execute()
+            # No need to log every successful file update
+        else:
+            # Create new file
+            file_metadata = {
+                'name': filename,
+                'parents': [folder_id]
+            }
+            file = self.service.files().create(
+                body=file_metadata,
+                media_body=media,
+                fields='id'
+            ).execute()
+            # Only log new file uploads
+            self.logger.info(f"New file uploaded: {filename}")
+
+        return file.get('id')
@@ -0,0 +1,27 @@
+"""
+Gunicorn settings for serving wsgi:app.
+
+Worker processes run requests in parallel; threads within a worker overlap
+requests waiting on the database, FTP or Drive. Size WEB_WORKERS to the CPU
+cores available and WEB_THREADS to how much of a request is spent waiting.
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8080')}"
+workers = int(os.getenv('WEB_WORKERS', str(min(multiprocessing.cpu_count(), 4))))
+threads = int(os.getenv('WEB_THREADS', '4'))
+worker_class = 'gthread'
+
+# Matches the app's 5 minute request timeout
+timeout = int(os.getenv('WEB_TIMEOUT', '300'))
+graceful_timeout = 30
+keepalive = 5
+
+# Load the app in each worker after forking, not in the master, so no
+# database connections or job threads are shared across processes
+preload_app = False
+
+accesslog = '-'
+errorlog = '-'
+loglevel = 'info'
@@ -2,6 +2,7 @@ import pandas as pd
 from sqlalchemy.orm import Session
 from models import Series, Custodian, FeeStructure, SeriesStatus, NAVFrequency, FeeType, NAVEntry
 from datetime import datetime
+from table_stats import bump_data_version, SERIES
 
 
 def parse_date(date_str):
@@ -189,6 +190,7 @@ def import_series_data(excel_path: str, session: Session):
                     session.add(fee)
 
     # Commit all changes
+    bump_data_version(session, SERIES)
     session.commit()
 
 
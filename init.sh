@@ -8,4 +8,4 @@ if [ ! -f /app/data/nav_data.db ]; then
 fi
 
 # Start the API
-python api.py 
\ No newline at end of file
+exec gunicorn -c gunicorn.conf.py wsgi:app
\ No newline at end of file
@@ -0,0 +1,192 @@
+"""
+Background job execution for long-running API requests.
+
+Submitting a job stores it as queued and hands it to a bounded thread pool,
+so the request returns at once with the job ID. The job's state, the stage
+it is in and its result or error are written to the jobs table as it runs,
+so any API process can report on it.
+
+Each process refreshes a heartbeat on the jobs it owns. Jobs whose heartbeat
+has gone stale, because the process running them was restarted or crashed,
+are marked failed at startup and by every live process as it heartbeats.
+"""
+import logging
+import os
+import socket
+import threading
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from models import Job, JobStatus
+
+logger = logging.getLogger(__name__)
+
+# A job target receives its job ID and a callback reporting each stage it
+# enters, and returns a JSON-serializable result
+JobTarget = Callable[[str, Callable[[str], None]], Dict[str, Any]]
+
+# Jobs that hold a heartbeat
+ACTIVE_JOB_STATUSES = (JobStatus.QUEUED, JobStatus.RUNNING)
+
+STALE_JOB_ERROR = 'Interrupted: the API process running the job stopped'
+
+
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def job_to_dict(job: Job) -> Dict[str, Any]:
+    """API representation of a job"""
+    return {
+        'job_id': job.id,
+        'job_type': job.job_type,
+        'status': job.status.value,
+        'params': job.params,
+        'stage': job.stage,
+        'stages': job.stages or [],
+        'result': job.result,
+        'error': job.error,
+        'created_at': _isoformat(job.created_at),
+        'started_at': _isoformat(job.started_at),
+        'finished_at': _isoformat(job.finished_at)
+    }
+
+
+class JobRunner:
+    """Runs job targets on a bounded thread pool and records them in the jobs table"""
+
+    def __init__(self, session_factory: Callable[[], Session], max_workers: int = 2,
+                 heartbeat_interval: float = 30, stale_after: float = 120):
+        self.session_factory = session_factory
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='job')
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.heartbeat_interval = heartbeat_interval
+        self.stale_after = stale_after
+
+        # Jobs left queued or running by a previous run of the server
+        try:
+            self.expire_stale_jobs()
+        except Exception as e:
+            logger.warning(f"Could not expire stale jobs: {str(e)}")
+
+        self._stopped = threading.Event()
+        self._heartbeat_thread = threading.Thread(
+            target=self._heartbeat_loop, name='job-heartbeat', daemon=True)
+        self._heartbeat_thread.start()
+
+    def submit(self, job_type: str, params: Dict[str, Any], target: JobTarget) -> str:
+        """
+        Queue a job
+
+        Args:
+            job_type: Kind of job, e.g. 'fetch_remote_navs'
+            params: JSON-serializable request parameters, stored for reference
+            target: Function running the job; see JobTarget
+
+        Returns:
+            The new job's ID
+        """
+        job_id = uuid.uuid4().hex
+        with self.session_factory() as session:
+            session.add(Job(id=job_id, job_type=job_type,
+                            status=JobStatus.QUEUED, params=params, stages=[],
+                            owner=self.owner, heartbeat_at=datetime.utcnow()))
+            session.commit()
+
+        self.executor.submit(self._run, job_id, target)
+        logger.info(f"Queued {job_type} job {job_id}")
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """A job as a dict, or None if there is no such job"""
+        with self.session_factory() as session:
+            job = session.get(Job, job_id)
+            return job_to_dict(job) if job else None
+
+    def expire_stale_jobs(self) -> int:
+        """
+        Mark queued and running jobs whose heartbeat is older than stale_after
+        as failed
+
+        Returns:
+            Number of jobs marked failed
+        """
+        now = datetime.utcnow()
+        with self.session_factory() as session:
+            expired = session.execute(
+                update(Job)
+                .where(Job.status.in_(ACTIVE_JOB_STATUSES))
+                .where((Job.heartbeat_at.is_(None))
+                       | (Job.heartbeat_at < now - timedelta(seconds=self.stale_after)))
+                .values(status=JobStatus.FAILED, error=STALE_JOB_ERROR, finished_at=now)
+            ).rowcount
+            session.commit()
+        if expired:
+            logger.warning(f"Marked {expired} stale jobs as failed")
+        return expired
+
+    def _heartbeat(self):
+        with self.session_factory() as session:
+            session.execute(
+                update(Job)
+                .where(Job.owner == self.owner)
+                .where(Job.status.in_(ACTIVE_JOB_STATUSES))
+                .values(heartbeat_at=datetime.utcnow()))
+            session.commit()
+
+    def _heartbeat_loop(self):
+        while not self._stopped.wait(self.heartbeat_interval):
+            try:
+                self._heartbeat()
+                self.expire_stale_jobs()
+            except Exception as e:
+                logger.warning(f"Job heartbeat failed: {str(e)}")
+
+    def _update(self, job_id: str, **values):
+        # A single UPDATE without a prior read, so concurrent jobs never
+        # have to upgrade a read transaction to a write one
+        with self.session_factory() as session:
+            session.execute(update(Job).where(Job.id == job_id).values(**values))
+            session.commit()
+
+    def _run(self, job_id: str, target: JobTarget):
+        # Only this thread writes the job's stages, so they are kept here
+        stages: List[Dict[str, str]] = []
+
+        def report_stage(stage: str):
+            logger.info(f"Job {job_id}: {stage}")
+            stages.append({'stage': stage, 'started_at': datetime.utcnow().isoformat()})
+            # Progress is informational; failing to record it must not fail the job
+            try:
+                self._update(job_id, stage=stage, stages=list(stages))
+            except Exception as e:
+                logger.warning(
+                    f"Could not record stage {stage} of job {job_id}: {str(e)}")
+
+        try:
+            self._update(job_id, status=JobStatus.RUNNING,
+                         started_at=datetime.utcnow())
+            result = target(job_id, report_stage)
+            self._update(job_id, status=JobStatus.SUCCEEDED, stage=None,
+                         result=result, finished_at=datetime.utcnow())
+            logger.info(f"Job {job_id} succeeded")
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {str(e)}")
+            try:
+                self._update(job_id, status=JobStatus.FAILED, error=str(e),
+                             result={'traceback': traceback.format_exc()},
+                             finished_at=datetime.utcnow())
+            except Exception as update_error:
+                logger.error(
+                    f"Could not record failure of job {job_id}: {str(update_error)}")
+
+    def shutdown(self, wait: bool = True):
+        self._stopped.set()
+        self.executor.shutdown(wait=wait)
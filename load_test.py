@@ -0,0 +1,190 @@
+"""
+Load test for the production server: throughput at several worker counts.
+
+Starts gunicorn (gunicorn.conf.py, wsgi:app) once per worker count, waits
+for /health, then runs concurrent clients against a mix of read endpoints
+for a fixed time and reports requests per second and latency percentiles.
+The server uses the same environment as this script (DATABASE_URL, API_KEY,
+...). Pass --url to measure an already running server instead.
+
+Usage:
+    python load_test.py [--workers 1,2,4] [--threads 4] [--concurrency 32]
+                        [--duration 20] [--no-cache]
+"""
+import argparse
+import itertools
+import os
+import subprocess
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+import requests
+
+# Read endpoints exercised by default, requested in rotation
+DEFAULT_PATHS = [
+    '/nav-data?per_page=50',
+    '/series?per_page=50',
+    '/statistics',
+    '/trades?per_page=50',
+    '/fee-structures/summary?per_page=50',
+]
+
+
+def wait_until_healthy(base_url: str, timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(f"{base_url}/health", timeout=2).status_code == 200:
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    return False
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+def run_load(base_url: str, paths: List[str], api_key: Optional[str],
+             concurrency: int, duration: float, bust_cache: bool) -> Dict[str, float]:
+    """
+    Send requests from `concurrency` clients for `duration` seconds
+
+    With bust_cache, every request gets a unique query parameter so the
+    response cache never answers it and each request runs its queries.
+    """
+    headers = {'X-API-Key': api_key} if api_key else {}
+    counter = itertools.count()
+    latencies: List[float] = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client():
+        session = requests.Session()
+        session.headers.update(headers)
+        local_latencies = []
+        local_errors = 0
+        while time.monotonic() < deadline:
+            n = next(counter)
+            path = paths[n % len(paths)]
+            if bust_cache:
+                path += f"{'&' if '?' in path else '?'}_lt={n}"
+            started = time.perf_counter()
+            try:
+                response = session.get(base_url + path, timeout=60)
+                if response.status_code != 200:
+                    local_errors += 1
+            except requests.RequestException:
+                local_errors += 1
+            local_latencies.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(local_latencies)
+            errors[0] += local_errors
+
+    started = time.monotonic()
+    clients = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'rps': len(latencies) / elapsed,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+    }
+
+
+def start_server(workers: int, threads: int, port: int) -> subprocess.Popen:
+    env = dict(os.environ, WEB_WORKERS=str(workers), WEB_THREADS=str(threads),
+               PORT=str(port))
+    return subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+         '--access-logfile', '/dev/null', 'wsgi:app'],
+        cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def stop_server(server: subprocess.Popen):
+    server.terminate()
+    try:
+        server.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        server.kill()
+
+
+def print_result(label: str, result: Dict[str, float]):
+    print(f"{label:<12} {result['requests']:>8} {result['errors']:>7} "
+          f"{result['rps']:>9.1f} {result['p50_ms']:>8.1f} "
+          f"{result['p95_ms']:>8.1f} {result['p99_ms']:>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Measure API throughput as the number of server workers grows')
+    parser.add_argument('--workers', default='1,2,4',
+                        help='Comma-separated worker counts to test (default: 1,2,4)')
+    parser.add_argument('--threads', type=int, default=4,
+                        help='Threads per worker (default: 4)')
+    parser.add_argument('--concurrency', type=int, default=32,
+                        help='Concurrent clients (default: 32)')
+    parser.add_argument('--duration', type=float, default=20,
+                        help='Seconds to run each measurement (default: 20)')
+    parser.add_argument('--warmup', type=float, default=3,
+                        help='Seconds of unmeasured load before each run (default: 3)')
+    parser.add_argument('--port', type=int, default=8099,
+                        help='Port for the servers started by this script (default: 8099)')
+    parser.add_argument('--path', action='append', dest='paths',
+                        help='Endpoint to request, repeatable (default: a mix of read endpoints)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Make every request unique so the response cache is bypassed')
+    parser.add_argument('--url',
+                        help='Measure this running server instead of starting gunicorn')
+    parser.add_argument('--api-key', default=os.getenv('API_KEY'),
+                        help='API key to send (defaults to API_KEY)')
+    args = parser.parse_args()
+
+    paths = args.paths or DEFAULT_PATHS
+    print(f"{'workers':<12} {'requests':>8} {'errors':>7} {'req/s':>9} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+
+    if args.url:
+        base_url = args.url.rstrip('/')
+        run_load(base_url, paths, args.api_key, args.concurrency, args.warmup, args.no_cache)
+        print_result('external', run_load(base_url, paths, args.api_key,
+                                          args.concurrency, args.duration, args.no_cache))
+        return
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    baseline = None
+    for workers in [int(w) for w in args.workers.split(',')]:
+        server = start_server(workers, args.threads, args.port)
+        try:
+            if not wait_until_healthy(base_url, timeout=120):
+                print(f"Server with {workers} workers did not become healthy")
+                sys.exit(1)
+            run_load(base_url, paths, args.api_key, args.concurrency, args.warmup, args.no_cache)
+            result = run_load(base_url, paths, args.api_key,
+                              args.concurrency, args.duration, args.no_cache)
+        finally:
+            stop_server(server)
+
+        baseline = baseline or result['rps']
+        print_result(str(workers), result)
+        print(f"{'':<12} {result['rps'] / baseline:.2f}x the first worker count")
+
+
+if __name__ == '__main__':
+    main()
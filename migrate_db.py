@@ -5,53 +5,60 @@ Use this if you don't have important data in your database or have already backe
 """
 import os
 import sys
-from sqlalchemy import create_engine
-from models import Base, Trade
-import sqlite3
+from sqlalchemy.engine import make_url
+from models import Base, Trade, init_db
+from db_engine import get_engine
+from config import DEFAULT_DB_CONNECTION_STRING
+from table_stats import refresh_table_stats, TRADES
 
 
-def migrate_database(db_path='sqlite:///nav_data.db', backup=True):
+def migrate_database(db_path=DEFAULT_DB_CONNECTION_STRING, backup=True):
     """Update the database schema by dropping and recreating the trades table"""
 
-    # Extract file path from SQLAlchemy URL
-    db_file = db_path.replace('sqlite:///', '')
+    url = make_url(db_path)
+    if url.get_backend_name() == 'sqlite':
+        db_file = url.database
 
-    # Check if database exists
-    if not os.path.exists(db_file):
-        print(f"Database file {db_file} not found.")
-        return False
+        # Check if database exists
+        if not os.path.exists(db_file):
+            print(f"Database file {db_file} not found.")
+            return False
 
-    # Create backup if requested
-    if backup:
-        backup_file = f"{db_file}.backup"
-        print(f"Creating backup of database at {backup_file}")
-        try:
-            import shutil
-            shutil.copy2(db_file, backup_file)
-            print("Backup created successfully.")
-        except Exception as e:
-            print(f"Error creating backup: {str(e)}")
-            choice = input("Continue without backup? (y/n): ")
-            if choice.lower() != 'y':
-                print("Migration aborted.")
-                return False
+        # Create backup if requested
+        if backup:
+            backup_file = f"{db_file}.backup"
+            print(f"Creating backup of database at {backup_file}")
+            try:
+                import shutil
+                shutil.copy2(db_file, backup_file)
+                print("Backup created successfully.")
+            except Exception as e:
+                print(f"Error creating backup: {str(e)}")
+                choice = input("Continue without backup? (y/n): ")
+                if choice.lower() != 'y':
+                    print("Migration aborted.")
+                    return False
+    elif backup:
+        print(f"Skipping file backup for {url.get_backend_name()} database; "
+              "take one with the server's own tools (e.g. pg_dump) first.")
 
     # Connect to database
-    engine = create_engine(db_path)
+    engine = get_engine(db_path)
 
     try:
-        # Connect using sqlite3 to drop table
         print("Dropping trades table...")
-        conn = sqlite3.connect(db_file)
-        cursor = conn.cursor()
-        cursor.execute("DROP TABLE IF EXISTS trades")
-        conn.commit()
-        conn.close()
+        Trade.__table__.drop(engine, checkfirst=True)
 
         # Recreate table with updated schema
         print("Recreating trades table with new schema...")
         Base.metadata.create_all(engine, tables=[Trade.__table__])
 
+        # Clear the trade counts and summary and invalidate cached responses
+        print("Refreshing trade counts...")
+        with init_db(db_path)() as session:
+            refresh_table_stats(session, [TRADES])
+            session.commit()
+
         print("Migration completed successfully.")
         return True
     except Exception as e:
@@ -61,7 +68,7 @@ def migrate_database(db_path='sqlite:///nav_data.db', backup=True):
 
 if __name__ == "__main__":
     # Allow specifying database path from command line
-    db_path = sys.argv[1] if len(sys.argv) > 1 else 'sqlite:///nav_data.db'
+    db_path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_DB_CONNECTION_STRING
 
     print(f"Starting migration for database: {db_path}")
     result = migrate_database(db_path)
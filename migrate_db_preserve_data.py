@@ -5,42 +5,49 @@ This script preserves existing trade data while updating the schema.
 """
 import os
 import sys
-from sqlalchemy import create_engine, MetaData, Table, Column, String, inspect
+from sqlalchemy import MetaData, Table, Column, String, inspect
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from models import Base, Trade
-import sqlite3
+from models import Base, Trade, init_db
+from db_engine import get_engine
+from config import DEFAULT_DB_CONNECTION_STRING
+from table_stats import refresh_table_stats, TRADES
 import pandas as pd
 
 
-def migrate_database_with_data_preservation(db_path='sqlite:///nav_data.db', backup=True):
+def migrate_database_with_data_preservation(db_path=DEFAULT_DB_CONNECTION_STRING, backup=True):
     """Update the database schema for the trades table while preserving existing data"""
 
-    # Extract file path from SQLAlchemy URL
-    db_file = db_path.replace('sqlite:///', '')
-
-    # Check if database exists
-    if not os.path.exists(db_file):
-        print(f"Database file {db_file} not found.")
-        return False
-
-    # Create backup if requested
-    if backup:
-        backup_file = f"{db_file}.backup"
-        print(f"Creating backup of database at {backup_file}")
-        try:
-            import shutil
-            shutil.copy2(db_file, backup_file)
-            print("Backup created successfully.")
-        except Exception as e:
-            print(f"Error creating backup: {str(e)}")
-            choice = input("Continue without backup? (y/n): ")
-            if choice.lower() != 'y':
-                print("Migration aborted.")
-                return False
+    url = make_url(db_path)
+    if url.get_backend_name() == 'sqlite':
+        db_file = url.database
+
+        # Check if database exists
+        if not os.path.exists(db_file):
+            print(f"Database file {db_file} not found.")
+            return False
+
+        # Create backup if requested
+        if backup:
+            backup_file = f"{db_file}.backup"
+            print(f"Creating backup of database at {backup_file}")
+            try:
+                import shutil
+                shutil.copy2(db_file, backup_file)
+                print("Backup created successfully.")
+            except Exception as e:
+                print(f"Error creating backup: {str(e)}")
+                choice = input("Continue without backup? (y/n): ")
+                if choice.lower() != 'y':
+                    print("Migration aborted.")
+                    return False
+    elif backup:
+        print(f"Skipping file backup for {url.get_backend_name()} database; "
+              "take one with the server's own tools (e.g. pg_dump) first.")
 
     # Connect to database
-    engine = create_engine(db_path)
+    engine = get_engine(db_path)
 
     try:
         # Check if trades table exists
@@ -79,11 +86,7 @@ def migrate_database_with_data_preservation(db_path='sqlite:///nav_data.db', bac
         print(f"Backed up {row_count} trade records.")
 
         print("Dropping existing trades table...")
-        conn = sqlite3.connect(db_file)
-        cursor = conn.cursor()
-        cursor.execute("DROP TABLE IF EXISTS trades")
-        conn.commit()
-        conn.close()
+        Trade.__table__.drop(engine, checkfirst=True)
 
         print("Creating new trades table with updated schema...")
         Base.metadata.create_all(engine, tables=[Trade.__table__])
@@ -122,6 +125,12 @@ def migrate_database_with_data_preservation(db_path='sqlite:///nav_data.db', bac
             session.close()
             print(f"Successfully restored all {row_count} trade records.")
 
+        # Recount the restored trades and invalidate cached responses
+        print("Refreshing trade counts...")
+        with init_db(db_path)() as session:
+            refresh_table_stats(session, [TRADES])
+            session.commit()
+
         print("Migration completed successfully.")
         return True
 
@@ -134,7 +143,7 @@ def migrate_database_with_data_preservation(db_path='sqlite:///nav_data.db', bac
 
 if __name__ == "__main__":
     # Allow specifying database path from command line
-    db_path = sys.argv[1] if len(sys.argv) > 1 else 'sqlite:///nav_data.db'
+    db_path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_DB_CONNECTION_STRING
 
     print(f"Starting migration for database: {db_path}")
     result = migrate_database_with_data_preservation(db_path)
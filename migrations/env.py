@@ -17,6 +17,10 @@ sys.path.insert(0, os.path.abspath(
 # access to the values within the .ini file in use.
 config = context.config
 
+# Let DATABASE_URL override the URL in alembic.ini, like the application does
+if os.getenv('DATABASE_URL'):
+    config.set_main_option('sqlalchemy.url', os.environ['DATABASE_URL'])
+
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
 if config.config_file_name is not None:
@@ -0,0 +1,32 @@
+"""add series number index
+
+Revision ID: a7e3f19c5d20
+Revises: f5c2d8e61b94
+Create Date: 2026-10-15 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7e3f19c5d20'
+down_revision: Union[str, None] = 'f5c2d8e61b94'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Index series.series_number for identifier lookups by series number."""
+    # The app's create_all adds it once the model declares it
+    existing = {index['name']
+                for index in sa.inspect(op.get_bind()).get_indexes('series')}
+    if 'ix_series_series_number' not in existing:
+        op.create_index('ix_series_series_number', 'series', ['series_number'])
+
+
+def downgrade() -> None:
+    """Drop the series number index."""
+    op.drop_index('ix_series_series_number', table_name='series')
@@ -0,0 +1,52 @@
+"""add jobs table
+
+Revision ID: b9d4e2a6c813
+Revises: a7e3f19c5d20
+Create Date: 2026-10-15 22:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b9d4e2a6c813'
+down_revision: Union[str, None] = 'a7e3f19c5d20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+job_status = sa.Enum('QUEUED', 'RUNNING', 'SUCCEEDED', 'FAILED', name='jobstatus')
+
+
+def upgrade() -> None:
+    """Create the background jobs table."""
+    # The app's create_all creates the table and its index on startup
+    if 'jobs' not in sa.inspect(op.get_bind()).get_table_names():
+        op.create_table(
+            'jobs',
+            sa.Column('id', sa.String(length=32), nullable=False),
+            sa.Column('job_type', sa.String(length=50), nullable=False),
+            sa.Column('status', job_status, nullable=False),
+            sa.Column('params', sa.JSON(), nullable=True),
+            sa.Column('stage', sa.String(length=50), nullable=True),
+            sa.Column('stages', sa.JSON(), nullable=True),
+            sa.Column('result', sa.JSON(), nullable=True),
+            sa.Column('error', sa.Text(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+            sa.Column('started_at', sa.DateTime(), nullable=True),
+            sa.Column('finished_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+    existing = {index['name']
+                for index in sa.inspect(op.get_bind()).get_indexes('jobs')}
+    if 'ix_jobs_status_created_at' not in existing:
+        op.create_index('ix_jobs_status_created_at', 'jobs', ['status', 'created_at'])
+
+
+def downgrade() -> None:
+    """Drop the background jobs table."""
+    op.drop_index('ix_jobs_status_created_at', table_name='jobs')
+    op.drop_table('jobs')
+    job_status.drop(op.get_bind(), checkfirst=True)
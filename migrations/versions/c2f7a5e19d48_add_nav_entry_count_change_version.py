@@ -0,0 +1,34 @@
+"""add nav_entry_counts change_version
+
+Revision ID: c2f7a5e19d48
+Revises: b9d4e2a6c813
+Create Date: 2026-10-15 23:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2f7a5e19d48'
+down_revision: Union[str, None] = 'b9d4e2a6c813'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add the per-ISIN change version used to validate the NAV time series store."""
+    # Tables made by the app's create_all already have it
+    columns = {column['name']
+               for column in sa.inspect(op.get_bind()).get_columns('nav_entry_counts')}
+    if 'change_version' in columns:
+        return
+    op.add_column('nav_entry_counts', sa.Column(
+        'change_version', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade() -> None:
+    """Drop the per-ISIN change version."""
+    op.drop_column('nav_entry_counts', 'change_version')
@@ -0,0 +1,39 @@
+"""add import checkpoints
+
+Revision ID: c71e2a9d4f10
+Revises: b4226bb4ff73
+Create Date: 2026-10-15 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c71e2a9d4f10'
+down_revision: Union[str, None] = 'b4226bb4ff73'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create the historic import checkpoint ledger."""
+    op.create_table(
+        'import_checkpoints',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('workbook_hash', sa.String(length=64), nullable=False),
+        sa.Column('sheet_name', sa.String(length=50), nullable=False),
+        sa.Column('last_row', sa.Integer(), nullable=False),
+        sa.Column('completed', sa.Boolean(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('workbook_hash', 'sheet_name',
+                            name='uix_import_checkpoint_workbook_sheet')
+    )
+
+
+def downgrade() -> None:
+    """Drop the historic import checkpoint ledger."""
+    op.drop_table('import_checkpoints')
@@ -0,0 +1,60 @@
+"""add composite query indexes
+
+Revision ID: d3b8f61a2c57
+Revises: c71e2a9d4f10
+Create Date: 2026-10-15 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3b8f61a2c57'
+down_revision: Union[str, None] = 'c71e2a9d4f10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (table, index name, columns)
+INDEXES = [
+    ('nav_entries', 'ix_nav_entries_emitter_nav_date', ['emitter', 'nav_date']),
+    ('nav_entries', 'ix_nav_entries_distribution_type_emitter',
+     ['distribution_type', 'emitter']),
+    ('nav_entries', 'ix_nav_entries_series_number_isin',
+     ['series_number', 'isin']),
+    ('trades', 'ix_trades_series_number_trade_date',
+     ['series_number', 'trade_date']),
+    ('trades', 'ix_trades_security_type_trade_date',
+     ['security_type', 'trade_date']),
+    ('trades', 'ix_trades_trade_type_trade_date', ['trade_type', 'trade_date']),
+]
+
+
+def upgrade() -> None:
+    """Create composite indexes for the NAV history and /trades queries."""
+    # trades is created by the BNY loader via create_all, so it may be missing
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+    for table_name, index_name, columns in INDEXES:
+        if table_name not in tables:
+            continue
+        existing = {index['name']
+                    for index in inspector.get_indexes(table_name)}
+        if index_name not in existing:
+            op.create_index(index_name, table_name, columns)
+
+
+def downgrade() -> None:
+    """Drop the composite query indexes."""
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+    for table_name, index_name, _ in reversed(INDEXES):
+        if table_name not in tables:
+            continue
+        existing = {index['name']
+                    for index in inspector.get_indexes(table_name)}
+        if index_name in existing:
+            op.drop_index(index_name, table_name=table_name)
@@ -0,0 +1,67 @@
+"""add data versions and row counts
+
+Revision ID: e4a1c9b07d32
+Revises: d3b8f61a2c57
+Create Date: 2026-10-15 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4a1c9b07d32'
+down_revision: Union[str, None] = 'd3b8f61a2c57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create the data version and row count tables and backfill the counts."""
+    # The app's create_all creates missing tables on startup and
+    # ensure_row_counts fills them, so only create and backfill missing ones
+    tables = set(sa.inspect(op.get_bind()).get_table_names())
+    if 'data_versions' not in tables:
+        op.create_table(
+            'data_versions',
+            sa.Column('name', sa.String(length=50), nullable=False),
+            sa.Column('version', sa.Integer(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint('name')
+        )
+    if 'nav_entry_counts' not in tables:
+        op.create_table(
+            'nav_entry_counts',
+            sa.Column('isin', sa.String(length=12), nullable=False),
+            sa.Column('entry_count', sa.Integer(), nullable=False),
+            sa.Column('first_nav_date', sa.Date(), nullable=True),
+            sa.Column('last_nav_date', sa.Date(), nullable=True),
+            sa.PrimaryKeyConstraint('isin')
+        )
+        op.execute(
+            "INSERT INTO nav_entry_counts (isin, entry_count, first_nav_date, last_nav_date) "
+            "SELECT isin, COUNT(*), MIN(nav_date), MAX(nav_date) FROM nav_entries GROUP BY isin")
+    if 'trade_counts' not in tables:
+        op.create_table(
+            'trade_counts',
+            sa.Column('series_number', sa.String(length=50), nullable=False),
+            sa.Column('trade_count', sa.Integer(), nullable=False),
+            sa.Column('first_trade_date', sa.Date(), nullable=True),
+            sa.Column('last_trade_date', sa.Date(), nullable=True),
+            sa.PrimaryKeyConstraint('series_number')
+        )
+        # trades is created by the BNY loader via create_all, so it may be missing
+        if 'trades' in tables:
+            op.execute(
+                "INSERT INTO trade_counts (series_number, trade_count, first_trade_date, last_trade_date) "
+                "SELECT series_number, COUNT(*), MIN(trade_date), MAX(trade_date) "
+                "FROM trades GROUP BY series_number")
+
+
+def downgrade() -> None:
+    """Drop the data version and row count tables."""
+    op.drop_table('trade_counts')
+    op.drop_table('nav_entry_counts')
+    op.drop_table('data_versions')
@@ -0,0 +1,35 @@
+"""add job owner and heartbeat
+
+Revision ID: e6b3d9f2a417
+Revises: c2f7a5e19d48
+Create Date: 2026-10-16 00:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6b3d9f2a417'
+down_revision: Union[str, None] = 'c2f7a5e19d48'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add the owning process and heartbeat of background jobs."""
+    # Tables made by the app's create_all already have them
+    columns = {column['name']
+               for column in sa.inspect(op.get_bind()).get_columns('jobs')}
+    if 'owner' not in columns:
+        op.add_column('jobs', sa.Column('owner', sa.String(length=100), nullable=True))
+    if 'heartbeat_at' not in columns:
+        op.add_column('jobs', sa.Column('heartbeat_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Drop the owning process and heartbeat of background jobs."""
+    op.drop_column('jobs', 'heartbeat_at')
+    op.drop_column('jobs', 'owner')
@@ -0,0 +1,98 @@
+"""add summary tables
+
+Revision ID: f5c2d8e61b94
+Revises: e4a1c9b07d32
+Create Date: 2026-10-15 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f5c2d8e61b94'
+down_revision: Union[str, None] = 'e4a1c9b07d32'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create the NAV entry and trade summary tables and backfill them."""
+    # The app's create_all creates missing tables on startup and
+    # ensure_row_counts fills them, so only create and backfill missing ones
+    tables = set(sa.inspect(op.get_bind()).get_table_names())
+    if 'nav_entry_group_counts' not in tables:
+        op.create_table(
+            'nav_entry_group_counts',
+            sa.Column('isin', sa.String(length=12), nullable=False),
+            sa.Column('distribution_type', sa.String(length=20), nullable=False),
+            sa.Column('emitter', sa.String(length=10), nullable=False),
+            sa.Column('entry_count', sa.Integer(), nullable=False),
+            sa.Column('first_nav_date', sa.Date(), nullable=True),
+            sa.Column('last_nav_date', sa.Date(), nullable=True),
+            sa.PrimaryKeyConstraint('isin', 'distribution_type', 'emitter')
+        )
+        op.execute(
+            "INSERT INTO nav_entry_group_counts "
+            "(isin, distribution_type, emitter, entry_count, first_nav_date, last_nav_date) "
+            "SELECT isin, distribution_type, COALESCE(emitter, ''), COUNT(*), MIN(nav_date), MAX(nav_date) "
+            "FROM nav_entries GROUP BY isin, distribution_type, COALESCE(emitter, '')")
+    if 'nav_entry_summary' not in tables:
+        op.create_table(
+            'nav_entry_summary',
+            sa.Column('distribution_type', sa.String(length=20), nullable=False),
+            sa.Column('emitter', sa.String(length=10), nullable=False),
+            sa.Column('entry_count', sa.Integer(), nullable=False),
+            sa.Column('first_nav_date', sa.Date(), nullable=True),
+            sa.Column('last_nav_date', sa.Date(), nullable=True),
+            sa.PrimaryKeyConstraint('distribution_type', 'emitter')
+        )
+        op.execute(
+            "INSERT INTO nav_entry_summary "
+            "(distribution_type, emitter, entry_count, first_nav_date, last_nav_date) "
+            "SELECT distribution_type, emitter, SUM(entry_count), MIN(first_nav_date), MAX(last_nav_date) "
+            "FROM nav_entry_group_counts GROUP BY distribution_type, emitter")
+    if 'trade_group_counts' not in tables:
+        op.create_table(
+            'trade_group_counts',
+            sa.Column('series_number', sa.String(length=50), nullable=False),
+            sa.Column('source_folder', sa.String(length=255), nullable=False),
+            sa.Column('security_type', sa.String(length=50), nullable=False),
+            sa.Column('trade_count', sa.Integer(), nullable=False),
+            sa.Column('first_trade_date', sa.Date(), nullable=True),
+            sa.Column('last_trade_date', sa.Date(), nullable=True),
+            sa.PrimaryKeyConstraint('series_number', 'source_folder', 'security_type')
+        )
+        # trades is created by the BNY loader via create_all, so it may be missing
+        if 'trades' in tables:
+            op.execute(
+                "INSERT INTO trade_group_counts "
+                "(series_number, source_folder, security_type, trade_count, first_trade_date, last_trade_date) "
+                "SELECT series_number, COALESCE(source_folder, ''), COALESCE(security_type, ''), "
+                "COUNT(*), MIN(trade_date), MAX(trade_date) FROM trades "
+                "GROUP BY series_number, COALESCE(source_folder, ''), COALESCE(security_type, '')")
+    if 'trade_summary' not in tables:
+        op.create_table(
+            'trade_summary',
+            sa.Column('source_folder', sa.String(length=255), nullable=False),
+            sa.Column('security_type', sa.String(length=50), nullable=False),
+            sa.Column('trade_count', sa.Integer(), nullable=False),
+            sa.Column('first_trade_date', sa.Date(), nullable=True),
+            sa.Column('last_trade_date', sa.Date(), nullable=True),
+            sa.PrimaryKeyConstraint('source_folder', 'security_type')
+        )
+        op.execute(
+            "INSERT INTO trade_summary "
+            "(source_folder, security_type, trade_count, first_trade_date, last_trade_date) "
+            "SELECT source_folder, security_type, SUM(trade_count), MIN(first_trade_date), "
+            "MAX(last_trade_date) FROM trade_group_counts GROUP BY source_folder, security_type")
+
+
+def downgrade() -> None:
+    """Drop the summary tables."""
+    op.drop_table('trade_summary')
+    op.drop_table('trade_group_counts')
+    op.drop_table('nav_entry_summary')
+    op.drop_table('nav_entry_group_counts')
@@ -1,8 +1,10 @@
-from sqlalchemy import create_engine, Column, String, Float, Date, DateTime, Integer, ForeignKey, Enum, UniqueConstraint, Boolean, Text
+from sqlalchemy import Column, String, Float, Date, DateTime, Integer, ForeignKey, Enum, UniqueConstraint, Boolean, Text, Index, JSON
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from datetime import datetime
 import enum
+from db_engine import get_engine
+from config import DEFAULT_DB_CONNECTION_STRING
 
 Base = declarative_base()
 
@@ -25,7 +27,7 @@ class Series(Base):
 
     isin = Column(String(12), primary_key=True)
     common_code = Column(String(50))
-    series_number = Column(String(50))
+    series_number = Column(String(50), index=True)
     series_name = Column(String(255), nullable=False)
     status = Column(Enum(SeriesStatus))
     issuance_type = Column(String(50))
@@ -104,10 +106,15 @@ class NAVEntry(Base):
     emitter = Column(String(10))
     created_at = Column(DateTime, default=datetime.utcnow)
 
-    # Add unique constraint
+    # Add unique constraint. It also serves ISIN + date range lookups
+    # ordered by nav_date in either direction.
     __table_args__ = (
         UniqueConstraint('isin', 'nav_date',
                          name='uix_nav_entry_isin_date'),
+        Index('ix_nav_entries_emitter_nav_date', 'emitter', 'nav_date'),
+        Index('ix_nav_entries_distribution_type_emitter',
+              'distribution_type', 'emitter'),
+        Index('ix_nav_entries_series_number_isin', 'series_number', 'isin'),
     )
 
     # Relationship
@@ -143,12 +150,170 @@ class Trade(Base):
     updated_at = Column(DateTime, nullable=False,
                         default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    # Composite indexes for the /trades filters, all ordered by trade_date
+    __table_args__ = (
+        Index('ix_trades_series_number_trade_date',
+              'series_number', 'trade_date'),
+        Index('ix_trades_security_type_trade_date',
+              'security_type', 'trade_date'),
+        Index('ix_trades_trade_type_trade_date', 'trade_type', 'trade_date'),
+    )
+
     def __repr__(self):
         return f"<Trade(series_number='{self.series_number}', trade_date='{self.trade_date}', security_name='{self.security_name}')>"
 
 
-def init_db(connection_string='sqlite:///nav_data.db'):
+class ImportCheckpoint(Base):
+    """Progress ledger for resumable historic NAV imports"""
+    __tablename__ = 'import_checkpoints'
+
+    id = Column(Integer, primary_key=True)
+    workbook_hash = Column(String(64), nullable=False)  # SHA-256 of the file
+    sheet_name = Column(String(50), nullable=False)
+    # Last sheet row whose chunk has been committed
+    last_row = Column(Integer, nullable=False, default=0)
+    completed = Column(Boolean, nullable=False, default=False)
+    updated_at = Column(DateTime, nullable=False,
+                        default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint('workbook_hash', 'sheet_name',
+                         name='uix_import_checkpoint_workbook_sheet'),
+    )
+
+    def __repr__(self):
+        return f"<ImportCheckpoint(sheet='{self.sheet_name}', last_row={self.last_row}, completed={self.completed})>"
+
+
+class DataVersion(Base):
+    """Change counter per data set, bumped in the transaction that writes it"""
+    __tablename__ = 'data_versions'
+
+    # 'nav_entries', 'trades' or 'series' (series, custodians and fees)
+    name = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False,
+                        default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<DataVersion(name='{self.name}', version={self.version})>"
+
+
+class NAVEntryCount(Base):
+    """Maintained per-ISIN NAV entry counts used for cheap total estimates"""
+    __tablename__ = 'nav_entry_counts'
+
+    isin = Column(String(12), primary_key=True)
+    entry_count = Column(Integer, nullable=False, default=0)
+    first_nav_date = Column(Date)
+    last_nav_date = Column(Date)
+    # Incremented whenever the ISIN's rows are inserted or overwritten
+    change_version = Column(Integer, nullable=False, default=0, server_default='0')
+
+    def __repr__(self):
+        return f"<NAVEntryCount(isin='{self.isin}', count={self.entry_count})>"
+
+
+class TradeCount(Base):
+    """Maintained per-series trade counts used for cheap total estimates"""
+    __tablename__ = 'trade_counts'
+
+    series_number = Column(String(50), primary_key=True)
+    trade_count = Column(Integer, nullable=False, default=0)
+    first_trade_date = Column(Date)
+    last_trade_date = Column(Date)
+
+    def __repr__(self):
+        return f"<TradeCount(series_number='{self.series_number}', count={self.trade_count})>"
+
+
+class NAVEntryGroupCount(Base):
+    """Maintained NAV entry counts per ISIN, distribution type and emitter"""
+    __tablename__ = 'nav_entry_group_counts'
+
+    isin = Column(String(12), primary_key=True)
+    distribution_type = Column(String(20), primary_key=True)
+    emitter = Column(String(10), primary_key=True)  # '' when unknown
+    entry_count = Column(Integer, nullable=False, default=0)
+    first_nav_date = Column(Date)
+    last_nav_date = Column(Date)
+
+
+class NAVEntrySummary(Base):
+    """Maintained NAV entry totals per distribution type and emitter for /statistics"""
+    __tablename__ = 'nav_entry_summary'
+
+    distribution_type = Column(String(20), primary_key=True)
+    emitter = Column(String(10), primary_key=True)  # '' when unknown
+    entry_count = Column(Integer, nullable=False, default=0)
+    first_nav_date = Column(Date)
+    last_nav_date = Column(Date)
+
+    def __repr__(self):
+        return f"<NAVEntrySummary(distribution_type='{self.distribution_type}', emitter='{self.emitter}', count={self.entry_count})>"
+
+
+class TradeGroupCount(Base):
+    """Maintained trade counts per series, source folder and security type"""
+    __tablename__ = 'trade_group_counts'
+
+    series_number = Column(String(50), primary_key=True)
+    source_folder = Column(String(255), primary_key=True)  # '' when unknown
+    security_type = Column(String(50), primary_key=True)  # '' when unknown
+    trade_count = Column(Integer, nullable=False, default=0)
+    first_trade_date = Column(Date)
+    last_trade_date = Column(Date)
+
+
+class TradeSummary(Base):
+    """Maintained trade totals per source folder and security type for /trades/summary"""
+    __tablename__ = 'trade_summary'
+
+    source_folder = Column(String(255), primary_key=True)  # '' when unknown
+    security_type = Column(String(50), primary_key=True)  # '' when unknown
+    trade_count = Column(Integer, nullable=False, default=0)
+    first_trade_date = Column(Date)
+    last_trade_date = Column(Date)
+
+    def __repr__(self):
+        return f"<TradeSummary(source_folder='{self.source_folder}', security_type='{self.security_type}', count={self.trade_count})>"
+
+
+class JobStatus(enum.Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class Job(Base):
+    """Background job run by the API, e.g. a NAV fetch or template generation"""
+    __tablename__ = 'jobs'
+
+    id = Column(String(32), primary_key=True)  # uuid4 hex
+    job_type = Column(String(50), nullable=False)
+    status = Column(Enum(JobStatus), nullable=False, default=JobStatus.QUEUED)
+    params = Column(JSON)
+    stage = Column(String(50))  # Current pipeline stage while running
+    stages = Column(JSON)  # [{'stage': ..., 'started_at': ...}] in order
+    result = Column(JSON)
+    error = Column(Text)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    owner = Column(String(100))  # hostname:pid of the API process running it
+    heartbeat_at = Column(DateTime)  # Refreshed by the owner while queued or running
+
+    __table_args__ = (
+        Index('ix_jobs_status_created_at', 'status', 'created_at'),
+    )
+
+    def __repr__(self):
+        return f"<Job(id='{self.id}', type='{self.job_type}', status='{self.status}')>"
+
+
+def init_db(connection_string=DEFAULT_DB_CONNECTION_STRING, db_config=None):
     """Initialize the database and create tables"""
-    engine = create_engine(connection_string)
+    engine = get_engine(connection_string, db_config)
     Base.metadata.create_all(engine)
     return sessionmaker(bind=engine)
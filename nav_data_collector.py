@@ -3,7 +3,7 @@ from pathlib import Path
 import logging
 import tempfile
 from typing import Dict, List, Tuple, Optional, Set, Union
-from ftp_service import FTPService
+from ftp_service import FTPService, RemoteFile, read_csv_bytes, shared_connection_limiter
 from datetime import datetime
 import concurrent.futures
 from config import AppConfig, FILE_PATTERNS, EMITTERS, FILE_TYPES
@@ -26,11 +26,16 @@ class NAVDataCollector:
         """
         self.config = config
         self.mode = config.mode.lower()
+        # The limiter is shared with every other collector in the process
         self.ftp_service = FTPService(
-            config.ftp_configs) if config.ftp_configs else None
+            config.ftp_configs,
+            limiter=shared_connection_limiter(
+                config.ftp_max_connections, config.ftp_max_connections_per_host)
+        ) if config.ftp_configs else None
         self.input_dir = Path(config.input_dir)
         self.template_dir = Path(config.template_dir)
-        self.temp_dir = Path(tempfile.gettempdir()) / "nav_processor"
+        self.temp_dir = Path(config.temp_dir) if config.temp_dir \
+            else Path(tempfile.gettempdir()) / "nav_processor"
         self.max_workers = config.max_workers
 
         # Create directories
@@ -40,6 +45,10 @@ class NAVDataCollector:
         # Thread-safe queue for Google Drive uploads if needed
         self.upload_queue = Queue() if config.drive_config else None
 
+        # (emitter, filename) -> original bytes of the files downloaded by
+        # the current collect_nav_data run
+        self.downloaded_files: Dict[Tuple[str, str], bytes] = {}
+
     def _create_directories(self):
         """Create necessary directories for local mode"""
         self.input_dir.mkdir(parents=True, exist_ok=True)
@@ -93,26 +102,62 @@ class NAVDataCollector:
         logger.debug(f"Found {len(input_files)} input CSV files")
         return input_files
 
-    def _get_input_file_list(self, date_str: str) -> List[Tuple[str, str]]:
+    def _get_input_file_list(self, date_str: str, file_type: Optional[str] = None,
+                             emitters: Optional[List[str]] = None) -> List[Tuple[str, str]]:
         """
         Generate list of input files with their emitters for a given date.
 
         Args:
             date_str: Date string in format MMDDYYYY
+            file_type: Optional file type; only its pattern is listed. None for all.
+            emitters: Optional emitters to list files for. None for all.
 
         Returns:
             List of (emitter, filename) tuples
         """
         input_files = []
+        file_types = [t for t in FILE_TYPES if not file_type or t == file_type]
 
-        for emitter in EMITTERS:
-            for file_type in FILE_TYPES:
-                pattern = FILE_PATTERNS[file_type]
+        for emitter in emitters if emitters is not None else EMITTERS:
+            for pattern_type in file_types:
+                pattern = FILE_PATTERNS[pattern_type]
                 filename = pattern.format(date_str=date_str, emitter=emitter)
                 input_files.append((emitter, filename))
 
         return input_files
 
+    def _plan_emitters(self, target_isins: Optional[Set[str]],
+                       isin_emitters: Optional[Dict[str, Set[str]]]) -> List[str]:
+        """
+        Emitters whose files can hold rows for the target ISINs
+
+        Uses the emitters each ISIN has been published by before. If any
+        target ISIN has no known emitter (new series, or only historic
+        imports) every emitter is kept, since it could appear anywhere.
+
+        Args:
+            target_isins: Optional set of target ISINs. None for all.
+            isin_emitters: Emitters keyed by ISIN, see DBManager.get_emitters_by_isin
+
+        Returns:
+            List of emitters, in EMITTERS order
+        """
+        if not target_isins or isin_emitters is None:
+            return list(EMITTERS)
+
+        wanted = set()
+        for isin in target_isins:
+            known = isin_emitters.get(isin, set()) & set(EMITTERS)
+            if not known:
+                logger.info(f"No emitter known for ISIN {isin}, requesting every emitter")
+                return list(EMITTERS)
+            wanted |= known
+
+        emitters = [emitter for emitter in EMITTERS if emitter in wanted]
+        logger.info(f"Target ISINs were published by {', '.join(emitters)}; "
+                    f"skipping {len(EMITTERS) - len(emitters)} emitters")
+        return emitters
+
     def _clean_dataframe(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         Clean and standardize DataFrame
@@ -157,6 +202,10 @@ class NAVDataCollector:
         """
         Process a single FTP file download
 
+        The file is downloaded and parsed in memory. Its original bytes are
+        archived to the emitter's input directory and kept for the Drive
+        upload (see get_downloaded_files).
+
         Args:
             emitter: The emitter name
             filename: The filename to download
@@ -168,20 +217,19 @@ class NAVDataCollector:
             logger.warning("FTP service not configured")
             return None
 
-        temp_file = self.temp_dir / f"{emitter}_{filename}"
-
         try:
             # Download the file
-            df = self.ftp_service.download_file(emitter, filename, temp_file)
+            data = self.ftp_service.download_bytes(emitter, filename)
 
-            if df is not None:
-                # Clean up the DataFrame
-                df = self._clean_dataframe(df)
+            if data is not None:
+                # Parse and clean up the DataFrame
+                df = self._clean_dataframe(read_csv_bytes(data))
 
-                # Save to input directory
+                # Archive the original file to the input directory
                 input_path = self.input_dir / emitter / filename
                 input_path.parent.mkdir(exist_ok=True)
-                df.to_csv(input_path, index=False)
+                input_path.write_bytes(data)
+                self.downloaded_files[(emitter, filename)] = data
 
                 # Add file type based on filename
                 if 'Wrappers Hybrid' in filename:
@@ -204,13 +252,14 @@ class NAVDataCollector:
                     f"Error processing {filename} from {emitter}: {str(e)}")
             return None
 
-        finally:
-            # Clean up temp file
-            if temp_file.exists():
-                try:
-                    temp_file.unlink()
-                except Exception:
-                    pass
+    def get_downloaded_files(self) -> List[Tuple[str, bytes]]:
+        """
+        Original contents of the files downloaded by the last collect_nav_data
+
+        Returns:
+            List of (filename, bytes) tuples
+        """
+        return [(filename, data) for (_, filename), data in self.downloaded_files.items()]
 
     def _read_exclude_isins(self) -> Set[str]:
         """
@@ -234,22 +283,30 @@ class NAVDataCollector:
 
     def collect_nav_data(self, date_str: str, target_isins: Optional[Set[str]] = None,
                          exclude_isins: Optional[Set[str]] = None,
-                         file_type: Optional[str] = None) -> List[Tuple[str, pd.DataFrame]]:
+                         file_type: Optional[str] = None,
+                         isin_emitters: Optional[Dict[str, Set[str]]] = None) -> List[Tuple[str, pd.DataFrame]]:
         """
         Collect NAV data from all sources
 
+        Only files that can contribute rows are downloaded: those matching
+        file_type and, given isin_emitters, those of emitters that have
+        published the target ISINs.
+
         Args:
             date_str: Date string in format MMDDYYYY
             target_isins: Optional set of target ISINs to filter for
             exclude_isins: Optional set of ISINs to exclude
             file_type: Optional file type to filter for ('hybrid', 'loan'). None to include all.
+            isin_emitters: Optional emitters keyed by ISIN, used to skip
+                emitters that never published any target ISIN
 
         Returns:
             List of (emitter, dataframe) tuples
         """
-        nav_dfs = []
-        missing_files = []
-        input_files = self._get_input_file_list(date_str)
+        emitters = self._plan_emitters(target_isins, isin_emitters)
+        input_files = self._get_input_file_list(date_str, file_type, emitters)
+        logger.info(f"Requesting {len(input_files)} NAV files from {len(emitters)} emitters")
+        self.downloaded_files = {}
 
         # Convert date_str to datetime for filtering
         # date_str is in format MMDDYYYY
@@ -261,56 +318,172 @@ class NAVDataCollector:
             raise ValueError(
                 f"Invalid date format: {date_str}, expected MMDDYYYY")
 
-        # Process files concurrently with a smaller number of workers
-        with concurrent.futures.ThreadPoolExecutor(max_workers=min(3, self.max_workers)) as executor:
-            future_to_file = {
-                executor.submit(self._process_ftp_file, emitter, filename): (emitter, filename)
-                for emitter, filename in input_files
-            }
-
-            for future in concurrent.futures.as_completed(future_to_file):
-                emitter, filename = future_to_file[future]
-                try:
-                    df = future.result()
-                    if df is None:
-                        missing_files.append(filename)
-                        continue
-
-                    # Drop rows with missing required values
-                    required_cols = ['ISIN', 'NAV',
-                                     'Valuation Period-End Date']
-                    df = df.dropna(subset=required_cols)
-
-                    # Apply date filter - keep only rows for the specified date
-                    df['Date'] = df['Valuation Period-End Date'].dt.date
-                    df = df[df['Date'] == target_date]
-
-                    # Remove the temporary date column
-                    df = df.drop(columns=['Date'])
-
-                    # Apply ISIN filters
-                    if target_isins:
-                        df = df[df['ISIN'].isin(target_isins)]
-                    if exclude_isins:
-                        df = df[~df['ISIN'].isin(exclude_isins)]
-
-                    # Apply file_type filter if specified
-                    if file_type and 'file_type' in df.columns:
-                        df = df[df['file_type'] == file_type]
-
-                    if not df.empty:
-                        nav_dfs.append((emitter, df))
-                        logger.info(
-                            f"Processed {emitter} file: {filename} with {len(df)} entries for {target_date}")
-                    else:
-                        logger.info(
-                            f"No entries found for {target_date} in {emitter} file: {filename}")
-
-                except Exception as e:
-                    logger.error(f"Error processing {filename}: {str(e)}")
+        try:
+            nav_dfs, missing_files = self._download_and_filter(
+                input_files, target_date, target_isins, exclude_isins, file_type)
+        finally:
+            # Emitters close their own sessions; this catches any left open
+            if self.ftp_service:
+                self.ftp_service.close()
 
         if missing_files:
             logger.warning(
                 f"Some files were not found: {len(missing_files)} files")
 
         return nav_dfs
+
+    def _list_emitter_files(self, emitter: str) -> Optional[Dict[str, RemoteFile]]:
+        """An emitter's FTP directory listing, or None if it cannot be listed"""
+        try:
+            return self.ftp_service.list_files(emitter)
+        except Exception as e:
+            logger.warning(
+                f"Could not list {emitter} FTP directory, requesting every file: {str(e)}")
+            return None
+
+    def _plan_emitter_downloads(self, emitter: str,
+                                filenames: List[str]) -> Tuple[List[str], List[str]]:
+        """
+        Keep an emitter's input files that exist on its FTP server
+
+        Lists the emitter's directory once, so files that were not published
+        that day cost no RETR. If the listing fails every file is kept and
+        requested as before.
+
+        Returns:
+            Tuple of (filenames to download, filenames missing from the
+            listing or empty)
+        """
+        listing = self._list_emitter_files(emitter) if self.ftp_service else None
+        if listing is None:
+            return filenames, []
+
+        planned = []
+        missing_files = []
+        for filename in filenames:
+            remote_file = listing.get(filename)
+            if remote_file is None or remote_file.size == 0:
+                missing_files.append(filename)
+                continue
+
+            logger.debug(f"Found {emitter} file {filename}: {remote_file.size} bytes, "
+                         f"modified {remote_file.modified}")
+            planned.append(filename)
+
+        logger.info(f"Planned {len(planned)} of {len(filenames)} {emitter} NAV file downloads")
+        return planned, missing_files
+
+    def _collect_emitter_files(self, emitter: str,
+                               filenames: List[str]) -> List[Tuple[str, Optional[pd.DataFrame]]]:
+        """
+        List, download and parse one emitter's files over its FTP session
+
+        The session is closed once the emitter is done, handing its
+        connection slot to the next emitter waiting on the same host.
+
+        Returns:
+            List of (filename, DataFrame or None if missing) tuples
+        """
+        try:
+            planned, missing_files = self._plan_emitter_downloads(emitter, filenames)
+            results = [(filename, None) for filename in missing_files]
+            for filename in planned:
+                results.append((filename, self._process_ftp_file(emitter, filename)))
+            return results
+        finally:
+            if self.ftp_service:
+                self.ftp_service.close_session(emitter)
+
+    def _order_by_host(self, emitters: List[str]) -> List[str]:
+        """
+        Order emitters so each host gets one before any gets a second
+
+        Workers then start on idle hosts first instead of queueing for the
+        connection slot of a host another emitter is already using.
+        """
+        ftp_configs = self.config.ftp_configs or {}
+        turns: Dict[str, int] = {}
+        ranked = []
+        for emitter in emitters:
+            ftp_config = ftp_configs.get(emitter)
+            host = ftp_config.host if ftp_config else emitter
+            ranked.append((turns.get(host, 0), emitter))
+            turns[host] = turns.get(host, 0) + 1
+        return [emitter for _, emitter in sorted(ranked, key=lambda item: item[0])]
+
+    def _download_and_filter(self, input_files: List[Tuple[str, str]], target_date,
+                             target_isins: Optional[Set[str]],
+                             exclude_isins: Optional[Set[str]],
+                             file_type: Optional[str]) -> Tuple[List[Tuple[str, pd.DataFrame]], List[str]]:
+        """
+        Download the input files and filter their rows; see collect_nav_data
+
+        Emitters are collected concurrently on up to max_workers threads.
+        The FTP service's connection limits decide how many run at once on
+        one host; emitters on different hosts proceed in parallel.
+
+        Returns:
+            Tuple of ((emitter, dataframe) list, names of missing files)
+        """
+        nav_dfs = []
+        missing_files = []
+
+        files_by_emitter: Dict[str, List[str]] = {}
+        for emitter, filename in input_files:
+            files_by_emitter.setdefault(emitter, []).append(filename)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            future_to_emitter = {
+                executor.submit(self._collect_emitter_files, emitter, files_by_emitter[emitter]): emitter
+                for emitter in self._order_by_host(list(files_by_emitter))
+            }
+
+            for future in concurrent.futures.as_completed(future_to_emitter):
+                emitter = future_to_emitter[future]
+                try:
+                    results = future.result()
+                except Exception as e:
+                    logger.error(f"Error collecting {emitter} files: {str(e)}")
+                    missing_files.extend(files_by_emitter[emitter])
+                    continue
+
+                for filename, df in results:
+                    try:
+                        if df is None:
+                            missing_files.append(filename)
+                            continue
+
+                        # Drop rows with missing required values
+                        required_cols = ['ISIN', 'NAV',
+                                         'Valuation Period-End Date']
+                        df = df.dropna(subset=required_cols)
+
+                        # Apply date filter - keep only rows for the specified date
+                        df['Date'] = df['Valuation Period-End Date'].dt.date
+                        df = df[df['Date'] == target_date]
+
+                        # Remove the temporary date column
+                        df = df.drop(columns=['Date'])
+
+                        # Apply ISIN filters
+                        if target_isins:
+                            df = df[df['ISIN'].isin(target_isins)]
+                        if exclude_isins:
+                            df = df[~df['ISIN'].isin(exclude_isins)]
+
+                        # Apply file_type filter if specified
+                        if file_type and 'file_type' in df.columns:
+                            df = df[df['file_type'] == file_type]
+
+                        if not df.empty:
+                            nav_dfs.append((emitter, df))
+                            logger.info(
+                                f"Processed {emitter} file: {filename} with {len(df)} entries for {target_date}")
+                        else:
+                            logger.info(
+                                f"No entries found for {target_date} in {emitter} file: {filename}")
+
+                    except Exception as e:
+                        logger.error(f"Error processing {filename}: {str(e)}")
+
+        return nav_dfs, missing_files
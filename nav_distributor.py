@@ -129,12 +129,13 @@ Many thanks,""")
             logger.error(f"Error sending email: {str(e)}")
             return False
 
-    def upload_input_files_to_drive(self, input_file_paths: List[Path], folder_id: str) -> int:
+    def upload_input_files_to_drive(self, input_files: List[Tuple[str, bytes]], folder_id: str) -> int:
         """
         Upload input CSV files to Google Drive
 
         Args:
-            input_file_paths: List of paths to input CSV files
+            input_files: List of (filename, original contents) tuples, as
+                downloaded from the FTP servers
             folder_id: Google Drive folder ID to upload to
 
         Returns:
@@ -146,14 +147,14 @@ Many thanks,""")
 
         uploads_count = 0
 
-        for file_path in input_file_paths:
+        for filename, data in input_files:
             try:
-                self.drive_service.upload_file(file_path, folder_id)
+                self.drive_service.upload_bytes(data, filename, folder_id)
                 uploads_count += 1
                 # Don't log every file to avoid verbose output
             except Exception as e:
                 logger.error(
-                    f"Error uploading input file {file_path.name} to Google Drive: {str(e)}")
+                    f"Error uploading input file {filename} to Google Drive: {str(e)}")
 
         if uploads_count > 0:
             logger.info(
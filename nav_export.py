@@ -0,0 +1,142 @@
+"""
+Streaming writers for bulk NAV exports.
+
+Each writer consumes chunks of NAV rows as they come off a database cursor
+and yields encoded bytes per chunk, so the response starts immediately and
+memory stays bounded by the chunk size whatever the export size.
+
+Parquet and Arrow IPC need pyarrow; CSV works without it.
+"""
+import csv
+import io
+from typing import Iterable, Iterator, List, Tuple
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet/Arrow exports are unavailable without pyarrow
+    pa = None
+    pq = None
+
+# Output columns, in order, as produced by DatabaseService.iter_nav_export
+EXPORT_COLUMNS = ['isin', 'series_number', 'nav_date',
+                  'nav_value', 'distribution_type', 'emitter']
+
+# format -> (mimetype, file extension)
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrows'),
+}
+
+NAVRow = Tuple[str, str, object, float, str, str]
+
+
+def requires_pyarrow(export_format: str) -> bool:
+    return export_format in ('parquet', 'arrow')
+
+
+def pyarrow_available() -> bool:
+    return pa is not None
+
+
+class _ChunkSink:
+    """Write-only file object whose contents are drained after each chunk"""
+
+    def __init__(self):
+        self._buffer = io.BytesIO()
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        written = self._buffer.write(data)
+        self._position += written
+        return written
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return data
+
+
+def stream_csv(chunks: Iterable[List[NAVRow]]) -> Iterator[bytes]:
+    """Yield a header line, then one CSV block per chunk"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    yield buffer.getvalue().encode('utf-8')
+
+    for rows in chunks:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue().encode('utf-8')
+
+
+def _arrow_schema():
+    return pa.schema([
+        ('isin', pa.string()),
+        ('series_number', pa.string()),
+        ('nav_date', pa.date32()),
+        ('nav_value', pa.float64()),
+        ('distribution_type', pa.string()),
+        ('emitter', pa.string()),
+    ])
+
+
+def _record_batch(schema, rows: List[NAVRow]):
+    columns = list(zip(*rows))
+    return pa.RecordBatch.from_arrays(
+        [pa.array(column, type=field.type)
+         for column, field in zip(columns, schema)],
+        schema=schema)
+
+
+def stream_parquet(chunks: Iterable[List[NAVRow]]) -> Iterator[bytes]:
+    """Yield a Parquet file with one row group per chunk"""
+    schema = _arrow_schema()
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        for rows in chunks:
+            if rows:
+                writer.write_batch(_record_batch(schema, rows))
+                yield sink.drain()
+    finally:
+        writer.close()
+    # Footer
+    yield sink.drain()
+
+
+def stream_arrow(chunks: Iterable[List[NAVRow]]) -> Iterator[bytes]:
+    """Yield an Arrow IPC stream with one record batch per chunk"""
+    schema = _arrow_schema()
+    sink = _ChunkSink()
+    writer = pa.ipc.new_stream(sink, schema)
+    try:
+        yield sink.drain()
+        for rows in chunks:
+            if rows:
+                writer.write_batch(_record_batch(schema, rows))
+                yield sink.drain()
+    finally:
+        writer.close()
+    # End-of-stream marker
+    yield sink.drain()
+
+
+EXPORT_WRITERS = {
+    'csv': stream_csv,
+    'parquet': stream_parquet,
+    'arrow': stream_arrow,
+}
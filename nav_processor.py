@@ -1,8 +1,8 @@
 import logging
-from typing import List, Dict, Tuple, Optional, Set, Union
+from typing import Any, Callable, List, Dict, Tuple, Optional, Set, Union
 from pathlib import Path
 from datetime import datetime
-from config import AppConfig, DEFAULT_FTP_CONFIGS
+from config import AppConfig, DEFAULT_FTP_CONFIGS, DEFAULT_DB_CONNECTION_STRING
 from nav_data_collector import NAVDataCollector
 from template_manager import TemplateManager
 from nav_distributor import NAVDistributor
@@ -18,8 +18,8 @@ class NAVProcessor:
 
     def __init__(self, config: AppConfig = None, mode: str = "local",
                  ftp_configs: Dict = None, smtp_config: Dict = None,
-                 drive_config: Dict = None, db_connection_string: str = 'sqlite:///nav_data.db',
-                 max_workers: int = 5):
+                 drive_config: Dict = None, db_connection_string: str = DEFAULT_DB_CONNECTION_STRING,
+                 max_workers: int = 5, db_manager: Optional[DBManager] = None):
         """
         Initialize the NAV processor
 
@@ -31,6 +31,8 @@ class NAVProcessor:
             drive_config: Google Drive configuration for file syncing
             db_connection_string: Database connection string
             max_workers: Maximum number of concurrent workers for file operations
+            db_manager: Optional existing DBManager to share, e.g. between
+                background jobs, instead of opening a new database service
         """
         # Create config if not provided
         if config is None:
@@ -49,7 +51,7 @@ class NAVProcessor:
         self.collector = NAVDataCollector(config)
         self.template_manager = TemplateManager(config)
         self.distributor = NAVDistributor(config)
-        self.db_manager = DBManager(config)
+        self.db_manager = db_manager or DBManager(config)
 
         # Configure logging level
         if config.log_level:
@@ -92,7 +94,8 @@ class NAVProcessor:
                      isin_filter: Union[str, List[str], None] = None,
                      distribution_type: str = 'morningstar',
                      template_types: List[str] = ['morningstar', 'six'],
-                     file_type: Optional[str] = None):
+                     file_type: Optional[str] = None,
+                     progress: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
         """
         Process NAV files and update templates
 
@@ -109,7 +112,18 @@ class NAVProcessor:
             distribution_type: Type of distribution
             template_types: List of templates to update ('morningstar', 'six')
             file_type: Optional filter by file type ('hybrid', 'loan'). This filters based on filename patterns.
+            progress: Optional callback invoked with the name of each stage as
+                it starts (collecting, uploading_inputs, updating_templates,
+                sending_emails, uploading_templates, saving)
+
+        Returns:
+            Dict with nav_files, nav_entries, templates, emails_sent and the
+            added, duplicates and invalids counts of the database save
         """
+        def report(stage: str):
+            if progress:
+                progress(stage)
+
         try:
             # Clean up directories
             self.template_manager.cleanup_output_directory()
@@ -146,31 +160,37 @@ class NAVProcessor:
                     target_isins = self.db_manager.get_target_isins(
                         isin_filter)
 
+            isin_emitters = None
             if target_isins:
                 logger.info(
                     f"Filtering for ISINs: {len(target_isins)} ISINs selected")
+                # Lets the collector skip emitters that never published them
+                isin_emitters = self.db_manager.get_emitters_by_isin(target_isins)
 
             # Read exclude ISINs
             exclude_isins = self.collector._read_exclude_isins()
 
             # Collect NAV data - use the derived file_type
+            report('collecting')
             nav_dfs = self.collector.collect_nav_data(
-                date_str, target_isins, exclude_isins, derived_file_type)
+                date_str, target_isins, exclude_isins, derived_file_type, isin_emitters)
             if not nav_dfs:
                 raise ValueError("No NAV files could be processed")
 
             # Upload input CSV files to Google Drive if configured
             if self.config.drive_config and self.config.drive_config.input_folder_id:
-                input_file_paths = self.collector.get_input_file_paths()
-                if input_file_paths:
+                report('uploading_inputs')
+                input_files = self.collector.get_downloaded_files()
+                if input_files:
                     uploaded_count = self.distributor.upload_input_files_to_drive(
-                        input_file_paths,
+                        input_files,
                         self.config.drive_config.input_folder_id
                     )
                     logger.info(
                         f"Uploaded {uploaded_count} input CSV files to Google Drive")
 
             # Update templates
+            report('updating_templates')
             output_paths = []
 
             for template_type in template_types:
@@ -199,7 +219,9 @@ class NAVProcessor:
                     raise
 
             # Handle email sending if requested
+            emails_sent = 0
             if send_email and to_emails:
+                report('sending_emails')
                 if isinstance(to_emails, str):
                     to_emails = [to_emails]
 
@@ -220,17 +242,31 @@ class NAVProcessor:
                             distribution_type=template_type.lower(),
                             nav_dfs=nav_dfs
                         )
+                        emails_sent += 1
 
             # Upload to Drive if configured
             if output_paths:
+                report('uploading_templates')
                 self.distributor.upload_to_drive(output_paths, template_types)
 
             # Save to database
-            self.db_manager.save_nav_data(nav_dfs, distribution_type)
+            report('saving')
+            added, duplicates, invalids = self.db_manager.save_nav_data(
+                nav_dfs, distribution_type)
 
             # Clean up
             self.cleanup()
 
+            return {
+                'nav_files': len(nav_dfs),
+                'nav_entries': sum(len(df) for _, df in nav_dfs),
+                'templates': [path.name for path in output_paths],
+                'emails_sent': emails_sent,
+                'added': added,
+                'duplicates': duplicates,
+                'invalids': invalids
+            }
+
         except Exception as e:
             logger.error(f"Error in NAV processing: {str(e)}")
             self.cleanup()
@@ -281,7 +317,7 @@ def main():
     processor = NAVProcessor(
         mode="remote",
         ftp_configs=DEFAULT_FTP_CONFIGS,
-        db_connection_string='sqlite:///nav_data.db'
+        db_connection_string=DEFAULT_DB_CONNECTION_STRING
     )
 
     # Process NAVs and save to database
@@ -0,0 +1,258 @@
+"""
+Read-optimized, memory-mapped NAV time series kept next to the database.
+
+Each ISIN has one .npy file holding a single record whose fields are whole
+columns (id, nav_date, nav_value, emitter, distribution_type), each stored
+as one contiguous block sorted by nav_date. Loading it with mmap_mode='r'
+maps the file without reading it, a date range is a binary search on the
+nav_date column, and the result is a slice of each column.
+
+The record also carries the ISIN's change version from nav_entry_counts at
+the time it was written. A file whose version differs from the database
+missed a write and is rebuilt rather than served.
+
+Files are replaced atomically, so readers holding an older map keep a
+consistent view while a writer merges new rows in.
+"""
+import os
+import re
+import tempfile
+import threading
+from datetime import date, datetime
+from typing import Iterable, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+# Field widths follow the nav_entries column lengths
+EMITTER_DTYPE = 'S10'
+DISTRIBUTION_TYPE_DTYPE = 'S20'
+
+_SAFE_NAME = re.compile(r'[^A-Za-z0-9_-]')
+
+
+class NAVSeries(NamedTuple):
+    """Column views for one ISIN, sorted by nav_date ascending"""
+    ids: np.ndarray
+    nav_dates: np.ndarray  # datetime64[D]
+    nav_values: np.ndarray
+    emitters: np.ndarray
+    distribution_types: np.ndarray
+
+    @property
+    def length(self) -> int:
+        return len(self.nav_dates)
+
+    def slice(self, start: int, stop: int) -> 'NAVSeries':
+        return NAVSeries(*(column[start:stop] for column in self))
+
+    def points(self, isin: str, series_number: Optional[str] = None,
+               newest_first: bool = False):
+        """Materialize the rows as NAVPoints; meant for page-sized slices"""
+        step = -1 if newest_first else 1
+        return [
+            NAVPoint(id=entry_id, isin=isin, series_number=series_number,
+                     nav_date=nav_date, nav_value=nav_value,
+                     distribution_type=distribution_type.decode() or None,
+                     emitter=emitter.decode() or None)
+            for entry_id, nav_date, nav_value, emitter, distribution_type in zip(
+                self.ids[::step].tolist(),
+                self.nav_dates[::step].astype(object),
+                self.nav_values[::step].tolist(),
+                self.emitters[::step].tolist(),
+                self.distribution_types[::step].tolist())
+        ]
+
+
+class NAVPoint(NamedTuple):
+    """One NAV row read from the store, with NAVEntry's attribute names"""
+    id: int
+    isin: str
+    series_number: Optional[str]
+    nav_date: date
+    nav_value: float
+    distribution_type: Optional[str]
+    emitter: Optional[str]
+
+
+def _record_dtype(length: int) -> np.dtype:
+    return np.dtype([
+        ('version', '<i8'),
+        ('id', '<i8', (length,)),
+        ('nav_date', '<M8[D]', (length,)),
+        ('nav_value', '<f8', (length,)),
+        ('emitter', EMITTER_DTYPE, (length,)),
+        ('distribution_type', DISTRIBUTION_TYPE_DTYPE, (length,)),
+    ])
+
+
+def to_datetime64(value) -> Optional[np.datetime64]:
+    """Convert a date/datetime filter value to datetime64[D]"""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        value = value.date()
+    return np.datetime64(value, 'D')
+
+
+class NAVTimeSeriesStore:
+    """Per-ISIN memory-mapped NAV columns under root_dir"""
+
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+        self._write_lock = threading.Lock()
+
+    def _path(self, isin: str) -> str:
+        return os.path.join(self.root_dir, f"{_SAFE_NAME.sub('_', isin)}.npy")
+
+    def _load_record(self, isin: str) -> Optional[np.ndarray]:
+        try:
+            return np.load(self._path(isin), mmap_mode='r')
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def _record_version(record: np.ndarray) -> Optional[int]:
+        # Files written before versions were stored have none
+        if 'version' not in record.dtype.names:
+            return None
+        return int(record['version'])
+
+    def load(self, isin: str) -> Optional[NAVSeries]:
+        """Map the columns for an ISIN, or None if it has no file yet"""
+        record = self._load_record(isin)
+        if record is None:
+            return None
+        return self._record_series(record)
+
+    @staticmethod
+    def _record_series(record: np.ndarray) -> NAVSeries:
+        return NAVSeries(
+            ids=record['id'],
+            nav_dates=record['nav_date'],
+            nav_values=record['nav_value'],
+            emitters=record['emitter'],
+            distribution_types=record['distribution_type'],
+        )
+
+    def date_range_bounds(self, series: NAVSeries, start_date=None,
+                          end_date=None) -> Tuple[int, int]:
+        """Index bounds [start, stop) of the rows within an inclusive date range"""
+        start = 0 if start_date is None else int(np.searchsorted(
+            series.nav_dates, to_datetime64(start_date), side='left'))
+        stop = series.length if end_date is None else int(np.searchsorted(
+            series.nav_dates, to_datetime64(end_date), side='right'))
+        return start, max(start, stop)
+
+    def read(self, isin: str, start_date=None, end_date=None) -> Optional[NAVSeries]:
+        """Rows for an ISIN within an inclusive date range"""
+        series = self.load(isin)
+        if series is None:
+            return None
+        return series.slice(*self.date_range_bounds(series, start_date, end_date))
+
+    def _write(self, isin: str, series: NAVSeries, version: int):
+        os.makedirs(self.root_dir, exist_ok=True)
+        record = np.zeros((), dtype=_record_dtype(series.length))
+        record['version'] = version
+        record['id'] = series.ids
+        record['nav_date'] = series.nav_dates
+        record['nav_value'] = series.nav_values
+        record['emitter'] = series.emitters
+        record['distribution_type'] = series.distribution_types
+
+        fd, temp_path = tempfile.mkstemp(dir=self.root_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, record)
+            os.replace(temp_path, self._path(isin))
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    @staticmethod
+    def _rows_to_series(rows: Iterable[Tuple[int, date, float, str, str]]) -> NAVSeries:
+        """Build columns from (id, nav_date, nav_value, emitter, distribution_type) rows"""
+        ids, nav_dates, nav_values, emitters, distribution_types = zip(*rows) \
+            if rows else ((), (), (), (), ())
+        series = NAVSeries(
+            ids=np.asarray(ids, dtype='<i8'),
+            nav_dates=np.asarray(nav_dates, dtype='<M8[D]'),
+            nav_values=np.asarray(nav_values, dtype='<f8'),
+            emitters=np.asarray([e or '' for e in emitters], dtype=EMITTER_DTYPE),
+            distribution_types=np.asarray(
+                [d or '' for d in distribution_types], dtype=DISTRIBUTION_TYPE_DTYPE),
+        )
+        order = np.argsort(series.nav_dates, kind='stable')
+        return NAVSeries(*(column[order] for column in series))
+
+    def _remove(self, isin: str):
+        if os.path.exists(self._path(isin)):
+            os.remove(self._path(isin))
+
+    def replace(self, isin: str, rows: Iterable[Tuple[int, date, float, str, str]],
+                version: int):
+        """Rewrite an ISIN's file from the full set of its database rows"""
+        series = self._rows_to_series(list(rows))
+        with self._write_lock:
+            if series.length:
+                self._write(isin, series, version)
+            else:
+                # Zero-length columns can't be memory-mapped
+                self._remove(isin)
+
+    def merge(self, isin: str, rows: Iterable[Tuple[int, date, float, str, str]],
+              base_version: int, version: int):
+        """
+        Merge database rows into an ISIN's file; a row replaces any stored row
+        with the same nav_date. New dates past the end are a plain append.
+
+        The file must be at base_version, the ISIN's change version before the
+        write that produced the rows, and is stamped with version afterwards.
+        A file at any other version missed a write, so it is removed instead
+        and rebuilt on the next read.
+        """
+        incoming = self._rows_to_series(list(rows))
+        if not incoming.length:
+            return
+
+        with self._write_lock:
+            record = self._load_record(isin)
+            if record is not None and self._record_version(record) != base_version:
+                self._remove(isin)
+                return
+            existing = None if record is None else self._record_series(record)
+            if existing is None or not existing.length:
+                self._write(isin, incoming, version)
+                return
+
+            if incoming.nav_dates[0] > existing.nav_dates[-1]:
+                merged = NAVSeries(*(np.concatenate([old, new])
+                                     for old, new in zip(existing, incoming)))
+            else:
+                combined = NAVSeries(*(np.concatenate([old, new])
+                                       for old, new in zip(existing, incoming)))
+                # Stable sort keeps incoming rows after stored rows of the
+                # same date, so keeping the last of each date keeps the new one
+                order = np.argsort(combined.nav_dates, kind='stable')
+                combined = NAVSeries(*(column[order] for column in combined))
+                keep = np.append(
+                    combined.nav_dates[1:] != combined.nav_dates[:-1], True)
+                merged = NAVSeries(*(column[keep] for column in combined))
+            self._write(isin, merged, version)
+
+    def is_current(self, isin: str, entry_count: int, first_nav_date: Optional[date],
+                   last_nav_date: Optional[date], change_version: int) -> bool:
+        """Whether the stored file matches the maintained count and version for the ISIN"""
+        record = self._load_record(isin)
+        if record is None:
+            return entry_count == 0
+        if self._record_version(record) != change_version:
+            return False
+        series = self._record_series(record)
+        if series.length != entry_count:
+            return False
+        if not entry_count:
+            return True
+        return (series.nav_dates[0] == to_datetime64(first_nav_date)
+                and series.nav_dates[-1] == to_datetime64(last_nav_date))
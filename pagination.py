@@ -0,0 +1,180 @@
+"""
+Keyset (cursor) pagination helpers.
+
+A cursor is an opaque token holding the sort-key values of the last row of
+a page. The next page starts strictly after that row using the sort index,
+so fetching it costs the same whatever its depth, unlike OFFSET which reads
+and discards every earlier row.
+"""
+import base64
+import binascii
+import json
+import threading
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Any, Callable, Hashable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Date, DateTime, tuple_
+from sqlalchemy.orm import Query
+
+
+# Values of the `count` query parameter
+COUNT_EXACT = 'exact'
+COUNT_ESTIMATE = 'estimate'
+COUNT_NONE = 'none'
+COUNT_MODES = (COUNT_EXACT, COUNT_ESTIMATE, COUNT_NONE)
+
+
+class PaginationError(ValueError):
+    """Raised for invalid pagination parameters"""
+
+
+class InvalidCursorError(PaginationError):
+    """Raised when a pagination cursor cannot be decoded"""
+
+
+def parse_count_mode(value: Optional[str], cursor: Optional[str] = None) -> str:
+    """
+    Validate a `count` parameter.
+
+    Defaults to an exact count for page requests and to no count for cursor
+    requests, which exist to avoid it.
+    """
+    if value is None:
+        return COUNT_NONE if cursor is not None else COUNT_EXACT
+    if value not in COUNT_MODES:
+        raise PaginationError(
+            f"Invalid count '{value}', expected one of: {', '.join(COUNT_MODES)}")
+    return value
+
+
+class CountCache:
+    """
+    Thread-safe LRU cache of exact totals.
+
+    Keys combine the filter signature with the data versions the count was
+    taken at, so a version bump makes older entries unreachable and they age
+    out of the cache.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._counts = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], int]) -> int:
+        with self._lock:
+            if key in self._counts:
+                self._counts.move_to_end(key)
+                return self._counts[key]
+
+        count = compute()
+        with self._lock:
+            self._counts[key] = count
+            self._counts.move_to_end(key)
+            while len(self._counts) > self.max_entries:
+                self._counts.popitem(last=False)
+        return count
+
+    def clear(self):
+        with self._lock:
+            self._counts.clear()
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Encode sort-key values as an opaque URL-safe cursor"""
+    payload = [value.isoformat() if isinstance(value, (date, datetime)) else value
+               for value in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str, columns: Sequence[Any]) -> List[Any]:
+    """
+    Decode a cursor back into sort-key values typed like the given columns.
+
+    Raises:
+        InvalidCursorError: If the cursor is malformed or does not match
+            the columns
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursorError(f"Invalid cursor: {cursor}")
+
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise InvalidCursorError(f"Invalid cursor: {cursor}")
+
+    typed_values = []
+    for column, value in zip(columns, values):
+        try:
+            if value is not None and isinstance(column.type, DateTime):
+                value = datetime.fromisoformat(value)
+            elif value is not None and isinstance(column.type, Date):
+                value = date.fromisoformat(value)
+        except (TypeError, ValueError):
+            raise InvalidCursorError(f"Invalid cursor: {cursor}")
+        typed_values.append(value)
+    return typed_values
+
+
+def order_by_keyset(query: Query, columns: Sequence[Any], descending: bool = False) -> Query:
+    """Order a query by the keyset columns, all in the same direction"""
+    return query.order_by(*[column.desc() if descending else column.asc()
+                            for column in columns])
+
+
+def paginate_keyset(query: Query, columns: Sequence[Any], row_key: Callable[[Any], Sequence[Any]],
+                    per_page: int, cursor: Optional[str] = None,
+                    descending: bool = False) -> Tuple[List[Any], Optional[str]]:
+    """
+    Fetch one keyset page of a query.
+
+    Args:
+        query: Filtered, unordered query
+        columns: Sort columns; the last one must make the order unique
+            (typically the primary key)
+        row_key: Returns the values of the sort columns for a result row
+        per_page: Number of rows per page
+        cursor: Cursor returned with the previous page, or None for the first
+        descending: Sort direction applied to every column
+
+    Returns:
+        Tuple of (rows, next_cursor); next_cursor is None on the last page
+
+    Raises:
+        InvalidCursorError: If the cursor cannot be decoded
+    """
+    if cursor:
+        key = tuple_(*columns)
+        values = tuple(decode_cursor(cursor, columns))
+        query = query.filter(key < values if descending else key > values)
+
+    # One extra row tells whether another page follows
+    rows = order_by_keyset(query, columns, descending).limit(per_page + 1).all()
+    if len(rows) <= per_page:
+        return rows, None
+
+    rows = rows[:per_page]
+    return rows, encode_cursor(row_key(rows[-1]))
+
+
+def paginate_offset(query: Query, columns: Sequence[Any], row_key: Callable[[Any], Sequence[Any]],
+                    page: int, per_page: int, descending: bool = False) -> Tuple[List[Any], Optional[str]]:
+    """
+    Fetch one page/offset page of a query in keyset order.
+
+    Returns the same (rows, next_cursor) pair as paginate_keyset, so clients
+    can continue with cursors from any page. One extra row is read to tell
+    whether another page follows, so no total count is needed.
+    """
+    rows = order_by_keyset(query, columns, descending) \
+        .offset((page - 1) * per_page) \
+        .limit(per_page + 1) \
+        .all()
+    if len(rows) <= per_page:
+        return rows, None
+
+    rows = rows[:per_page]
+    return rows, encode_cursor(row_key(rows[-1]))
@@ -0,0 +1,63 @@
+import io
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List
+from sqlalchemy.engine import Connection
+
+# Unquoted marker COPY reads as NULL. Every other value is written quoted,
+# and quoted values are never NULL, so '' and the text '\N' survive as such.
+COPY_NULL = r'\N'
+
+
+def _copy_value(value: Any) -> Any:
+    """Format a value for PostgreSQL CSV COPY input (None becomes NULL)"""
+    if value is None:
+        return None
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, float) and value != value:  # NaN
+        return None
+    return value
+
+
+def _copy_field(value: Any) -> str:
+    value = _copy_value(value)
+    if value is None:
+        return COPY_NULL
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+def copy_records(connection: Connection, table_name: str, columns: List[str],
+                 records: Iterable[Dict[str, Any]]) -> int:
+    """
+    Load rows into a PostgreSQL table with COPY FROM STDIN.
+
+    Runs on the psycopg2 connection behind a SQLAlchemy Connection, so the
+    rows are part of that connection's current transaction. None and NaN
+    are loaded as NULL and empty strings as empty strings.
+
+    Args:
+        connection: SQLAlchemy Connection bound to a PostgreSQL database
+        table_name: Target table, optionally schema-qualified
+        columns: Columns to load, in order
+        records: Dicts keyed by column name
+
+    Returns:
+        Number of rows copied
+    """
+    buffer = io.StringIO()
+    row_count = 0
+    for record in records:
+        buffer.write(','.join(_copy_field(record.get(column)) for column in columns))
+        buffer.write('\n')
+        row_count += 1
+    if not row_count:
+        return 0
+    buffer.seek(0)
+
+    dbapi_connection = connection.connection.dbapi_connection
+    with dbapi_connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {table_name} ({', '.join(columns)}) FROM STDIN "
+            f"WITH (FORMAT csv, NULL '{COPY_NULL}')",
+            buffer)
+    return row_count
@@ -2,17 +2,37 @@ import pandas as pd
 import os
 import re
 from datetime import datetime
-from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from models import Trade, Base
+from db_engine import get_engine
+from config import DEFAULT_DB_CONNECTION_STRING
+from pg_copy import copy_records
+from table_stats import apply_trade_changes, bump_data_version, TRADES
+
+# trades columns loaded through COPY on PostgreSQL
+TRADE_COPY_COLUMNS = ['series_number', 'trade_date', 'trade_type', 'security_type',
+                      'security_name', 'security_id', 'quantity', 'price', 'currency',
+                      'settlement_date', 'trade_value', 'broker', 'account',
+                      'source_file', 'source_folder', 'created_at', 'updated_at']
+
+# Trades saved per batch. PostgreSQL batches are large enough to load with
+# COPY; elsewhere each batch is inserted through the ORM
+DEFAULT_BATCH_SIZE = 50
+COPY_BATCH_SIZE = 5000
+
+# Smallest batch loaded with COPY, such as the tail of a file
+COPY_THRESHOLD = 1000
 
 
 class BNYTradeProcessor:
-    def __init__(self, db_path='sqlite:///nav_data.db', batch_size=50):
+    def __init__(self, db_path=DEFAULT_DB_CONNECTION_STRING, batch_size=None):
         self.trades = []
-        self.engine = create_engine(db_path)
+        self.engine = get_engine(db_path)
         Base.metadata.create_all(self.engine)
         self.Session = sessionmaker(bind=self.engine)
+        self.use_copy = self.engine.dialect.name == 'postgresql'
+        if batch_size is None:
+            batch_size = COPY_BATCH_SIZE if self.use_copy else DEFAULT_BATCH_SIZE
         self.batch_size = batch_size
         self.total_saved = 0
 
@@ -30,6 +50,7 @@ class BNYTradeProcessor:
 
         session = self.Session()
         try:
+            trade_rows = []
             for trade_obj in trades_batch:
                 # Create a dictionary with trade data to handle attribute errors gracefully
                 trade_data = {
@@ -74,10 +95,26 @@ class BNYTradeProcessor:
                 else:
                     trade_data['account'] = "DEFAULT_ACCOUNT"
 
-                # Create Trade object
-                trade = Trade(**trade_data)
-                session.add(trade)
-
+                trade_rows.append(trade_data)
+
+            if self.use_copy and len(trade_rows) >= COPY_THRESHOLD:
+                # COPY the batch instead of one INSERT per Trade object
+                now = datetime.utcnow()
+                for trade_data in trade_rows:
+                    trade_data['created_at'] = now
+                    trade_data['updated_at'] = now
+                copy_records(session.connection(), Trade.__tablename__,
+                             TRADE_COPY_COLUMNS, trade_rows)
+            else:
+                session.add_all(Trade(**trade_data)
+                                for trade_data in trade_rows)
+                session.flush()
+
+            apply_trade_changes(session, [
+                (trade_data['series_number'], trade_data['source_folder'],
+                 trade_data['security_type'], trade_data['trade_date'])
+                for trade_data in trade_rows])
+            bump_data_version(session, TRADES)
             session.commit()
             self.total_saved += len(trades_batch)
             print(
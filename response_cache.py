@@ -0,0 +1,131 @@
+"""
+Serialized response cache keyed by data version.
+
+Read endpoints cache their response body under the route, the query string
+and the current versions of the data they read. A writer bumping a version
+(see table_stats.bump_data_version) makes every older entry unreachable, so
+nothing is ever invalidated by hand. The ETag is derived from the same key,
+so a client revalidating an unchanged resource gets a 304 without the view
+running, and every worker process computes the same tag.
+
+Versions are re-read from data_versions at most every max_age seconds, and
+straight after a commit in this process that bumped one.
+"""
+import hashlib
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, NamedTuple, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from table_stats import VERSIONS_BUMPED, load_data_versions
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    status: int
+    mimetype: str
+    etag: str
+
+
+def make_etag(key: Hashable) -> str:
+    """
+    Strong ETag of the uncompressed body for a cache key; equal keys
+    serialize to equal bodies. Compressed bodies get the coding appended
+    (see serialization.compress_response).
+    """
+    return hashlib.sha256(repr(key).encode('utf-8')).hexdigest()[:32]
+
+
+# Live monitors; the session listeners below are registered once per process
+# and tell every monitor about version bumps
+_monitors = weakref.WeakSet()
+_monitors_lock = threading.Lock()
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_monitors(session: Session):
+    if session.info.pop(VERSIONS_BUMPED, False):
+        with _monitors_lock:
+            monitors = list(_monitors)
+        for monitor in monitors:
+            monitor.invalidate()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_version_bumps(session: Session):
+    session.info.pop(VERSIONS_BUMPED, None)
+
+
+class DataVersionMonitor:
+    """
+    Process-wide view of the data versions, refreshed at most every max_age
+    seconds and whenever a session of this process commits a version bump.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session], max_age: float = 2.0):
+        self.session_factory = session_factory
+        self.max_age = max_age
+        self._versions: Dict[str, int] = {}
+        self._loaded_at: Optional[float] = None
+        self._generation = 0
+        self._lock = threading.Lock()
+        with _monitors_lock:
+            _monitors.add(self)
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+            self._generation += 1
+
+    def current(self, names: Sequence[str]) -> Tuple[int, ...]:
+        """Versions of the given names, as of at most max_age seconds ago"""
+        with self._lock:
+            if self._loaded_at is not None \
+                    and time.monotonic() - self._loaded_at < self.max_age:
+                return tuple(self._versions.get(name, 0) for name in names)
+            generation = self._generation
+
+        loaded_at = time.monotonic()
+        with self.session_factory() as session:
+            versions = load_data_versions(session)
+        with self._lock:
+            # A bump committed while loading may not be in what was read
+            if generation == self._generation:
+                self._versions = versions
+                self._loaded_at = loaded_at
+        return tuple(versions.get(name, 0) for name in names)
+
+
+class ResponseCache:
+    """Thread-safe LRU cache of serialized responses"""
+
+    def __init__(self, max_entries: int = 512, max_body_bytes: int = 5 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_body_bytes = max_body_bytes
+        self._responses = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[CachedResponse]:
+        with self._lock:
+            response = self._responses.get(key)
+            if response is not None:
+                self._responses.move_to_end(key)
+            return response
+
+    def put(self, key: Hashable, response: CachedResponse):
+        # Large bodies (e.g. per_page=1000 pages) are served but not kept
+        if len(response.body) > self.max_body_bytes:
+            return
+        with self._lock:
+            self._responses[key] = response
+            self._responses.move_to_end(key)
+            while len(self._responses) > self.max_entries:
+                self._responses.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._responses.clear()
@@ -6,6 +6,7 @@ import os
 from models import Series, SeriesStatus, NAVFrequency, Custodian, FeeStructure
 from sqlalchemy.orm import Session
 from import_data import parse_date, parse_float
+from table_stats import bump_data_version, SERIES
 import glob
 import tempfile
 from google_drive_service import GoogleDriveService
@@ -593,6 +594,7 @@ class SeriesChangeDetector:
                     session.add(fee)
 
         # Commit all changes
+        bump_data_version(session, SERIES)
         session.commit()
 
     def _cleanup_backups(self, backup_dir: str, keep_count: int = 5) -> None:
@@ -0,0 +1,587 @@
+"""
+Maintained table statistics: data versions and row counts.
+
+Writers bump a data version in the same transaction as their changes, so
+readers can tell whether anything they cached is stale with a primary key
+lookup. Per-ISIN NAV counts and per-series trade counts are maintained the
+same way and give paginated endpoints a total estimate without a COUNT(*).
+
+The summary tables behind /statistics and /trades/summary hold totals per
+group, backed by per-ISIN and per-series group counts. Writers apply the
+rows they inserted or replaced to all of these as deltas, so neither the
+writes nor the reads scan the source tables. The refresh_* functions
+recount from the source tables and are used to build the tables.
+"""
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import case, func, insert, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Query, Session
+
+from models import (DataVersion, NAVEntry, NAVEntryCount, NAVEntryGroupCount, NAVEntrySummary,
+                    Trade, TradeCount, TradeGroupCount, TradeSummary)
+
+# Data version names
+NAV_ENTRIES = 'nav_entries'
+TRADES = 'trades'
+SERIES = 'series'  # Series, custodians and fee structures
+
+# Session.info flag set when a transaction bumps a data version
+VERSIONS_BUMPED = 'data_versions_bumped'
+
+# Count rows per INSERT ... ON CONFLICT statement
+COUNT_UPSERT_CHUNK_SIZE = 500
+
+
+def bump_data_version(session: Session, name: str):
+    """Increment a data version inside the caller's transaction"""
+    updated = (
+        session.query(DataVersion)
+        .filter(DataVersion.name == name)
+        .update({DataVersion.version: DataVersion.version + 1,
+                 DataVersion.updated_at: datetime.utcnow()},
+                synchronize_session=False)
+    )
+    if not updated:
+        session.add(DataVersion(name=name, version=1))
+        session.flush()
+    session.info[VERSIONS_BUMPED] = True
+
+
+def get_data_versions(session: Session, names: Sequence[str]) -> Tuple[int, ...]:
+    """Current versions for the given names, 0 for data never written"""
+    versions = dict(
+        session.query(DataVersion.name, DataVersion.version)
+        .filter(DataVersion.name.in_(names))
+        .all()
+    )
+    return tuple(versions.get(name, 0) for name in names)
+
+
+def load_data_versions(session: Session) -> Dict[str, int]:
+    """All data versions by name"""
+    return dict(session.query(DataVersion.name, DataVersion.version).all())
+
+
+def refresh_nav_entry_counts(session: Session, isins: Optional[Iterable[str]] = None):
+    """
+    Recount NAV entries for the given ISINs (all ISINs when None).
+
+    Reads the (isin, nav_date) unique index only, so the cost follows the
+    history of the ISINs touched rather than the whole table. The change
+    version of every recounted ISIN is incremented.
+    """
+    counts = session.query(
+        NAVEntry.isin,
+        func.count(),
+        func.min(NAVEntry.nav_date),
+        func.max(NAVEntry.nav_date)
+    ).group_by(NAVEntry.isin)
+    stale = session.query(NAVEntryCount)
+    if isins is not None:
+        isins = list(set(isins))
+        if not isins:
+            return
+        counts = counts.filter(NAVEntry.isin.in_(isins))
+        stale = stale.filter(NAVEntryCount.isin.in_(isins))
+
+    versions = dict(stale.with_entities(NAVEntryCount.isin, NAVEntryCount.change_version))
+    rows = [
+        {'isin': isin, 'entry_count': count,
+         'first_nav_date': first_date, 'last_nav_date': last_date,
+         'change_version': versions.get(isin, 0) + 1}
+        for isin, count, first_date, last_date in counts
+    ]
+    stale.delete(synchronize_session=False)
+    if rows:
+        session.execute(insert(NAVEntryCount), rows)
+
+
+def refresh_trade_counts(session: Session, series_numbers: Optional[Iterable[str]] = None):
+    """Recount trades for the given series numbers (all series when None)"""
+    counts = session.query(
+        Trade.series_number,
+        func.count(),
+        func.min(Trade.trade_date),
+        func.max(Trade.trade_date)
+    ).group_by(Trade.series_number)
+    stale = session.query(TradeCount)
+    if series_numbers is not None:
+        series_numbers = list(set(series_numbers))
+        if not series_numbers:
+            return
+        counts = counts.filter(Trade.series_number.in_(series_numbers))
+        stale = stale.filter(TradeCount.series_number.in_(series_numbers))
+
+    rows = [
+        {'series_number': series_number, 'trade_count': count,
+         'first_trade_date': first_date, 'last_trade_date': last_date}
+        for series_number, count, first_date, last_date in counts
+    ]
+    stale.delete(synchronize_session=False)
+    if rows:
+        session.execute(insert(TradeCount), rows)
+
+
+def _refresh_summary(session: Session, counts: Query, detail_model, summary_model,
+                     key: str, groups: Sequence[str], measures: Sequence[str],
+                     keys: Optional[list]):
+    """
+    Replace the group counts of the given keys and roll the summary rows of
+    every group they were or are now in back up from the group counts.
+
+    Args:
+        counts: Query of (key, *groups, count, first date, last date) rows,
+            already limited to the keys
+        detail_model: Group count model keyed by key and groups
+        summary_model: Summary model keyed by groups
+        key: Name of the detail key column (isin or series_number)
+        groups: Names of the grouping columns
+        measures: Names of the (count, first date, last date) columns
+        keys: Keys to refresh, or None for all
+    """
+    count_name, first_name, last_name = measures
+    detail_key = getattr(detail_model, key)
+    detail_groups = [getattr(detail_model, name) for name in groups]
+    summary_groups = [getattr(summary_model, name) for name in groups]
+
+    stale = session.query(detail_model)
+    if keys is not None:
+        stale = stale.filter(detail_key.in_(keys))
+    affected = set(stale.with_entities(*detail_groups).distinct())
+
+    rows = [dict(zip([key, *groups, *measures], row)) for row in counts]
+    stale.delete(synchronize_session=False)
+    if rows:
+        session.execute(insert(detail_model), rows)
+    affected.update(tuple(row[name] for name in groups) for row in rows)
+    if not affected:
+        return
+
+    rollup = session.query(
+        *detail_groups,
+        func.sum(getattr(detail_model, count_name)),
+        func.min(getattr(detail_model, first_name)),
+        func.max(getattr(detail_model, last_name))
+    ).group_by(*detail_groups)
+    stale_summary = session.query(summary_model)
+    if keys is not None:
+        affected = list(affected)
+        rollup = rollup.filter(tuple_(*detail_groups).in_(affected))
+        stale_summary = stale_summary.filter(tuple_(*summary_groups).in_(affected))
+
+    summary_rows = [dict(zip([*groups, *measures], row)) for row in rollup]
+    stale_summary.delete(synchronize_session=False)
+    if summary_rows:
+        session.execute(insert(summary_model), summary_rows)
+
+
+def refresh_nav_entry_summary(session: Session, isins: Optional[Iterable[str]] = None):
+    """
+    Refresh the NAV entry summary for the given ISINs (all ISINs when None).
+
+    Recounts the ISINs' entries per distribution type and emitter, then
+    re-rolls only the summary rows those ISINs contribute to.
+    """
+    counts = session.query(
+        NAVEntry.isin,
+        NAVEntry.distribution_type,
+        func.coalesce(NAVEntry.emitter, ''),
+        func.count(),
+        func.min(NAVEntry.nav_date),
+        func.max(NAVEntry.nav_date)
+    ).group_by(NAVEntry.isin, NAVEntry.distribution_type, func.coalesce(NAVEntry.emitter, ''))
+    if isins is not None:
+        isins = list(set(isins))
+        if not isins:
+            return
+        counts = counts.filter(NAVEntry.isin.in_(isins))
+
+    _refresh_summary(session, counts, NAVEntryGroupCount, NAVEntrySummary,
+                     'isin', ['distribution_type', 'emitter'],
+                     ['entry_count', 'first_nav_date', 'last_nav_date'], isins)
+
+
+def refresh_trade_summary(session: Session, series_numbers: Optional[Iterable[str]] = None):
+    """Refresh the trade summary for the given series numbers (all series when None)"""
+    counts = session.query(
+        Trade.series_number,
+        func.coalesce(Trade.source_folder, ''),
+        func.coalesce(Trade.security_type, ''),
+        func.count(),
+        func.min(Trade.trade_date),
+        func.max(Trade.trade_date)
+    ).group_by(Trade.series_number, func.coalesce(Trade.source_folder, ''),
+               func.coalesce(Trade.security_type, ''))
+    if series_numbers is not None:
+        series_numbers = list(set(series_numbers))
+        if not series_numbers:
+            return
+        counts = counts.filter(Trade.series_number.in_(series_numbers))
+
+    _refresh_summary(session, counts, TradeGroupCount, TradeSummary,
+                     'series_number', ['source_folder', 'security_type'],
+                     ['trade_count', 'first_trade_date', 'last_trade_date'], series_numbers)
+
+
+def refresh_table_stats(session: Session, names: Iterable[str]):
+    """
+    Rebuild every count and summary table of the named source tables
+    (NAV_ENTRIES, TRADES) and bump their data versions.
+
+    For scripts that drop, reload or rewrite those tables outside the write
+    paths that keep the counts up to date.
+    """
+    names = set(names)
+    if NAV_ENTRIES in names:
+        refresh_nav_entry_counts(session)
+        refresh_nav_entry_summary(session)
+        bump_data_version(session, NAV_ENTRIES)
+    if TRADES in names:
+        refresh_trade_counts(session)
+        refresh_trade_summary(session)
+        bump_data_version(session, TRADES)
+
+
+def _accumulate(deltas: Dict[tuple, List], key: tuple, row_date: Optional[date]):
+    """Add one row to the [count, first date, last date] delta of key"""
+    delta = deltas.get(key)
+    if delta is None:
+        deltas[key] = [1, row_date, row_date]
+        return
+    delta[0] += 1
+    if row_date is not None:
+        delta[1] = row_date if delta[1] is None else min(delta[1], row_date)
+        delta[2] = row_date if delta[2] is None else max(delta[2], row_date)
+
+
+def _earlier(stored, incoming):
+    """The earlier of two nullable date expressions"""
+    return case((incoming.is_(None), stored), (stored.is_(None), incoming),
+                (incoming < stored, incoming), else_=stored)
+
+
+def _later(stored, incoming):
+    """The later of two nullable date expressions"""
+    return case((incoming.is_(None), stored), (stored.is_(None), incoming),
+                (incoming > stored, incoming), else_=stored)
+
+
+def _add_counts(session: Session, model, keys: Sequence[str], measures: Sequence[str],
+                deltas: Dict[tuple, List]) -> bool:
+    """
+    Add row deltas to a count table, creating the rows that don't exist yet.
+
+    Counts are incremented and date ranges widened in place with
+    INSERT ... ON CONFLICT DO UPDATE.
+
+    Args:
+        model: Count model keyed by keys
+        keys: Names of the key columns
+        measures: Names of the (count, first date, last date) columns
+        deltas: key tuple -> [count, first date, last date] of the added rows
+
+    Returns:
+        False on dialects without ON CONFLICT, where nothing was written
+    """
+    dialect = session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        dialect_insert = pg_insert
+    elif dialect == 'sqlite':
+        dialect_insert = sqlite_insert
+    else:
+        return False
+
+    count_name, first_name, last_name = measures
+    columns = model.__table__.c
+    rows = [dict(zip([*keys, *measures], [*key, *delta])) for key, delta in deltas.items()]
+    for start in range(0, len(rows), COUNT_UPSERT_CHUNK_SIZE):
+        stmt = dialect_insert(model).values(rows[start:start + COUNT_UPSERT_CHUNK_SIZE])
+        session.execute(stmt.on_conflict_do_update(
+            index_elements=[columns[name] for name in keys],
+            set_={
+                count_name: columns[count_name] + stmt.excluded[count_name],
+                first_name: _earlier(columns[first_name], stmt.excluded[first_name]),
+                last_name: _later(columns[last_name], stmt.excluded[last_name]),
+            }
+        ))
+    return True
+
+
+def _remove_counts(session: Session, model, keys: Sequence[str], measures: Sequence[str],
+                   deltas: Dict[tuple, List], recount_dates) -> None:
+    """
+    Subtract row deltas from a count table.
+
+    Rows whose count drops to zero are deleted. When a removed row sat on
+    the edge of a key's date range, recount_dates(key) gives the new
+    (first date, last date).
+    """
+    count_name, first_name, last_name = measures
+    key_columns = [getattr(model, name) for name in keys]
+    for key, (count, first_removed, last_removed) in deltas.items():
+        row = session.query(model).populate_existing().filter(
+            *(column == value for column, value in zip(key_columns, key))).one_or_none()
+        if row is None:
+            continue
+        remaining = getattr(row, count_name) - count
+        if remaining <= 0:
+            session.delete(row)
+            continue
+        setattr(row, count_name, remaining)
+        first_date, last_date = getattr(row, first_name), getattr(row, last_name)
+        if (first_removed is not None and first_date is not None and first_removed <= first_date) \
+                or (last_removed is not None and last_date is not None and last_removed >= last_date):
+            first_date, last_date = recount_dates(key)
+            setattr(row, first_name, first_date)
+            setattr(row, last_name, last_date)
+    session.flush()
+
+
+def apply_nav_entry_changes(session: Session,
+                            inserted: Sequence[Tuple[str, str, Optional[str], date]],
+                            replaced: Sequence[Tuple[str, date, str, Optional[str], str, Optional[str]]]
+                            ) -> Set[str]:
+    """
+    Apply the NAV rows a write inserted or replaced to the count tables.
+
+    The cost follows the rows written, not the history of their ISINs. A
+    replaced row moves from its old distribution type and emitter group to
+    its new one. Only a group that loses the first or last date of its range
+    is re-read, from its own rows in nav_entries. The change version of each
+    ISIN with inserted or replaced rows is incremented once.
+
+    Args:
+        inserted: (isin, distribution_type, emitter, nav_date) of new rows
+        replaced: (isin, nav_date, old distribution_type, old emitter,
+            new distribution_type, new emitter) of overwritten rows
+
+    Returns:
+        The ISINs whose change version was incremented
+    """
+    changed = {row[0] for row in inserted} | {row[0] for row in replaced}
+    if not changed:
+        return changed
+
+    counts, groups_added, summary_added = {}, {}, {}
+    groups_removed, summary_removed = {}, {}
+    for isin, distribution_type, emitter, nav_date in inserted:
+        _accumulate(counts, (isin,), nav_date)
+        _accumulate(groups_added, (isin, distribution_type, emitter or ''), nav_date)
+        _accumulate(summary_added, (distribution_type, emitter or ''), nav_date)
+    for isin, nav_date, old_type, old_emitter, distribution_type, emitter in replaced:
+        _accumulate(groups_removed, (isin, old_type, old_emitter or ''), nav_date)
+        _accumulate(summary_removed, (old_type, old_emitter or ''), nav_date)
+        _accumulate(groups_added, (isin, distribution_type, emitter or ''), nav_date)
+        _accumulate(summary_added, (distribution_type, emitter or ''), nav_date)
+
+    measures = ['entry_count', 'first_nav_date', 'last_nav_date']
+    if not _add_counts(session, NAVEntryCount, ['isin'], measures, counts):
+        refresh_nav_entry_counts(session, changed)
+        refresh_nav_entry_summary(session, changed)
+        return changed
+    session.query(NAVEntryCount).filter(NAVEntryCount.isin.in_(changed)).update(
+        {NAVEntryCount.change_version: NAVEntryCount.change_version + 1},
+        synchronize_session=False)
+    _add_counts(session, NAVEntryGroupCount, ['isin', 'distribution_type', 'emitter'],
+                measures, groups_added)
+    _add_counts(session, NAVEntrySummary, ['distribution_type', 'emitter'],
+                measures, summary_added)
+
+    def group_dates(key):
+        isin, distribution_type, emitter = key
+        return session.query(func.min(NAVEntry.nav_date), func.max(NAVEntry.nav_date)).filter(
+            NAVEntry.isin == isin, NAVEntry.distribution_type == distribution_type,
+            func.coalesce(NAVEntry.emitter, '') == emitter).one()
+
+    def summary_dates(key):
+        distribution_type, emitter = key
+        return session.query(func.min(NAVEntryGroupCount.first_nav_date),
+                             func.max(NAVEntryGroupCount.last_nav_date)).filter(
+            NAVEntryGroupCount.distribution_type == distribution_type,
+            NAVEntryGroupCount.emitter == emitter).one()
+
+    _remove_counts(session, NAVEntryGroupCount, ['isin', 'distribution_type', 'emitter'],
+                   measures, groups_removed, group_dates)
+    _remove_counts(session, NAVEntrySummary, ['distribution_type', 'emitter'],
+                   measures, summary_removed, summary_dates)
+    return changed
+
+
+def apply_trade_changes(session: Session,
+                        inserted: Sequence[Tuple[str, Optional[str], Optional[str], date]]):
+    """
+    Apply inserted trades to the count tables.
+
+    Args:
+        inserted: (series_number, source_folder, security_type, trade_date)
+            of the new trades
+    """
+    counts, groups, summary = {}, {}, {}
+    for series_number, source_folder, security_type, trade_date in inserted:
+        _accumulate(counts, (series_number,), trade_date)
+        _accumulate(groups, (series_number, source_folder or '', security_type or ''), trade_date)
+        _accumulate(summary, (source_folder or '', security_type or ''), trade_date)
+
+    measures = ['trade_count', 'first_trade_date', 'last_trade_date']
+    if not _add_counts(session, TradeCount, ['series_number'], measures, counts):
+        touched = {row[0] for row in inserted}
+        refresh_trade_counts(session, touched)
+        refresh_trade_summary(session, touched)
+        return
+    _add_counts(session, TradeGroupCount, ['series_number', 'source_folder', 'security_type'],
+                measures, groups)
+    _add_counts(session, TradeSummary, ['source_folder', 'security_type'], measures, summary)
+
+
+def get_nav_entry_summary(session: Session) -> Dict[str, Any]:
+    """
+    NAV entry totals from the summary table.
+
+    Returns:
+        Dict containing total_entries, date_range (earliest, latest) and
+        distribution_stats (type, emitter, count)
+    """
+    rows = session.query(NAVEntrySummary).order_by(
+        NAVEntrySummary.distribution_type, NAVEntrySummary.emitter).all()
+    first_dates = [row.first_nav_date for row in rows if row.first_nav_date]
+    last_dates = [row.last_nav_date for row in rows if row.last_nav_date]
+    return {
+        'total_entries': sum(row.entry_count for row in rows),
+        'date_range': {
+            'earliest': min(first_dates) if first_dates else None,
+            'latest': max(last_dates) if last_dates else None
+        },
+        'distribution_stats': [
+            {
+                'type': row.distribution_type,
+                'emitter': row.emitter or None,
+                'count': row.entry_count
+            } for row in rows
+        ]
+    }
+
+
+def get_trade_summary(session: Session) -> Dict[str, Any]:
+    """
+    Trade totals from the summary table.
+
+    Returns:
+        Dict containing total_trades, by_folder and by_security_type counts
+        (None for unknown values) and date_range (earliest, latest)
+    """
+    rows = session.query(TradeSummary).all()
+    by_folder, by_security_type = {}, {}
+    for row in rows:
+        folder = row.source_folder or None
+        security_type = row.security_type or None
+        by_folder[folder] = by_folder.get(folder, 0) + row.trade_count
+        by_security_type[security_type] = by_security_type.get(security_type, 0) + row.trade_count
+    first_dates = [row.first_trade_date for row in rows if row.first_trade_date]
+    last_dates = [row.last_trade_date for row in rows if row.last_trade_date]
+    return {
+        'total_trades': sum(row.trade_count for row in rows),
+        'by_folder': by_folder,
+        'by_security_type': by_security_type,
+        'date_range': {
+            'earliest': min(first_dates) if first_dates else None,
+            'latest': max(last_dates) if last_dates else None
+        }
+    }
+
+
+def ensure_row_counts(session: Session) -> bool:
+    """
+    Build the count and summary tables if they are empty but their source
+    tables are not, e.g. when create_all added them to an existing database.
+    Scripts that rewrite the source tables rebuild the counts themselves with
+    refresh_table_stats.
+
+    Returns:
+        True if anything was rebuilt (the caller commits)
+    """
+    rebuilt = False
+    has_nav_entries = session.query(NAVEntry.id).first() is not None
+    has_trades = session.query(Trade.id).first() is not None
+    if has_nav_entries and session.query(NAVEntryCount.isin).first() is None:
+        refresh_nav_entry_counts(session)
+        rebuilt = True
+    if has_nav_entries and session.query(NAVEntrySummary.emitter).first() is None:
+        refresh_nav_entry_summary(session)
+        rebuilt = True
+    if has_trades and session.query(TradeCount.series_number).first() is None:
+        refresh_trade_counts(session)
+        rebuilt = True
+    if has_trades and session.query(TradeSummary.security_type).first() is None:
+        refresh_trade_summary(session)
+        rebuilt = True
+    return rebuilt
+
+
+def _as_date(value) -> Optional[date]:
+    return value.date() if isinstance(value, datetime) else value
+
+
+def _scaled_count(count: int, first_date: Optional[date], last_date: Optional[date],
+                  start_date: Optional[date], end_date: Optional[date]) -> float:
+    """Share of count falling in [start_date, end_date], assuming even spacing"""
+    if not count or first_date is None or last_date is None:
+        return 0
+    low = max(first_date, start_date) if start_date else first_date
+    high = min(last_date, end_date) if end_date else last_date
+    if high < low:
+        return 0
+    span_days = (last_date - first_date).days + 1
+    return count * ((high - low).days + 1) / span_days
+
+
+def estimate_nav_entries(session: Session, isins: Optional[Sequence[str]] = None,
+                         start_date=None, end_date=None) -> int:
+    """
+    Estimate the number of NAV entries matching the get_nav_history filters.
+
+    Exact when no date range is given; otherwise each ISIN's count is scaled
+    by the share of its date span covered by the range.
+    """
+    query = session.query(NAVEntryCount)
+    if isins is not None:
+        query = query.filter(NAVEntryCount.isin.in_(isins))
+    if start_date is None and end_date is None:
+        return query.with_entities(
+            func.coalesce(func.sum(NAVEntryCount.entry_count), 0)).scalar()
+
+    start_date, end_date = _as_date(start_date), _as_date(end_date)
+    return round(sum(
+        _scaled_count(row.entry_count, row.first_nav_date, row.last_nav_date,
+                      start_date, end_date)
+        for row in query
+    ))
+
+
+def estimate_trades(session: Session, series_number: Optional[str] = None,
+                    start_date=None, end_date=None, security_type: Optional[str] = None) -> int:
+    """
+    Estimate the number of trades for a series, date range and security type.
+
+    Reads the per-series counts, or the per-group counts when a security type
+    is given. Trade type has no maintained counts, so callers count exactly
+    when it is filtered on.
+    """
+    model = TradeCount if security_type is None else TradeGroupCount
+    query = session.query(model)
+    if security_type is not None:
+        query = query.filter(TradeGroupCount.security_type == security_type)
+    if series_number is not None:
+        query = query.filter(model.series_number == series_number)
+    if start_date is None and end_date is None:
+        return query.with_entities(
+            func.coalesce(func.sum(model.trade_count), 0)).scalar()
+
+    start_date, end_date = _as_date(start_date), _as_date(end_date)
+    return round(sum(
+        _scaled_count(row.trade_count, row.first_trade_date, row.last_trade_date,
+                      start_date, end_date)
+        for row in query
+    ))
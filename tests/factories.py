@@ -0,0 +1,25 @@
+"""Builders for the rows and frames the tests write"""
+from datetime import date
+from typing import Iterable, Sequence
+
+import pandas as pd
+
+from models import Series
+
+
+def add_series(service, isins: Iterable[str]):
+    """Create a Series for each ISIN, numbered in order"""
+    with service.SessionMaker() as session:
+        for number, isin in enumerate(isins, start=1):
+            session.add(Series(isin=isin, series_name=f"Series {number}",
+                               series_number=f"S{number:04d}"))
+        session.commit()
+
+
+def nav_frame(isins: Sequence[str], nav_dates: Sequence[date], nav_value: float = 100.0) -> pd.DataFrame:
+    """Raw NAV frame, as read from an emitter file, with a row per ISIN and date"""
+    return pd.DataFrame([
+        {'ISIN': isin, 'NAV': nav_value + offset, 'Valuation Period-End Date': pd.Timestamp(nav_date)}
+        for isin in isins
+        for offset, nav_date in enumerate(nav_dates)
+    ])
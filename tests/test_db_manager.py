@@ -0,0 +1,39 @@
+from datetime import date, timedelta
+
+import pytest
+
+from config import AppConfig
+from db_manager import DBManager
+from factories import add_series, nav_frame
+from models import NAVEntry, NAVEntryGroupCount
+
+DAYS = [date(2024, 1, 1) + timedelta(days=n) for n in range(3)]
+
+
+@pytest.fixture
+def db_manager(sqlite_url, tmp_path):
+    return DBManager(AppConfig.from_dict({
+        'mode': 'local',
+        'db_connection_string': sqlite_url,
+        'nav_store_dir': None,
+        'input_dir': str(tmp_path / 'input'),
+        'output_dir': str(tmp_path / 'output'),
+    }))
+
+
+def test_emitters_by_isin_does_not_trust_the_group_counts(db_manager):
+    service = db_manager.db_service
+    add_series(service, ['XS0000000001', 'XS0000000002', 'XS0000000003'])
+    service.save_nav_entries(nav_frame(['XS0000000001'], DAYS), 'Daily', 'CIX')
+    service.save_nav_entries(nav_frame(['XS0000000001', 'XS0000000002'], DAYS[1:]), 'Daily', 'ETPCAP2')
+    with service.SessionMaker() as session:
+        # Group counts left stale by a rewrite of nav_entries
+        session.query(NAVEntryGroupCount).delete()
+        session.add(NAVEntry(isin='XS0000000003', nav_date=DAYS[0], nav_value=1.0,
+                             distribution_type='Daily', emitter=None))
+        session.commit()
+
+    emitters = db_manager.get_emitters_by_isin({'XS0000000001', 'XS0000000002', 'XS0000000003',
+                                                'XS0000000099'})
+
+    assert emitters == {'XS0000000001': {'CIX', 'ETPCAP2'}, 'XS0000000002': {'ETPCAP2'}}
@@ -0,0 +1,40 @@
+from datetime import date, timedelta
+
+import pytest
+
+from db_service import normalize_nav_frame
+from factories import add_series, nav_frame
+
+ISINS = ['XS0000000001', 'XS0000000002']
+OTHER_ISIN = 'XS0000000099'
+HISTORY_END = date(2024, 6, 30)
+
+
+def days(start: date, count: int):
+    return [start + timedelta(days=offset) for offset in range(count)]
+
+
+@pytest.mark.parametrize('history_days', [10, 2000])
+def test_keys_examined_depends_only_on_the_batch(db_service, history_days):
+    add_series(db_service, ISINS + [OTHER_ISIN])
+    history = days(HISTORY_END - timedelta(days=history_days - 1), history_days)
+    db_service.save_nav_entries(nav_frame(ISINS + [OTHER_ISIN], history), 'Daily', 'CIX')
+
+    # Five days already stored and five new ones for each batch ISIN
+    batch, _ = normalize_nav_frame(nav_frame(ISINS, days(HISTORY_END - timedelta(days=4), 10)))
+    snapshot = db_service.load_nav_key_snapshot([batch])
+
+    assert snapshot.keys_examined == len(ISINS) * 5
+    result = db_service.save_nav_entries(batch, 'Daily', 'CIX', snapshot)
+    assert result.added_count == len(ISINS) * 5
+    assert result.duplicates_count == len(ISINS) * 5
+
+
+def test_empty_batch_examines_no_keys(db_service):
+    add_series(db_service, ISINS)
+    db_service.save_nav_entries(nav_frame(ISINS, days(date(2024, 1, 1), 30)), 'Daily', 'CIX')
+
+    snapshot = db_service.load_nav_key_snapshot([])
+
+    assert snapshot.keys_examined == 0
+    assert snapshot.existing_entries == {}
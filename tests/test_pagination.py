@@ -0,0 +1,170 @@
+"""Cursor encoding, keyset and page/offset pagination, and invalid-cursor responses"""
+import base64
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import insert
+
+from models import NAVEntry
+from pagination import InvalidCursorError, decode_cursor, encode_cursor, paginate_keyset, paginate_offset
+
+from factories import add_series
+
+KEYSET = [NAVEntry.nav_date, NAVEntry.id]
+
+
+def row_key(row):
+    return row.nav_date, row.id
+
+
+def add_nav_entries(service, isins, nav_dates):
+    add_series(service, isins)
+    with service.SessionMaker() as session:
+        session.execute(insert(NAVEntry), [
+            {'isin': isin, 'nav_date': nav_date, 'nav_value': 100.0,
+             'distribution_type': 'CAP', 'emitter': 'ETPCAP2'}
+            for nav_date in nav_dates
+            for isin in isins
+        ])
+        session.commit()
+
+
+def raw_cursor(payload: bytes) -> str:
+    return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+
+def test_cursor_round_trip():
+    values = [date(2024, 2, 29), 42]
+    cursor = encode_cursor(values)
+
+    assert '=' not in cursor
+    assert decode_cursor(cursor, KEYSET) == values
+
+
+def test_cursor_round_trip_types_datetimes():
+    values = [datetime(2024, 3, 1, 12, 30, 5), 7]
+
+    assert decode_cursor(encode_cursor(values), [NAVEntry.created_at, NAVEntry.id]) == values
+
+
+@pytest.mark.parametrize('cursor', [
+    'zzz',
+    '!!!!',
+    raw_cursor(b'not json'),
+    raw_cursor(b'{"nav_date": "2024-01-01"}'),
+    raw_cursor(b'["2024-01-01"]'),
+    raw_cursor(b'["2024-01-01", 1, 2]'),
+    raw_cursor(b'["yesterday", 1]'),
+    raw_cursor(b'[20240101, 1]'),
+], ids=['short', 'not-base64', 'not-json', 'object', 'too-few', 'too-many', 'bad-date', 'number-date'])
+def test_decode_cursor_rejects_malformed_cursors(cursor):
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(cursor, KEYSET)
+
+
+@pytest.mark.parametrize('descending', [True, False])
+def test_keyset_pages_break_ties_on_id(db_service, descending):
+    # Seven ISINs share every date, so page boundaries fall inside a date
+    add_nav_entries(db_service, [f"XS{n:010d}" for n in range(7)],
+                    [date(2024, 1, 1), date(2024, 1, 2), date(2024, 1, 3)])
+
+    with db_service.SessionMaker() as session:
+        query = session.query(NAVEntry.id, NAVEntry.nav_date)
+        expected = sorted((row_key(row) for row in query), reverse=descending)
+
+        seen, cursor, pages = [], None, 0
+        while True:
+            rows, cursor = paginate_keyset(query, KEYSET, row_key, 4, cursor, descending=descending)
+            seen.extend(row_key(row) for row in rows)
+            pages += 1
+            if cursor is None:
+                break
+
+    assert seen == expected
+    assert pages == 6
+
+
+def test_nav_history_cursor_pages_cover_every_entry_once(db_service):
+    isins = [f"XS{n:010d}" for n in range(5)]
+    add_nav_entries(db_service, isins, [date(2024, 1, 1) + timedelta(days=n) for n in range(4)])
+
+    seen, cursor = [], ''
+    while cursor is not None:
+        result = db_service.get_nav_history(per_page=3, cursor=cursor)
+        seen.extend((entry.nav_date, entry.id) for entry in result['entries'])
+        cursor = result['next_cursor']
+
+    assert len(seen) == 20
+    assert seen == sorted(set(seen), reverse=True)
+
+
+def test_offset_pages_return_a_cursor_to_the_next_page(db_service):
+    add_nav_entries(db_service, [f"XS{n:010d}" for n in range(3)],
+                    [date(2024, 1, 1) + timedelta(days=n) for n in range(5)])
+
+    with db_service.SessionMaker() as session:
+        query = session.query(NAVEntry.id, NAVEntry.nav_date)
+        # 15 rows in pages of 4: pages 1-3 are full, page 4 holds the last 3
+        for page in range(1, 4):
+            rows, cursor = paginate_offset(query, KEYSET, row_key, page, 4, descending=True)
+            next_rows, _ = paginate_offset(query, KEYSET, row_key, page + 1, 4, descending=True)
+            keyset_rows, _ = paginate_keyset(query, KEYSET, row_key, 4, cursor, descending=True)
+
+            assert cursor == encode_cursor(row_key(rows[-1]))
+            assert [row_key(row) for row in keyset_rows] == [row_key(row) for row in next_rows]
+
+        rows, cursor = paginate_offset(query, KEYSET, row_key, 4, 4, descending=True)
+        assert len(rows) == 3
+        assert cursor is None
+
+
+def test_cursor_page_cost_does_not_grow_with_depth(db_service):
+    add_nav_entries(db_service, [f"XS{n:010d}" for n in range(20)],
+                    [date(2020, 1, 1) + timedelta(days=n) for n in range(500)])
+    per_page, shallow, deep = 50, 100, 9000
+
+    with db_service.SessionMaker() as session:
+        query = session.query(NAVEntry.id, NAVEntry.nav_date)
+        keys = [row_key(row) for row in query.order_by(NAVEntry.nav_date.desc(), NAVEntry.id.desc())]
+
+        # SQLite VM instructions per page, independent of machine speed
+        steps = []
+
+        def count_step():
+            steps.append(1)
+            return 0
+
+        sqlite_connection = session.connection().connection.driver_connection
+        sqlite_connection.set_progress_handler(count_step, 10)
+
+        def cost(fetch_page):
+            steps.clear()
+            rows, _ = fetch_page()
+            assert len(rows) == per_page
+            return len(steps)
+
+        def cursor_page(depth):
+            return paginate_keyset(query, KEYSET, row_key, per_page, encode_cursor(keys[depth - 1]),
+                                   descending=True)
+
+        def offset_page(depth):
+            return paginate_offset(query, KEYSET, row_key, depth // per_page + 1, per_page,
+                                   descending=True)
+
+        shallow_cursor, deep_cursor = cost(lambda: cursor_page(shallow)), cost(lambda: cursor_page(deep))
+        shallow_offset, deep_offset = cost(lambda: offset_page(shallow)), cost(lambda: offset_page(deep))
+        sqlite_connection.set_progress_handler(None, 0)
+
+    assert deep_cursor <= shallow_cursor * 1.2
+    # The same measure does see offset pages slow down with depth
+    assert deep_offset > 10 * shallow_offset
+
+
+@pytest.mark.parametrize('path', ['/nav-data', '/series', '/trades', '/fee-structures/summary'])
+@pytest.mark.parametrize('cursor', ['zzz', raw_cursor(b'["2024-01-01", 1, 2]')], ids=['malformed', 'wrong-length'])
+def test_invalid_cursor_is_a_bad_request(api_client, path, cursor):
+    response = api_client.get(path, query_string={'cursor': cursor})
+
+    assert response.status_code == 400
+    assert response.get_json()['status'] == 'error'
+    assert 'cursor' in response.get_json()['message'].lower()
@@ -0,0 +1,127 @@
+"""NAV upserts, COPY loads and BNY trade batches on PostgreSQL"""
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import text
+
+import process_bny_trades
+from factories import add_series, nav_frame
+from models import NAVEntry, NAVEntryCount, Trade, TradeCount
+from pg_copy import copy_records
+from process_bny_trades import BNYTradeProcessor
+
+ISIN = 'XS0000000001'
+
+
+def nav_rows(emitter, nav_value, count=3, start=date(2024, 1, 1)):
+    return [{'isin': ISIN, 'nav_date': start + timedelta(days=offset),
+             'nav_value': nav_value + offset, 'distribution_type': 'Daily',
+             'emitter': emitter, 'series_number': 'S0001'}
+            for offset in range(count)]
+
+
+def stored_navs(service):
+    with service.SessionMaker() as session:
+        return [(row.nav_date.day, row.nav_value, row.emitter)
+                for row in session.query(NAVEntry).order_by(NAVEntry.nav_date)]
+
+
+def test_copy_records_keeps_empty_strings_apart_from_null(pg_service):
+    records = [
+        {'id': 1, 'label': '', 'note': None, 'day': date(2024, 1, 2), 'amount': 1.5},
+        {'id': 2, 'label': r'\N', 'note': 'say "hi", then\nleave', 'day': None, 'amount': float('nan')},
+    ]
+    with pg_service.SessionMaker() as session:
+        connection = session.connection()
+        connection.execute(text(
+            "CREATE TEMP TABLE copy_check (id INTEGER, label TEXT, note TEXT, "
+            "day DATE, amount DOUBLE PRECISION)"))
+
+        assert copy_records(connection, 'copy_check',
+                            ['id', 'label', 'note', 'day', 'amount'], records) == 2
+        rows = connection.execute(text("SELECT * FROM copy_check ORDER BY id")).all()
+
+    assert rows == [
+        (1, '', None, date(2024, 1, 2), 1.5),
+        (2, r'\N', 'say "hi", then\nleave', None, None),
+    ]
+
+
+def test_copy_records_without_rows_copies_nothing(pg_service):
+    with pg_service.SessionMaker() as session:
+        assert copy_records(session.connection(), 'nav_entries', ['isin'], []) == 0
+
+
+@pytest.mark.parametrize('upsert', ['statement', 'copy'])
+def test_nav_upsert_overwrites_only_rows_from_another_emitter(pg_service, upsert):
+    add_series(pg_service, [ISIN])
+
+    def write(rows):
+        with pg_service.SessionMaker() as session:
+            if upsert == 'copy':
+                written = pg_service._copy_upsert_nav_entries(session, rows)
+            else:
+                written = session.execute(
+                    pg_service._nav_upsert_statement(session, rows)).rowcount
+            session.commit()
+        return written
+
+    assert write(nav_rows('CIX', 100.0)) == 3
+    # Same emitter: left untouched and not counted
+    assert write(nav_rows('CIX', 200.0)) == 0
+    assert stored_navs(pg_service) == [(1, 100.0, 'CIX'), (2, 101.0, 'CIX'), (3, 102.0, 'CIX')]
+
+    # Another emitter replaces the stored rows; new dates are inserted
+    assert write(nav_rows('DCXPD', 300.0, count=4)) == 4
+    assert stored_navs(pg_service) == [(1, 300.0, 'DCXPD'), (2, 301.0, 'DCXPD'),
+                                       (3, 302.0, 'DCXPD'), (4, 303.0, 'DCXPD')]
+
+
+def test_save_nav_entries_loads_large_batches_with_copy(pg_service, monkeypatch):
+    add_series(pg_service, [ISIN])
+    copies = []
+    copy_upsert = pg_service._copy_upsert_nav_entries
+    monkeypatch.setattr(pg_service, '_copy_upsert_nav_entries',
+                        lambda session, chunk: copies.append(len(chunk)) or copy_upsert(session, chunk))
+    nav_dates = [date(2020, 1, 1) + timedelta(days=offset) for offset in range(1200)]
+
+    result = pg_service.save_nav_entries(nav_frame([ISIN], nav_dates), 'Daily', 'CIX')
+    overwrite = pg_service.save_nav_entries(nav_frame([ISIN], nav_dates[:10], 5.0), 'Daily', 'DCXPD')
+
+    assert sum(copies) == 1200
+    assert (result.added_count, result.failed_count) == (1200, 0)
+    assert overwrite.added_count == 10
+    with pg_service.SessionMaker() as session:
+        counts = session.get(NAVEntryCount, ISIN)
+        assert (counts.entry_count, counts.first_nav_date, counts.last_nav_date) == \
+            (1200, nav_dates[0], nav_dates[-1])
+        assert session.query(NAVEntry).filter(NAVEntry.emitter == 'DCXPD').count() == 10
+
+
+def bny_trades(count):
+    return [SimpleNamespace(trade_date=date(2024, 1, 1) + timedelta(days=offset % 30),
+                            trade_type='BUY', isin='', quantity=10.0, price=1.0,
+                            currency='USD', settlement_date=None, trade_value=10.0,
+                            broker='', account='ACC1')
+            for offset in range(count)]
+
+
+def test_bny_trades_are_copied_in_large_batches(postgres_url, monkeypatch):
+    processor = BNYTradeProcessor(postgres_url)
+    copies = []
+    monkeypatch.setattr(process_bny_trades, 'copy_records',
+                        lambda connection, table, columns, rows: copies.append(len(rows))
+                        or copy_records(connection, table, columns, rows))
+
+    assert processor.batch_size >= process_bny_trades.COPY_THRESHOLD
+    processor.save_trades_to_db(bny_trades(processor.batch_size), '464')
+    # A short tail goes through the ORM rather than a COPY of its own
+    processor.save_trades_to_db(bny_trades(20), '464')
+
+    assert copies == [processor.batch_size]
+    with processor.Session() as session:
+        assert session.query(Trade).count() == processor.batch_size + 20
+        assert session.get(TradeCount, '464').trade_count == processor.batch_size + 20
+        # An empty ISIN is stored as an empty security_id, not NULL
+        assert session.query(Trade).filter(Trade.security_id == '').count() == processor.batch_size + 20
@@ -0,0 +1,200 @@
+"""
+Query plan regression tests for the NAV history, NAV as-of, NAV
+verification, emitter lookup, series lookup and /trades queries.
+
+Builds the schema in a temporary SQLite database and in PostgreSQL, runs
+EXPLAIN for every query shape those code paths issue and fails when any of
+them falls back to a full table scan, e.g. because an index was dropped
+from the models.
+"""
+import re
+from datetime import date
+from typing import List, Tuple
+
+import pytest
+from sqlalchemy import select, func, text, tuple_
+from sqlalchemy.engine import Connection
+from sqlalchemy.sql import Select
+
+from db_engine import get_engine
+from models import NAVEntry, Series, Trade, init_db
+
+# Placeholder filter values; plans depend on the filtered columns, not values
+SAMPLE_ISIN = 'XS0000000000'
+SAMPLE_ISINS = ['XS0000000000', 'XS0000000001']
+SAMPLE_SERIES_NUMBER = '1'
+START_DATE = date(2024, 1, 1)
+END_DATE = date(2024, 12, 31)
+PAGE_SIZE = 50
+
+# SQLite reports "SCAN nav_entries" (or "SCAN TABLE nav_entries" before
+# 3.36) for a full scan, and "SCAN ... USING INDEX" when it walks a whole
+# index only to avoid a sort, which still visits every row. Whole-table
+# aggregates may read a covering index ("SCAN ... USING COVERING INDEX").
+SQLITE_FULL_SCAN = re.compile(r'^SCAN (TABLE )?(\w+)( USING INDEX .*)?$')
+POSTGRES_FULL_SCAN = re.compile(r'Seq Scan on (\w+)')
+
+
+def nav_history_shapes() -> List[Tuple[str, Select]]:
+    """Query shapes issued by DatabaseService.get_nav_history"""
+    in_range = [NAVEntry.nav_date >= START_DATE, NAVEntry.nav_date <= END_DATE]
+    shapes = []
+    for label, filters in [
+        ('isin + date range', [NAVEntry.isin == SAMPLE_ISIN] + in_range),
+        ('isin', [NAVEntry.isin == SAMPLE_ISIN]),
+        ('series ISINs + date range', [NAVEntry.isin.in_(SAMPLE_ISINS)] + in_range),
+        ('date range', in_range),
+    ]:
+        shapes.append((f"get_nav_history count: {label}",
+                       select(func.count()).select_from(NAVEntry).where(*filters)))
+        shapes.append((f"get_nav_history page: {label}",
+                       select(NAVEntry).where(*filters)
+                       .order_by(NAVEntry.nav_date.desc(), NAVEntry.id.desc())
+                       .limit(PAGE_SIZE)))
+        shapes.append((f"get_nav_history cursor page: {label}",
+                       select(NAVEntry).where(
+                           *filters, tuple_(NAVEntry.nav_date, NAVEntry.id) < (END_DATE, 1))
+                       .order_by(NAVEntry.nav_date.desc(), NAVEntry.id.desc())
+                       .limit(PAGE_SIZE + 1)))
+    return shapes
+
+
+def nav_as_of_shapes() -> List[Tuple[str, Select]]:
+    """Query shapes issued by DatabaseService.get_navs_as_of"""
+    shapes = []
+    for label, date_filter in [
+        ('latest on or before', NAVEntry.nav_date <= END_DATE),
+        ('exact date', NAVEntry.nav_date == END_DATE),
+    ]:
+        ranked = (
+            select(NAVEntry.id, NAVEntry.isin,
+                   func.row_number().over(
+                       partition_by=NAVEntry.isin,
+                       order_by=NAVEntry.nav_date.desc()).label('row_number'))
+            .where(NAVEntry.isin.in_(SAMPLE_ISINS), date_filter)
+            .subquery()
+        )
+        shapes.append((f"get_navs_as_of: {label}",
+                       select(ranked.c.id).where(ranked.c.row_number == 1)))
+    return shapes
+
+
+def verify_nav_entries_shapes() -> List[Tuple[str, Select]]:
+    """Query shapes issued by DatabaseService.verify_nav_entries"""
+    return [
+        ("verify_nav_entries count: isin",
+         select(func.count()).select_from(NAVEntry)
+         .where(NAVEntry.isin == SAMPLE_ISIN)),
+        ("verify_nav_entries distribution",
+         select(NAVEntry.distribution_type, NAVEntry.emitter, func.count())
+         .group_by(NAVEntry.distribution_type, NAVEntry.emitter)),
+        ("verify_nav_entries date range",
+         select(func.min(NAVEntry.nav_date), func.max(NAVEntry.nav_date))),
+        ("verify_nav_entries date range: isin",
+         select(func.min(NAVEntry.nav_date), func.max(NAVEntry.nav_date))
+         .where(NAVEntry.isin == SAMPLE_ISIN)),
+        ("verify_nav_entries missing series numbers",
+         select(NAVEntry.isin, func.count())
+         .where(NAVEntry.series_number.is_(None))
+         .group_by(NAVEntry.isin)),
+    ]
+
+
+def emitters_by_isin_shapes() -> List[Tuple[str, Select]]:
+    """Query shape issued by DBManager.get_emitters_by_isin"""
+    return [
+        ("get_emitters_by_isin",
+         select(NAVEntry.isin, NAVEntry.emitter)
+         .where(NAVEntry.isin.in_(SAMPLE_ISINS), NAVEntry.emitter != '')
+         .distinct()),
+    ]
+
+
+def series_lookup_shapes() -> List[Tuple[str, Select]]:
+    """Query shapes issued by the series identifier resolver in the API"""
+    return [
+        ("resolve_series: one identifier",
+         select(Series).where(Series.isin.in_([SAMPLE_ISIN])
+                              | Series.series_number.in_([SAMPLE_ISIN]))),
+        ("resolve_series: batch",
+         select(Series).where(Series.isin.in_(SAMPLE_ISINS)
+                              | Series.series_number.in_(SAMPLE_ISINS))),
+    ]
+
+
+def trades_shapes() -> List[Tuple[str, Select]]:
+    """Query shapes issued by the /trades filters"""
+    in_range = [Trade.trade_date >= START_DATE, Trade.trade_date <= END_DATE]
+    shapes = []
+    for label, filters in [
+        ('series_number', [Trade.series_number == SAMPLE_SERIES_NUMBER]),
+        ('series_number + date range',
+         [Trade.series_number == SAMPLE_SERIES_NUMBER] + in_range),
+        ('security_type', [Trade.security_type == 'Fixed Income']),
+        ('trade_type', [Trade.trade_type == 'Buy']),
+        ('trade_type + date range', [Trade.trade_type == 'Buy'] + in_range),
+        ('date range', in_range),
+    ]:
+        shapes.append((f"/trades count: {label}",
+                       select(func.count()).select_from(Trade).where(*filters)))
+        shapes.append((f"/trades page: {label}",
+                       select(Trade).where(*filters)
+                       .order_by(Trade.trade_date.desc(), Trade.id.desc())
+                       .limit(PAGE_SIZE)))
+        shapes.append((f"/trades cursor page: {label}",
+                       select(Trade).where(
+                           *filters, tuple_(Trade.trade_date, Trade.id) < (END_DATE, 1))
+                       .order_by(Trade.trade_date.desc(), Trade.id.desc())
+                       .limit(PAGE_SIZE + 1)))
+    return shapes
+
+
+def explain(connection: Connection, statement: Select) -> Tuple[List[str], List[str]]:
+    """
+    EXPLAIN a statement on the connection's dialect.
+
+    Returns:
+        Tuple of (plan lines, tables read with a full scan)
+    """
+    sql = statement.compile(dialect=connection.dialect,
+                            compile_kwargs={'literal_binds': True})
+    if connection.dialect.name == 'sqlite':
+        plan = [row[-1] for row in
+                connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+        scans = [match.group(2) for match in map(SQLITE_FULL_SCAN.match, plan)
+                 if match]
+    else:
+        plan = [row[0] for row in connection.exec_driver_sql(f"EXPLAIN {sql}")]
+        scans = [match.group(1) for match in map(POSTGRES_FULL_SCAN.search, plan)
+                 if match]
+    # Scans of subqueries (e.g. the as-of window) read already-filtered rows
+    return plan, [table for table in scans if table in NAVEntry.metadata.tables]
+
+
+SHAPES = (nav_history_shapes() + nav_as_of_shapes() + verify_nav_entries_shapes()
+          + emitters_by_isin_shapes() + series_lookup_shapes() + trades_shapes())
+
+
+@pytest.fixture(scope='module', params=['sqlite', 'postgresql'])
+def plan_connection(request, tmp_path_factory):
+    if request.param == 'sqlite':
+        connection_string = f"sqlite:///{tmp_path_factory.mktemp('plans') / 'nav_data.db'}"
+    else:
+        postgres_engine = request.getfixturevalue('postgres_engine')
+        connection_string = str(postgres_engine.url.render_as_string(hide_password=False))
+        NAVEntry.metadata.drop_all(postgres_engine)
+    init_db(connection_string)
+
+    with get_engine(connection_string).connect() as connection:
+        if connection.dialect.name == 'postgresql':
+            # Small tables make sequential scans cheapest; only fail when no
+            # index can serve the query at all.
+            connection.execute(text("SET enable_seqscan = off"))
+        yield connection
+
+
+@pytest.mark.parametrize('label, statement', SHAPES, ids=[label for label, _ in SHAPES])
+def test_query_shape_uses_an_index(plan_connection, label, statement):
+    plan, scans = explain(plan_connection, statement)
+    assert not scans, f"{label} falls back to a full scan of {', '.join(sorted(set(scans)))}:\n" + \
+        '\n'.join(plan)
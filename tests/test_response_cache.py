@@ -0,0 +1,73 @@
+"""Data version monitor and the ETags of cached API responses"""
+import gc
+import weakref
+from datetime import date, timedelta
+
+import pytest
+
+from factories import add_series, nav_frame
+from response_cache import DataVersionMonitor
+from table_stats import bump_data_version, NAV_ENTRIES
+
+ISINS = ['XS0000000001', 'XS0000000002']
+
+
+def test_committed_bump_refreshes_the_monitor(db_service):
+    monitor = DataVersionMonitor(db_service.SessionMaker, max_age=60)
+    assert monitor.current([NAV_ENTRIES]) == (0,)
+
+    with db_service.SessionMaker() as session:
+        bump_data_version(session, NAV_ENTRIES)
+        session.rollback()
+    assert monitor.current([NAV_ENTRIES]) == (0,)
+
+    with db_service.SessionMaker() as session:
+        bump_data_version(session, NAV_ENTRIES)
+        session.commit()
+    assert monitor.current([NAV_ENTRIES]) == (1,)
+
+
+def test_monitors_are_not_kept_alive_by_session_listeners(db_service):
+    monitor = weakref.ref(DataVersionMonitor(db_service.SessionMaker))
+    gc.collect()
+
+    assert monitor() is None
+
+
+@pytest.fixture
+def nav_api_client(api_app, api_client):
+    db_service = api_app.extensions['nav_api'].processor.db_manager.db_service
+    add_series(db_service, ISINS)
+    # Enough rows for the response to be compressed
+    db_service.save_nav_entries(nav_frame(ISINS, [date(2024, 1, 1) + timedelta(days=n) for n in range(20)]),
+                                'Daily', 'CIX')
+    return api_client
+
+
+def test_etag_is_strong_and_names_the_content_coding(nav_api_client):
+    identity = nav_api_client.get('/nav-data', headers={'Accept-Encoding': 'identity'})
+    compressed = nav_api_client.get('/nav-data', headers={'Accept-Encoding': 'gzip'})
+
+    etag, weak = identity.get_etag()
+    assert not weak
+    assert 'Content-Encoding' not in identity.headers
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert compressed.get_etag() == (f"{etag}-gzip", False)
+
+
+@pytest.mark.parametrize('accept_encoding, coded, status', [
+    ('gzip', True, 304),
+    ('gzip', False, 304),
+    ('identity', False, 304),
+    ('identity', True, 200),
+])
+def test_if_none_match_revalidates_the_representation_sent(nav_api_client, accept_encoding, coded, status):
+    etag, _ = nav_api_client.get('/nav-data', headers={'Accept-Encoding': 'identity'}).get_etag()
+    if_none_match = f'"{etag}-gzip"' if coded else f'"{etag}"'
+
+    response = nav_api_client.get('/nav-data', headers={'Accept-Encoding': accept_encoding,
+                                                        'If-None-Match': if_none_match})
+
+    assert response.status_code == status
+    if status == 304:
+        assert response.headers['ETag'] == if_none_match
@@ -0,0 +1,93 @@
+"""Maintained count tables and the estimates read from them"""
+from datetime import date, timedelta
+
+import pytest
+
+from factories import add_series, nav_frame
+from migrate_db import migrate_database
+from models import NAVEntryCount, NAVEntryGroupCount, NAVEntrySummary, Trade, TradeCount, TradeGroupCount, TradeSummary
+from table_stats import (estimate_trades, get_data_versions, refresh_trade_counts, refresh_trade_summary,
+                         NAV_ENTRIES, TRADES)
+from update_constraint import update_nav_entries_constraint
+
+
+def add_trades(service, trades):
+    """Store (series_number, security_type, trade_type, count) groups of daily trades"""
+    with service.SessionMaker() as session:
+        for series_number, security_type, trade_type, count in trades:
+            session.add_all(
+                Trade(series_number=series_number, security_type=security_type,
+                      trade_type=trade_type, source_folder='ETPCAP2',
+                      trade_date=date(2024, 1, 1) + timedelta(days=n))
+                for n in range(count)
+            )
+        refresh_trade_counts(session)
+        refresh_trade_summary(session)
+        session.commit()
+
+
+TRADE_GROUPS = [('S0001', 'Equity', 'Buy', 6), ('S0001', 'Fixed Income', 'Sell', 4),
+          ('S0002', 'Equity', 'Sell', 3)]
+
+
+@pytest.mark.parametrize('filters, expected', [
+    ({}, 13),
+    ({'series_number': 'S0001'}, 10),
+    ({'security_type': 'Equity'}, 9),
+    ({'series_number': 'S0001', 'security_type': 'Fixed Income'}, 4),
+    ({'security_type': 'Commodity'}, 0),
+])
+def test_estimate_trades_applies_security_type(db_service, filters, expected):
+    add_trades(db_service, TRADE_GROUPS)
+
+    with db_service.SessionMaker() as session:
+        assert estimate_trades(session, **filters) == expected
+
+
+@pytest.mark.parametrize('query, expected', [
+    ({'security_type': 'Equity'}, 9),
+    ({'trade_type': 'Sell'}, 7),
+    ({'series_number': 'S0001', 'trade_type': 'Sell'}, 4),
+])
+def test_trades_estimate_matches_filtered_total(api_app, api_client, query, expected):
+    add_trades(api_app.extensions['nav_api'].processor.db_manager.db_service, TRADE_GROUPS)
+
+    response = api_client.get('/trades', query_string={**query, 'count': 'estimate'})
+
+    assert response.status_code == 200
+    assert response.get_json()['pagination']['total_entries'] == expected
+
+
+def test_dropping_trades_clears_their_counts(db_service, sqlite_url):
+    add_trades(db_service, TRADE_GROUPS)
+    with db_service.SessionMaker() as session:
+        version = get_data_versions(session, [TRADES])
+
+    assert migrate_database(sqlite_url, backup=False)
+
+    with db_service.SessionMaker() as session:
+        for model in (TradeCount, TradeGroupCount, TradeSummary):
+            assert session.query(model).count() == 0
+        assert get_data_versions(session, [TRADES]) > version
+
+
+def test_rebuilding_nav_entries_recounts_them(db_service, sqlite_url):
+    isins = ['XS0000000001', 'XS0000000002']
+    add_series(db_service, isins)
+    db_service.save_nav_entries(nav_frame(isins, [date(2024, 1, 1) + timedelta(days=n) for n in range(5)]),
+                                'Daily', 'CIX')
+    with db_service.SessionMaker() as session:
+        # Counts left stale by an earlier rewrite
+        session.query(NAVEntryCount).update({NAVEntryCount.entry_count: 1})
+        session.query(NAVEntrySummary).delete()
+        session.commit()
+        version = get_data_versions(session, [NAV_ENTRIES])
+
+    update_nav_entries_constraint(sqlite_url)
+
+    with db_service.SessionMaker() as session:
+        assert dict(session.query(NAVEntryCount.isin, NAVEntryCount.entry_count)) == \
+            {isin: 5 for isin in isins}
+        assert session.query(NAVEntryGroupCount).count() == 2
+        assert [(row.emitter, row.entry_count) for row in session.query(NAVEntrySummary)] == [('CIX', 10)]
+        assert get_data_versions(session, [NAV_ENTRIES]) > version
@@ -1,53 +1,61 @@
-from sqlalchemy import create_engine, text
-from models import init_db, Base, NAVEntry
-import sqlite3
+import sys
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from models import init_db, NAVEntry
+from db_engine import get_engine
+from config import DEFAULT_DB_CONNECTION_STRING
+from table_stats import refresh_table_stats, NAV_ENTRIES
 
 
-def update_nav_entries_constraint():
+def update_nav_entries_constraint(db_path=DEFAULT_DB_CONNECTION_STRING):
     """
     Update the unique constraint on nav_entries table to only include isin and nav_date
     """
-    # Create connection using sqlite3 directly for simplicity
-    conn = sqlite3.connect('nav_data.db')
-    cursor = conn.cursor()
+    engine = get_engine(db_path)
+    nav_table = NAVEntry.__table__
+    # Creates the count tables refreshed below if they are missing
+    init_db(db_path)
 
     try:
-        print("Backing up current data...")
-
-        # Get data from current table
-        cursor.execute(
-            "SELECT id, isin, series_number, nav_date, nav_value, distribution_type, emitter, created_at FROM nav_entries")
-        nav_entries = cursor.fetchall()
-        print(f"Backed up {len(nav_entries)} records")
-
-        # Drop the table
-        print("Dropping old table...")
-        cursor.execute("DROP TABLE IF EXISTS nav_entries")
-        conn.commit()
-
-        # Create the table with new schema using SQLAlchemy
-        print("Creating new table with updated constraint...")
-        engine = create_engine('sqlite:///nav_data.db')
-        Base.metadata.create_all(engine)
-
-        # Re-insert the data using sqlite3
-        print("Restoring data...")
-        if nav_entries:
-            cursor.executemany(
-                "INSERT INTO nav_entries (id, isin, series_number, nav_date, nav_value, distribution_type, emitter, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
-                nav_entries
-            )
-            conn.commit()
-            print(f"Restored {len(nav_entries)} records")
+        # Rebuild the table in one transaction so a failure leaves it untouched
+        with engine.begin() as conn:
+            print("Backing up current data...")
+
+            # Get data from current table
+            nav_entries = [dict(row) for row in conn.execute(nav_table.select()).mappings()]
+            print(f"Backed up {len(nav_entries)} records")
+
+            # Drop the table
+            print("Dropping old table...")
+            nav_table.drop(conn, checkfirst=True)
+
+            # Create the table with new schema using SQLAlchemy
+            print("Creating new table with updated constraint...")
+            nav_table.create(conn)
+
+            # Re-insert the data
+            print("Restoring data...")
+            if nav_entries:
+                conn.execute(nav_table.insert(), nav_entries)
+                if conn.dialect.name == 'postgresql':
+                    # Explicit ids bypass the sequence; move it past them
+                    conn.execute(text(
+                        "SELECT setval(pg_get_serial_sequence('nav_entries', 'id'), "
+                        "(SELECT MAX(id) FROM nav_entries))"))
+                print(f"Restored {len(nav_entries)} records")
+
+            # Recount in the same transaction and invalidate cached responses
+            print("Refreshing NAV entry counts...")
+            with Session(bind=conn) as session:
+                refresh_table_stats(session, [NAV_ENTRIES])
+                session.commit()
 
         print("Constraint update completed successfully!")
     except Exception as e:
         print(f"Error updating constraint: {str(e)}")
         raise
-    finally:
-        cursor.close()
-        conn.close()
 
 
 if __name__ == "__main__":
-    update_nav_entries_constraint()
+    update_nav_entries_constraint(
+        sys.argv[1] if len(sys.argv) > 1 else DEFAULT_DB_CONNECTION_STRING)
@@ -0,0 +1,11 @@
+"""
+WSGI entry point for production serving.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Each worker process imports this module after forking, so every worker
+builds its own app state (database engine pool, response cache, job pool).
+"""
+from api import create_app
+
+app = create_app()